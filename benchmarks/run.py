@@ -0,0 +1,413 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+
+desc:
+	Benchmarks the hot paths of QDataMatrix under the Qt offscreen platform,
+	so that it can run without a display. Each benchmark is run on
+	DataMatrix objects of several sizes, and for both the item-based and the
+	virtual backend. Wall times and peak memory are written to a JSON file,
+	and can be compared against a baseline from an earlier run.
+
+	Usage:
+
+		python benchmarks/run.py --save-baseline
+		python benchmarks/run.py --baseline benchmarks/baseline.json
+
+	Peak memory is measured with tracemalloc, in a separate run of each
+	benchmark, because tracemalloc slows down the code that it measures. It
+	includes NumPy arrays, but not memory that is allocated by Qt.
+"""
+
+import os
+import sys
+os.environ.setdefault(u'QT_QPA_PLATFORM', u'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import argparse
+import gc
+import json
+import platform
+import time
+import tracemalloc
+import warnings
+warnings.simplefilter(u'ignore')
+import numpy as np
+from datamatrix import DataMatrix, IntColumn, FloatColumn
+from qtpy import QtWidgets
+from qtpy.QtCore import QCoreApplication, QEvent
+import qtpy
+from qdatamatrix import QDataMatrix, __version__
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+	u'baseline.json')
+# A benchmark has regressed if it is slower than the baseline by this factor,
+# and by more than MIN_TIME_DIFF seconds, which filters out timer noise in very
+# fast benchmarks.
+TIME_TOLERANCE = 1.25
+MIN_TIME_DIFF = .005
+# The same for peak memory, in bytes
+MEMORY_TOLERANCE = 1.25
+MIN_MEMORY_DIFF = 1024 ** 2
+# The relative scroll positions for the scroll benchmarks
+SCROLL_POSITIONS = [0, .5, 1]
+# The number of columns that are pasted
+PASTE_COLUMNS = 3
+# The fraction of rows that is removed
+REMOVE_FRACTION = .1
+
+benchmarks = []
+_app = None
+
+
+def benchmark(fnc):
+
+	"""
+	desc:
+		Registers a benchmark. A benchmark is a function that receives the
+		number of rows and whether the virtual backend is used, and prepares
+		everything that should not be timed. It returns the function that is
+		timed.
+	"""
+
+	benchmarks.append(fnc)
+	return fnc
+
+
+def app():
+
+	global _app
+	if _app is None:
+		_app = QtWidgets.QApplication.instance() or \
+			QtWidgets.QApplication(sys.argv)
+	return _app
+
+
+def settle(qdm=None):
+
+	"""
+	desc:
+		Processes pending events and waits until blocks that are formatted in
+		the background are done, so that background work of one benchmark
+		doesn't end up in the timing of another.
+	"""
+
+	if qdm is not None:
+		qdm._spreadsheet._format_pool._pool.waitForDone()
+	app().processEvents()
+
+
+def make_dm(length):
+
+	dm = DataMatrix(length=length)
+	dm.ints = IntColumn
+	dm.ints = np.arange(length)
+	dm.floats = FloatColumn
+	dm.floats = np.linspace(0, 1, length)
+	dm.texts = [u'text %d' % i for i in range(length)]
+	dm.mixed = [i if i % 2 else u'odd %d' % i for i in range(length)]
+	return dm
+
+
+def make_qdm(length, virtual, dm=None):
+
+	qdm = QDataMatrix(make_dm(length) if dm is None else dm, virtual=virtual)
+	qdm.resize(1000, 800)
+	qdm.show()
+	settle(qdm)
+	return qdm
+
+
+def make_tsv(nrows, ncols):
+
+	return u'\n'.join([
+		u'\t'.join([u'%d.5' % (i + j) for j in range(ncols)])
+		for i in range(nrows)
+	])
+
+
+def select_rows(qdm, top, bottom):
+
+	ss = qdm._spreadsheet
+	ss.clearSelection()
+	ss.setRangeSelected(QtWidgets.QTableWidgetSelectionRange(
+		top, 0, bottom, len(qdm.dm.columns) - 1), True)
+
+
+@benchmark
+def construct(length, virtual):
+
+	dm = make_dm(length)
+
+	def run():
+		qdm = QDataMatrix(dm, virtual=virtual)
+		qdm.resize(1000, 800)
+		qdm.show()
+		app().processEvents()
+		return qdm
+
+	return run
+
+
+@benchmark
+def refresh(length, virtual):
+
+	qdm = make_qdm(length, virtual)
+	return qdm._spreadsheet.refresh, qdm
+
+
+@benchmark
+def refresh_changed(length, virtual):
+
+	qdm = make_qdm(length, virtual)
+
+	def run():
+		qdm.dm.floats[length // 2] = -1
+		qdm.refresh()
+
+	return run, qdm
+
+
+def scroll_benchmark(position):
+
+	def scroll(length, virtual):
+
+		qdm = make_qdm(length, virtual)
+		ss = qdm._spreadsheet
+		scrollbar = ss.verticalScrollBar()
+
+		def run():
+			scrollbar.setValue(int(position * scrollbar.maximum()))
+			if not virtual:
+				ss._fill_visible_cells()
+			ss.viewport().repaint()
+
+		return run, qdm
+
+	scroll.__name__ = u'scroll_%d' % (100 * position)
+	return benchmark(scroll)
+
+
+for _position in SCROLL_POSITIONS:
+	scroll_benchmark(_position)
+
+
+@benchmark
+def select_all_copy(length, virtual):
+
+	qdm = make_qdm(length, virtual)
+
+	def run():
+		qdm._spreadsheet.selectAll()
+		qdm._spreadsheet._copy()
+
+	return run, qdm
+
+
+@benchmark
+def paste(length, virtual):
+
+	qdm = make_qdm(length, virtual)
+	app().clipboard().setText(make_tsv(length, PASTE_COLUMNS))
+	qdm._spreadsheet.setCurrentCell(1, 0)
+	return qdm._spreadsheet._paste, qdm
+
+
+@benchmark
+def remove_rows(length, virtual):
+
+	qdm = make_qdm(length, virtual)
+	top = length // 2
+	select_rows(qdm, top, top + int(length * REMOVE_FRACTION) - 1)
+	return qdm._spreadsheet._remove_rows, qdm
+
+
+@benchmark
+def undo_remove_rows(length, virtual):
+
+	qdm = make_qdm(length, virtual)
+	top = length // 2
+	select_rows(qdm, top, top + int(length * REMOVE_FRACTION) - 1)
+	qdm._spreadsheet._remove_rows()
+	settle(qdm)
+	return qdm._spreadsheet._undo, qdm
+
+
+def measure(fnc, length, virtual, memory):
+
+	"""
+	desc:
+		Prepares and runs a single benchmark once.
+
+	returns:
+		desc:	The wall time in seconds, or the peak memory in bytes if
+				`memory` is True.
+		type:	[float, int]
+	"""
+
+	prepared = fnc(length, virtual)
+	run, qdm = prepared if isinstance(prepared, tuple) else (prepared, None)
+	gc.collect()
+	if memory:
+		tracemalloc.start()
+		tracemalloc.reset_peak()
+	t0 = time.perf_counter()
+	result = run()
+	settle(qdm)
+	t1 = time.perf_counter()
+	if memory:
+		peak = tracemalloc.get_traced_memory()[1]
+		tracemalloc.stop()
+	# Destroy the widgets right away, because otherwise the DataMatrix
+	# objects of consecutive benchmarks add up
+	for widget in (qdm, result):
+		if isinstance(widget, QDataMatrix):
+			widget.close()
+			widget.deleteLater()
+	del prepared, run, qdm, result
+	app().processEvents()
+	QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+	app().clipboard().clear()
+	gc.collect()
+	return peak if memory else t1 - t0
+
+
+def run_benchmarks(sizes, backends, names, repeat, memory, verbose=True):
+
+	results = {}
+	for fnc in benchmarks:
+		if names and fnc.__name__ not in names:
+			continue
+		for backend in backends:
+			for length in sizes:
+				key = u'%s/%s/%d' % (fnc.__name__, backend, length)
+				virtual = backend == u'virtual'
+				times = [
+					measure(fnc, length, virtual, False)
+					for i in range(repeat)
+				]
+				result = {
+					u'time': min(times),
+					u'times': times,
+				}
+				if memory:
+					result[u'peak_memory'] = measure(fnc, length, virtual,
+						True)
+				results[key] = result
+				if verbose:
+					print(u'%-40s %10.4f s%s' % (key, result[u'time'],
+						u'  %8.1f MB' % (result[u'peak_memory'] / 1024 ** 2)
+						if memory else u''))
+					sys.stdout.flush()
+	return results
+
+
+def compare(results, baseline):
+
+	"""
+	desc:
+		Compares results against a baseline.
+
+	returns:
+		desc:	A list of human-readable descriptions of regressions.
+		type:	list
+	"""
+
+	regressions = []
+	for key, result in sorted(results.items()):
+		if key not in baseline:
+			continue
+		old = baseline[key]
+		if result[u'time'] > old[u'time'] * TIME_TOLERANCE and \
+				result[u'time'] - old[u'time'] > MIN_TIME_DIFF:
+			regressions.append(u'%s: time %.4f s -> %.4f s (%+.0f%%)' % (
+				key, old[u'time'], result[u'time'],
+				100 * (result[u'time'] / old[u'time'] - 1)))
+		if u'peak_memory' in result and u'peak_memory' in old and \
+				result[u'peak_memory'] > old[u'peak_memory'] * \
+				MEMORY_TOLERANCE and \
+				result[u'peak_memory'] - old[u'peak_memory'] > \
+				MIN_MEMORY_DIFF:
+			regressions.append(
+				u'%s: peak memory %.1f MB -> %.1f MB (%+.0f%%)' % (
+				key, old[u'peak_memory'] / 1024 ** 2,
+				result[u'peak_memory'] / 1024 ** 2,
+				100 * (result[u'peak_memory'] / old[u'peak_memory'] - 1)))
+	return regressions
+
+
+def main():
+
+	parser = argparse.ArgumentParser(
+		description=u'Benchmarks QDataMatrix under the offscreen platform')
+	parser.add_argument(u'--sizes', type=int, nargs=u'+',
+		default=DEFAULT_SIZES, help=u'The numbers of rows')
+	parser.add_argument(u'--backends', nargs=u'+',
+		choices=[u'items', u'virtual'], default=[u'items', u'virtual'])
+	parser.add_argument(u'--benchmarks', nargs=u'+', default=[],
+		choices=[fnc.__name__ for fnc in benchmarks],
+		help=u'Only runs these benchmarks')
+	parser.add_argument(u'--repeat', type=int, default=3,
+		help=u'The number of times that each benchmark is timed. The '
+		u'fastest time is reported.')
+	parser.add_argument(u'--no-memory', action=u'store_true',
+		help=u'Skips measuring peak memory')
+	parser.add_argument(u'--output', default=u'bench_output.json',
+		help=u'The JSON file to which the results are written')
+	parser.add_argument(u'--baseline', default=DEFAULT_BASELINE,
+		help=u'The JSON file with baseline results')
+	parser.add_argument(u'--save-baseline', action=u'store_true',
+		help=u'Writes the results to the baseline file')
+	args = parser.parse_args()
+	app()
+	results = run_benchmarks(args.sizes, args.backends, args.benchmarks,
+		args.repeat, not args.no_memory)
+	output = {
+		u'info': {
+			u'qdatamatrix': __version__,
+			u'qt': u'%s %s' % (qtpy.API_NAME, qtpy.QT_VERSION),
+			u'python': platform.python_version(),
+			u'platform': platform.platform(),
+			u'time': time.strftime(u'%Y-%m-%d %H:%M:%S'),
+		},
+		u'results': results,
+	}
+	with open(args.output, u'w') as fd:
+		json.dump(output, fd, indent=1, sort_keys=True)
+	if args.save_baseline:
+		with open(args.baseline, u'w') as fd:
+			json.dump(output, fd, indent=1, sort_keys=True)
+		print(u'Baseline written to %s' % args.baseline)
+		return 0
+	if not os.path.exists(args.baseline):
+		print(u'No baseline found at %s' % args.baseline)
+		return 0
+	with open(args.baseline) as fd:
+		baseline = json.load(fd)[u'results']
+	regressions = compare(results, baseline)
+	if not regressions:
+		print(u'No regressions compared to %s' % args.baseline)
+		return 0
+	print(u'Regressions compared to %s:' % args.baseline)
+	for regression in regressions:
+		print(u'\t%s' % regression)
+	return 1
+
+
+if __name__ == u'__main__':
+	sys.exit(main())
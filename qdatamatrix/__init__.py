@@ -19,3 +19,4 @@ along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
 
 __version__ = '0.1.34'
 from qdatamatrix._qdatamatrix import QDataMatrix
+from qdatamatrix._sources import DataSource, MemmapSource, CSVSource
@@ -0,0 +1,145 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from datamatrix.py3compat import *
+from collections import OrderedDict
+
+
+class ChangeSet(object):
+
+	"""
+	desc:
+		Collects the changes that have been made to a DataMatrix through the
+		widget since the last notification. Changed cells are kept per
+		column as parallel lists of row ids, old values, and new values, in
+		the order in which they were changed.
+
+		If `reset` is True, the structure of the DataMatrix has changed, for
+		example because columns have been renamed or rows have been removed,
+		and listeners should re-read the entire DataMatrix.
+
+		The bounding box of the changes is available as `top`, `left`,
+		`bottom`, and `right`, in table coordinates, such that row 0
+		corresponds to the column names.
+	"""
+
+	def __init__(self):
+
+		self.cells = OrderedDict()
+		self.reset = False
+		self.top = None
+		self.left = None
+		self.bottom = None
+		self.right = None
+
+	def __bool__(self):
+
+		return self.reset or bool(self.cells)
+
+	__nonzero__ = __bool__
+
+	@property
+	def column_names(self):
+
+		"""
+		returns:
+			desc:	The names of the columns that contain changed cells.
+			type:	list
+		"""
+
+		return list(self.cells)
+
+	@property
+	def rowids(self):
+
+		"""
+		returns:
+			desc:	The sorted row ids of all changed cells.
+			type:	list
+		"""
+
+		rowids = set()
+		for column_rowids, old, new in self.cells.values():
+			rowids.update(column_rowids)
+		return sorted(rowids)
+
+	def changes(self, name):
+
+		"""
+		arguments:
+			name:
+				desc:	A column name.
+				type:	str
+
+		returns:
+			desc:	A (row ids, old values, new values) tuple of lists.
+			type:	tuple
+		"""
+
+		return self.cells.get(name, ([], [], []))
+
+	def add_cells(self, name, colnr, top, bottom, rowids, old, new):
+
+		"""
+		desc:
+			Adds changed cells from a single column.
+
+		arguments:
+			name:
+				desc:	The column name.
+				type:	str
+			colnr:
+				type:	int
+			top:
+				desc:	The first table row of the cells.
+				type:	int
+			bottom:
+				desc:	The last table row of the cells.
+				type:	int
+			rowids:
+				type:	iterable
+			old:
+				type:	iterable
+			new:
+				type:	iterable
+		"""
+
+		if name not in self.cells:
+			self.cells[name] = [], [], []
+		column_rowids, column_old, column_new = self.cells[name]
+		column_rowids.extend(rowids)
+		column_old.extend(old)
+		column_new.extend(new)
+		self.add_range(top, colnr, bottom, colnr)
+
+	def add_range(self, top, left, bottom, right):
+
+		"""
+		desc:
+			Extends the bounding box of the changes.
+		"""
+
+		if self.top is None:
+			self.top, self.left, self.bottom, self.right = \
+				top, left, bottom, right
+			return
+		self.top = min(self.top, top)
+		self.left = min(self.left, left)
+		self.bottom = max(self.bottom, bottom)
+		self.right = max(self.right, right)
@@ -0,0 +1,251 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from datamatrix.py3compat import *
+from qdatamatrix._sources import DataSource
+
+NEW_COLUMN_PREFIX = u'new_column_'
+
+
+def column_container(dm):
+
+	"""
+	returns:
+		desc:	The object in which a DataMatrix keeps its columns: a dict for
+				a DataMatrix, and a list, which never changes, for a
+				DataSource.
+	"""
+
+	if isinstance(dm, DataSource):
+		return dm._columns
+	return dm._cols
+
+
+def last_item(container):
+
+	"""
+	returns:
+		desc:	The item that was added last to a column container, or None if
+				the container is empty. This takes constant time.
+	"""
+
+	if not container:
+		return None
+	if isinstance(container, list):
+		return container[-1]
+	return next(reversed(container))
+
+
+class LeadingNames(object):
+
+	"""
+	desc:
+		The names of the columns before a column number, as a container that
+		is checked for names in constant time.
+	"""
+
+	def __init__(self, colnrs, stop):
+
+		self._colnrs = colnrs
+		self._stop = stop
+
+	def __contains__(self, name):
+
+		return self._colnrs.get(name, self._stop) < self._stop
+
+
+class ColumnIndex(object):
+
+	"""
+	desc:
+		Keeps the column names of a DataMatrix in a list, and in a dict that
+		maps names onto column numbers, so that columns can be resolved by
+		number and by name without going through all columns, as
+		DataMatrix.columns does. Column objects are not kept, because the
+		DataMatrix replaces them, for example when it's shortened, and are
+		looked up by name instead.
+
+		Whether the index still matches the DataMatrix is checked in constant
+		time, from the identity and the length of the container in which the
+		DataMatrix keeps its columns, and from the name of the column that
+		was added last. This catches columns that have been added or removed,
+		columns that have been renamed, because renaming replaces the
+		container, and columns that have been removed while others have been
+		added. If a column has nevertheless disappeared from the DataMatrix,
+		the index is rebuilt when the column is looked up. Columns that are
+		added or renamed through the widget are applied to the index with
+		added() and renamed(), rather than rebuilding it.
+	"""
+
+	def __init__(self):
+
+		self._container = None
+		self._last = None
+		self._names = []
+		self._colnrs = {}
+		self._next_name = 1
+
+	def invalidate(self):
+
+		self._container = None
+
+	def names(self, dm):
+
+		"""
+		returns:
+			desc:	The column names, in order. The list should not be
+					modified.
+			type:	list
+		"""
+
+		self._sync(dm)
+		return self._names
+
+	def count(self, dm):
+
+		"""
+		returns:
+			desc:	The number of columns.
+			type:	int
+		"""
+
+		return len(column_container(dm))
+
+	def colnr(self, dm, name):
+
+		"""
+		returns:
+			desc:	The number of a column, or None if there is no column with
+					this name.
+			type:	[int, None]
+		"""
+
+		self._sync(dm)
+		return self._colnrs.get(name, None)
+
+	def column(self, dm, colnr):
+
+		"""
+		returns:
+			desc:	A (name, column) tuple, like DataMatrix.columns[colnr].
+			type:	tuple
+		"""
+
+		name = self.names(dm)[colnr]
+		if name not in dm:
+			self._container = None
+			name = self.names(dm)[colnr]
+		return name, dm[name]
+
+	def columns(self, dm, start=0, stop=None):
+
+		"""
+		returns:
+			desc:	A list of (name, column) tuples for a range of columns,
+					like DataMatrix.columns[start:stop].
+			type:	list
+		"""
+
+		names = self.names(dm)[start:stop]
+		if not all(name in dm for name in names):
+			self._container = None
+			names = self.names(dm)[start:stop]
+		return [(name, dm[name]) for name in names]
+
+	def leading_names(self, dm, stop):
+
+		"""
+		returns:
+			desc:	The names of the columns before a column number.
+			type:	LeadingNames
+		"""
+
+		self._sync(dm)
+		return LeadingNames(self._colnrs, stop)
+
+	def unique_name(self, dm):
+
+		"""
+		desc:
+			Gives a name for a new column. Names are numbered from the lowest
+			number that may be free, so that adding many columns doesn't
+			check the same names over and over.
+
+		returns:
+			type:	str
+		"""
+
+		self._sync(dm)
+		i = self._next_name
+		while u'%s%d' % (NEW_COLUMN_PREFIX, i) in self._colnrs:
+			i += 1
+		self._next_name = i
+		return u'%s%d' % (NEW_COLUMN_PREFIX, i)
+
+	def added(self, dm, name):
+
+		"""
+		desc:
+			Applies a column that has just been added at the end of the
+			DataMatrix.
+		"""
+
+		container = column_container(dm)
+		if container is not self._container or \
+				len(container) != len(self._names) + 1 or \
+				name in self._colnrs or last_item(container) != name:
+			self._container = None
+			return
+		self._colnrs[name] = len(self._names)
+		self._names.append(name)
+		self._last = name
+
+	def renamed(self, dm, colnr, new_name):
+
+		"""
+		desc:
+			Applies a column that has just been renamed. The index should have
+			been in sync before renaming, for example by getting the number
+			of the column.
+		"""
+
+		if self._container is None or \
+				len(column_container(dm)) != len(self._names):
+			self._container = None
+			return
+		del self._colnrs[self._names[colnr]]
+		self._names[colnr] = new_name
+		self._colnrs[new_name] = colnr
+		self._container = column_container(dm)
+		self._last = last_item(self._container)
+		# A name that has been given up may be reused by a new column
+		self._next_name = 1
+
+	def _sync(self, dm):
+
+		container = column_container(dm)
+		if container is self._container and \
+				len(container) == len(self._names) and \
+				last_item(container) == self._last:
+			return
+		self._container = container
+		self._last = last_item(container)
+		self._names = dm.column_names
+		self._colnrs = {name: colnr for colnr, name in enumerate(self._names)}
+		self._next_name = 1
@@ -0,0 +1,179 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from datamatrix.py3compat import *
+from qdatamatrix._sourcecolumn import SourceColumn
+from qtpy.QtGui import QFont, QFontMetrics
+
+MAX_COL_WIDTH = 300
+MARGIN = 30
+# The space that the cell delegate adds around the text
+CELL_PADDING = 10
+# The number of rows that is used to estimate the width of a column
+SAMPLE_SIZE = 100
+# The maximum number of text widths that is remembered
+MAX_CACHED_TEXTS = 100000
+
+
+class ColumnWidths(object):
+
+	"""
+	desc:
+		Keeps track of the widest text in each column, so that column widths
+		can be determined without measuring every cell in the column, as
+		resizeColumnToContents() does. The widest text is updated whenever a
+		cell is set, and estimated from a sample of rows when the table is
+		refreshed. Measured text widths are cached.
+	"""
+
+	def __init__(self, font):
+
+		"""
+		desc:
+			Constructor.
+
+		arguments:
+			font:
+				desc:	The font of the cells. The header is assumed to have
+						the same font, but with a black weight.
+				type:	QFont
+		"""
+
+		header_font = QFont(font)
+		header_font.setWeight(QFont.Black)
+		self._metrics = QFontMetrics(font), QFontMetrics(header_font)
+		self._cache = {}, {}
+		self._max_widths = {}
+
+	def reset(self):
+
+		self._max_widths = {}
+
+	def text_width(self, text, header=False):
+
+		"""
+		returns:
+			desc:	The width of a text in pixels.
+			type:	int
+		"""
+
+		cache = self._cache[header]
+		width = cache.get(text, None)
+		if width is not None:
+			return width
+		if len(cache) >= MAX_CACHED_TEXTS:
+			cache.clear()
+		metrics = self._metrics[header]
+		if hasattr(metrics, u'horizontalAdvance'):
+			width = metrics.horizontalAdvance(text)
+		else:
+			width = metrics.width(text)
+		cache[text] = width
+		return width
+
+	def update(self, colnr, text, header=False):
+
+		"""
+		desc:
+			Takes into account a text that has been set in a column.
+
+		arguments:
+			colnr:
+				type:	int
+			text:
+				type:	str
+
+		keywords:
+			header:
+				desc:	Indicates whether the text is a column header.
+				type:	bool
+
+		returns:
+			desc:	True if the column has become wider, False otherwise.
+			type:	bool
+		"""
+
+		width = self.text_width(text, header)
+		if width <= self._max_widths.get(colnr, 0):
+			return False
+		self._max_widths[colnr] = width
+		return True
+
+	def estimate(self, colnr, name, col, format_value=safe_decode):
+
+		"""
+		desc:
+			Estimates the width of a column from its header and a sample of
+			evenly spaced rows, or of the first rows of a SourceColumn.
+
+		arguments:
+			colnr:
+				type:	int
+			name:
+				desc:	The column name.
+				type:	str
+			col:
+				type:	BaseColumn
+
+		keywords:
+			format_value:
+				desc:	A function that converts a value to a display string.
+				type:	callable
+		"""
+
+		self.update(colnr, safe_decode(name), header=True)
+		# Columns that are read from disk are sampled from the first rows, so
+		# that only a single block needs to be read
+		if isinstance(col, SourceColumn):
+			rownrs = range(min(len(col), SAMPLE_SIZE))
+		else:
+			rownrs = range(0, len(col), max(1, len(col) // SAMPLE_SIZE))
+		for rownr in rownrs:
+			self.update(colnr, format_value(col[rownr]))
+
+	def update_sample(self, colnr, texts):
+
+		"""
+		desc:
+			Takes into account a sample of evenly spaced texts from a list of
+			texts that have been set in a column.
+
+		arguments:
+			colnr:
+				type:	int
+			texts:
+				type:	list
+		"""
+
+		for text in texts[::max(1, len(texts) // SAMPLE_SIZE)]:
+			self.update(colnr, text)
+
+	def width(self, colnr):
+
+		"""
+		returns:
+			desc:	The optimal width of a column, or None if nothing is known
+					about the column.
+			type:	[int, None]
+		"""
+
+		if colnr not in self._max_widths:
+			return None
+		return min(MAX_COL_WIDTH,
+			self._max_widths[colnr] + CELL_PADDING + MARGIN)
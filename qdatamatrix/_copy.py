@@ -0,0 +1,145 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from datamatrix.py3compat import *
+from qtpy.QtCore import QMimeData, QByteArray
+import re
+try:
+	from html import escape
+except ImportError:
+	from cgi import escape
+
+# The number of rows that is converted to text at once
+CHUNK_SIZE = 10000
+# The maximum number of cells for which an HTML table is put on the clipboard.
+# Larger tables are only copied as TSV and CSV, because HTML is very verbose
+# and few applications can paste large HTML tables.
+MAX_HTML_CELLS = 100000
+# Characters that cause a cell to be quoted in comma-separated text
+CSV_SPECIAL_CHARS = re.compile(u'[,"\r\n]')
+
+
+def tsv_chunk(columns):
+
+	return u'\n'.join(map(u'\t'.join, zip(*columns)))
+
+
+def csv_column(texts):
+
+	"""
+	desc:
+		Quotes the cells of a column that need to be quoted in comma-separated
+		text, in the same way as the csv module, except that cells with
+		carriage returns are quoted as well. Whether any cell needs to be
+		quoted is checked for the column as a whole, so that most columns are
+		returned as is.
+
+	arguments:
+		texts:
+			type:	list
+
+	returns:
+		type:	list
+	"""
+
+	search = CSV_SPECIAL_CHARS.search
+	if search(u'\t'.join(texts)) is None:
+		return texts
+	return [
+		u'"%s"' % text.replace(u'"', u'""') if search(text) else text
+		for text in texts
+	]
+
+
+def csv_chunk(columns):
+
+	columns = [csv_column(texts) for texts in columns]
+	if len(columns) == 1:
+		# A row with a single empty cell would otherwise be an empty line
+		columns = [[text if text else u'""' for text in columns[0]]]
+	return u''.join([row + u'\n' for row in map(u','.join, zip(*columns))])
+
+
+def html_chunk(columns):
+
+	return u''.join([
+		u'<tr>%s</tr>\n' % u''.join(
+			[u'<td>%s</td>' % escape(cell) for cell in row])
+		for row in zip(*columns)
+	])
+
+
+def without_placeholder(columns, placeholder):
+
+	return [
+		[u'' if text == placeholder else text for text in texts]
+		for texts in columns
+	]
+
+
+def mime_data(chunks, html=True, placeholder=None):
+
+	"""
+	desc:
+		Builds clipboard data in several formats from chunks of rows, which
+		are passed as columns. Each chunk is converted to all formats at
+		once, and then discarded, so that the texts of the entire table never
+		need to be in memory at once.
+
+	arguments:
+		chunks:
+			desc:	An iterable of chunks, where each chunk is a list of
+					columns, and each column is a list of strings. All columns
+					of a chunk have the same length.
+
+	keywords:
+		html:
+			desc:	Indicates whether an HTML table should be included.
+			type:	bool
+		placeholder:
+			desc:	A text that marks cells that are not part of the copied
+					selection, or None. The placeholder is kept in the
+					tab-separated text, so that pasting it leaves these cells
+					unchanged, and is replaced by empty cells in the other
+					formats, which are meant for other applications.
+			type:	[str, None]
+
+	returns:
+		desc:	Mime data with tab-separated text (text/plain),
+				comma-separated text (text/csv) and optionally an HTML table
+				(text/html).
+		type:	QMimeData
+	"""
+
+	tsv = []
+	csv_ = []
+	html_ = []
+	for columns in chunks:
+		tsv.append(tsv_chunk(columns))
+		if placeholder is not None:
+			columns = without_placeholder(columns, placeholder)
+		csv_.append(csv_chunk(columns))
+		if html:
+			html_.append(html_chunk(columns))
+	data = QMimeData()
+	data.setText(u'\n'.join(tsv))
+	data.setData(u'text/csv', QByteArray(u''.join(csv_).encode(u'utf-8')))
+	if html:
+		data.setHtml(u'<table>\n%s</table>' % u''.join(html_))
+	return data
@@ -0,0 +1,179 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from datamatrix.py3compat import *
+from qdatamatrix._formatting import DisplayFormatter, BLOCK_SIZE
+from qdatamatrix._qformatpool import QFormatPool
+from qdatamatrix._search import SearchIndex
+from qdatamatrix._columnwidths import ColumnWidths
+from qdatamatrix._columnindex import ColumnIndex
+from qdatamatrix._undo import UndoStack
+import weakref
+
+# Maps the ids of DataMatrix objects onto their documents. A document refers
+# to its DataMatrix, so the id remains valid for as long as the document
+# exists, which is as long as a spreadsheet refers to it.
+_documents = weakref.WeakValueDictionary()
+
+
+def get_document(dm, font):
+
+	"""
+	desc:
+		Gives the document of a DataMatrix, and creates it if there is none.
+
+	arguments:
+		dm:
+			type:	[DataMatrix, DataSource]
+		font:
+			desc:	The font that is used to determine column widths, if the
+					document is created.
+			type:	QFont
+
+	returns:
+		type:	Document
+	"""
+
+	document = _documents.get(id(dm), None)
+	if document is None or document.dm is not dm:
+		document = Document(dm, font)
+		_documents[id(dm)] = document
+	return document
+
+
+class Document(object):
+
+	"""
+	desc:
+		The state that is shared by all spreadsheets that show the same
+		DataMatrix: the cache of formatted blocks (with the format pool and
+		the search index that derive from it), the column index, the column
+		widths, and the undo history. Changes that are made through one
+		spreadsheet are passed on to the others, which repaint only what has
+		changed, so that showing a DataMatrix in multiple widgets costs about
+		as much formatting as showing it once.
+
+		The shared formatter is only used by spreadsheets whose rows are
+		neither sorted nor filtered, because the formatted blocks of sorted
+		and filtered spreadsheets refer to rows of the view rather than to
+		rows of the DataMatrix. Such spreadsheets have a formatter of their
+		own, with the same number format.
+	"""
+
+	def __init__(self, dm, font):
+
+		self.dm = dm
+		self.formatter = DisplayFormatter()
+		self.format_pool = QFormatPool(self.formatter)
+		self.format_pool.formatted.connect(self._on_block_formatted)
+		self.search = SearchIndex(self.formatter)
+		self.column_widths = ColumnWidths(font)
+		self.column_index = ColumnIndex()
+		self.undo_stack = UndoStack()
+		self.views = weakref.WeakSet()
+
+	def attach(self, view):
+
+		self.views.add(view)
+
+	def detach(self, view):
+
+		self.views.discard(view)
+
+	def cancel(self, view):
+
+		"""
+		desc:
+			Cancels formatting in the background for a spreadsheet that is
+			closed. The shared format pool is only cancelled if no other
+			spreadsheet uses it.
+		"""
+
+		if view._format_pool is not self.format_pool:
+			view._format_pool.cancel()
+			return
+		if all(other is view or other._format_pool is not self.format_pool
+				for other in self.views):
+			self.format_pool.cancel()
+
+	def cells_changed(self, source, name, start, stop):
+
+		"""
+		desc:
+			Removes the blocks that contain changed cells from the shared
+			formatter, applies the changed cells to the snapshots of all
+			spreadsheets, and passes them on to all spreadsheets other than
+			the one through which they were changed.
+
+		arguments:
+			source:
+				desc:	The spreadsheet through which the cells were changed,
+						or None.
+				type:	[QSpreadSheetBase, None]
+			name:
+				desc:	The column name.
+				type:	str
+			start:
+				desc:	The first row in the DataMatrix.
+				type:	int
+			stop:
+				desc:	The row after the last row in the DataMatrix.
+				type:	int
+		"""
+
+		for rownr in range(start - start % BLOCK_SIZE, stop, BLOCK_SIZE):
+			self.formatter.invalidate(name, rownr)
+		for view in list(self.views):
+			view._update_snapshot(name, start, stop)
+			if view is not source:
+				view._dm_cells_changed(name, start, stop)
+
+	def rows_appended(self, source, old_length):
+
+		"""
+		desc:
+			Passes rows that have been appended to the DataMatrix on to all
+			spreadsheets other than the one through which they were appended.
+		"""
+
+		for view in list(self.views):
+			if view is not source:
+				view._rows_appended(old_length)
+
+	def structure_changed(self, source):
+
+		"""
+		desc:
+			Refreshes all spreadsheets other than the one through which the
+			DataMatrix was changed, once control returns to the event loop.
+			This is done when the structure of the DataMatrix has changed, or
+			when the changes are not known cell by cell. Because all
+			spreadsheets are refreshed, their snapshots are taken again.
+		"""
+
+		for view in list(self.views):
+			view._renew_snapshot()
+			if view is not source:
+				view._schedule_refresh()
+
+	def _on_block_formatted(self, name, blocknr):
+
+		for view in list(self.views):
+			if view._format_pool is self.format_pool:
+				view._on_block_formatted(name, blocknr)
@@ -0,0 +1,586 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from datamatrix.py3compat import *
+from datamatrix import IntColumn, FloatColumn, MixedColumn
+from qdatamatrix._sourcecolumn import SourceColumn
+from collections import OrderedDict
+import itertools
+import numpy as np
+try:
+	from datamatrix._datamatrix._multidimensionalcolumn import \
+		_MultiDimensionalColumn as _SeriesColumn
+except ImportError:
+	# Older versions of DataMatrix only have one-dimensional series
+	try:
+		from datamatrix._datamatrix._seriescolumn import _SeriesColumn
+	except ImportError:
+		_SeriesColumn = None
+
+INF = float(u'inf')
+
+# The number of rows that is formatted at once
+BLOCK_SIZE = 256
+# The maximum number of formatted blocks that is kept in the cache
+MAX_CACHED_BLOCKS = 1000
+# The number of points of the thumbnails of series cells
+THUMBNAIL_WIDTH = 32
+
+
+def is_series(col):
+
+	"""
+	returns:
+		desc:	True if a column is a SeriesColumn or a MultiDimensionalColumn,
+				such that each cell contains an array.
+		type:	bool
+	"""
+
+	return _SeriesColumn is not None and isinstance(col, _SeriesColumn)
+
+
+def downsample(a, width=THUMBNAIL_WIDTH):
+
+	"""
+	desc:
+		Reduces the rows of a two-dimensional array to the minimum and
+		maximum of evenly spaced bins, ignoring NaN values. All rows are
+		reduced at once.
+
+	arguments:
+		a:
+			desc:	An array with one series per row.
+			type:	ndarray
+
+	keywords:
+		width:
+			desc:	The maximum number of bins.
+			type:	int
+
+	returns:
+		desc:	A float32 array with the shape (rows, 2, bins), where the
+				minima come before the maxima.
+		type:	ndarray
+	"""
+
+	depth = a.shape[1]
+	width = min(width, depth)
+	edges = np.linspace(0, depth, width + 1).astype(int)[:-1]
+	thumbnails = np.empty((a.shape[0], 2, width), dtype=np.float32)
+	if a.dtype.kind != u'f':
+		a = a.astype(float)
+	thumbnails[:, 0] = np.fmin.reduceat(a, edges, axis=1)
+	thumbnails[:, 1] = np.fmax.reduceat(a, edges, axis=1)
+	return thumbnails
+
+
+class DisplayFormatter(object):
+
+	"""
+	desc:
+		Converts DataMatrix values to display strings. IntColumn and
+		FloatColumn values are converted a block of rows at a time with NumPy,
+		rather than value by value. Formatted blocks are cached per column
+		until the column is invalidated.
+
+		Blocks can also be formatted in a background thread. Such blocks are
+		marked as pending with begin(), and are added to the cache with
+		store() in the GUI thread, unless they have been invalidated in the
+		meantime.
+
+		If `index` is an array of row indices, rather than None, row numbers
+		refer to positions in this array, so that sorted and filtered rows
+		are formatted a block at a time, just like unsorted rows. The index
+		is set by the spreadsheet, which clears the cache when it changes.
+
+		Every invalidation increments `version`, so that texts that are
+		derived from the formatter, such as the search index, can tell
+		whether a column has changed since they were derived.
+
+		Cells of a SeriesColumn are shown as a summary of their shape, mean,
+		minimum, and maximum, rather than as the entire array. Blocks of
+		series cells also have thumbnails, which are downsampled versions
+		of the series that are cached and invalidated along with the texts.
+	"""
+
+	def __init__(self, precision=None, nan_text=u'nan', inf_text=u'inf'):
+
+		"""
+		desc:
+			Constructor.
+
+		keywords:
+			precision:
+				desc:	The number of decimals of floats, or None to show floats
+						in their shortest exact representation.
+				type:	[int, None]
+			nan_text:
+				desc:	The text for NaN values.
+				type:	str
+			inf_text:
+				desc:	The text for infinite values. Negative infinity is
+						prefixed with a minus sign.
+				type:	str
+		"""
+
+		self.precision = precision
+		self.nan_text = nan_text
+		self.inf_text = inf_text
+		self.index = None
+		self._cache = OrderedDict()
+		self._thumbnails = {}
+		self._pending = {}
+		self._tokens = itertools.count()
+		self.version = 0
+		self._versions = {}
+		self._all_version = 0
+
+	def column_version(self, name):
+
+		"""
+		returns:
+			desc:	The version at which a column was last invalidated.
+			type:	int
+		"""
+
+		return max(self._versions.get(name, 0), self._all_version)
+
+	def clear(self):
+
+		"""
+		desc:
+			Removes all formatted blocks from the cache.
+		"""
+
+		self._cache = OrderedDict()
+		self._thumbnails = {}
+		self._pending = {}
+		self.version += 1
+		self._all_version = self.version
+
+	def invalidate(self, name, rownr=None):
+
+		"""
+		desc:
+			Removes the formatted blocks of a single column from the cache.
+
+		arguments:
+			name:
+				desc:	A column name.
+				type:	str
+
+		keywords:
+			rownr:
+				desc:	A row index, in which case only the block that contains
+						this row is removed, or None to remove all blocks of
+						the column.
+				type:	[int, None]
+		"""
+
+		self.version += 1
+		self._versions[name] = self.version
+		if rownr is not None:
+			self._cache.pop((name, rownr // BLOCK_SIZE), None)
+			self._thumbnails.pop((name, rownr // BLOCK_SIZE), None)
+			self._pending.pop((name, rownr // BLOCK_SIZE), None)
+			return
+		for cache in self._cache, self._thumbnails, self._pending:
+			for key in [key for key in cache if key[0] == name]:
+				del cache[key]
+
+	def invalidate_rows(self, start, stop):
+
+		"""
+		desc:
+			Removes the formatted blocks that contain a range of rows from the
+			cache, for all columns.
+
+		arguments:
+			start:
+				desc:	The first row.
+				type:	int
+			stop:
+				desc:	The row after the last row.
+				type:	int
+		"""
+
+		self.version += 1
+		self._all_version = self.version
+		first, last = start // BLOCK_SIZE, (stop - 1) // BLOCK_SIZE
+		for cache in self._cache, self._thumbnails, self._pending:
+			for key in [key for key in cache if first <= key[1] <= last]:
+				del cache[key]
+
+	def is_cached(self, name, blocknr):
+
+		return (name, blocknr) in self._cache
+
+	def begin(self, name, blocknr):
+
+		"""
+		desc:
+			Marks a block as being formatted in the background.
+
+		arguments:
+			name:
+				desc:	The column name.
+				type:	str
+			blocknr:
+				type:	int
+
+		returns:
+			desc:	A token that should be passed to store(), or None if the
+					block is already being formatted.
+			type:	[int, None]
+		"""
+
+		key = name, blocknr
+		if key in self._pending:
+			return None
+		token = next(self._tokens)
+		self._pending[key] = token
+		return token
+
+	def store(self, name, blocknr, token, texts, thumbnails=None):
+
+		"""
+		desc:
+			Adds a block that has been formatted in the background to the
+			cache.
+
+		arguments:
+			name:
+				desc:	The column name.
+				type:	str
+			blocknr:
+				type:	int
+			token:
+				desc:	The token that was returned by begin().
+				type:	int
+			texts:
+				desc:	The formatted block.
+				type:	list
+
+		keywords:
+			thumbnails:
+				desc:	The thumbnails of the block, or None if the block isn't
+						from a SeriesColumn.
+				type:	[ndarray, None]
+
+		returns:
+			desc:	True if the block was stored, or False if it has been
+					invalidated since it was marked as pending.
+			type:	bool
+		"""
+
+		key = name, blocknr
+		if self._pending.get(key, None) != token:
+			return False
+		del self._pending[key]
+		self._add(key, texts, thumbnails)
+		return True
+
+	def format_value(self, val):
+
+		"""
+		returns:
+			desc:	The display string of a single value.
+			type:	str
+		"""
+
+		if isinstance(val, float):
+			if val != val:
+				return self.nan_text
+			if val == INF:
+				return self.inf_text
+			if val == -INF:
+				return u'-' + self.inf_text
+			if self.precision is not None:
+				return u'%.*f' % (self.precision, val)
+		if isinstance(val, np.ndarray) and val.ndim and \
+				val.dtype.kind in u'biuf':
+			return self.format_series(val[None])[0]
+		return safe_decode(val)
+
+	def format_series(self, a):
+
+		"""
+		desc:
+			Summarizes series, without converting the entire series to text.
+			All series are summarized at once.
+
+		arguments:
+			a:
+				desc:	An array with one series per row, which may have more
+						than one dimension per row.
+				type:	ndarray
+
+		returns:
+			type:	list
+		"""
+
+		shape = u'x'.join(str(size) for size in a.shape[1:])
+		a = a.reshape(a.shape[0], -1)
+		if a.dtype.kind != u'f':
+			a = a.astype(float)
+		with np.errstate(invalid=u'ignore', divide=u'ignore'):
+			valid = ~np.isnan(a)
+			mean = np.where(valid, a, 0).sum(axis=1) / valid.sum(axis=1)
+			lo = np.fmin.reduce(a, axis=1) if a.shape[1] else mean
+			hi = np.fmax.reduce(a, axis=1) if a.shape[1] else mean
+		columns = [self._format_summary(values) for values in (mean, lo, hi)]
+		return [u'[%s] mean=%s min=%s max=%s' % ((shape,) + values)
+			for values in zip(*columns)]
+
+	def _format_summary(self, a):
+
+		# Summaries are meant to be short, so floats are shown with four
+		# significant digits rather than in their shortest exact
+		# representation
+		if self.precision is not None:
+			return self.format_array(a)
+		texts = np.char.mod(u'%.4g', a).astype(object)
+		texts[np.isnan(a)] = self.nan_text
+		texts[np.isposinf(a)] = self.inf_text
+		texts[np.isneginf(a)] = u'-' + self.inf_text
+		return texts.tolist()
+
+	def format_array(self, a):
+
+		"""
+		desc:
+			Converts a one-dimensional numeric array to display strings.
+
+		arguments:
+			a:
+				type:	ndarray
+
+		returns:
+			type:	list
+		"""
+
+		# Python converts numbers to text about twice as fast as NumPy, and
+		# gives the same shortest representation of float64 values, but not
+		# of float32 values, which are converted to float64 by tolist()
+		if a.dtype.kind != u'f':
+			return list(map(str, a.tolist()))
+		if self.precision is not None:
+			texts = list(map((u'%%.%df' % self.precision).__mod__, a.tolist()))
+		elif a.dtype == np.float64:
+			texts = list(map(repr, a.tolist()))
+		else:
+			texts = a.astype(str).tolist()
+		if np.isfinite(a).all():
+			return texts
+		texts = np.array(texts, dtype=object)
+		texts[np.isnan(a)] = self.nan_text
+		texts[np.isposinf(a)] = self.inf_text
+		texts[np.isneginf(a)] = u'-' + self.inf_text
+		return texts.tolist()
+
+	def format_values(self, values):
+
+		"""
+		desc:
+			Converts values to display strings. Strings and ints, which make up
+			most MixedColumn objects, are converted without going through
+			format_value(), which gives the same result.
+
+		arguments:
+			values:
+				desc:	An iterable of values.
+
+		returns:
+			type:	list
+		"""
+
+		format_value = self.format_value
+		return [
+			val if type(val) is str else
+			str(val) if type(val) is int else
+			format_value(val)
+			for val in values
+		]
+
+	def range_texts(self, col, start, stop):
+
+		"""
+		desc:
+			Gives the display strings for a range of rows of a column, without
+			using the cache. This is used for large ranges that are read only
+			once, such as when copying.
+
+		arguments:
+			col:
+				type:	BaseColumn
+			start:
+				desc:	The first row.
+				type:	int
+			stop:
+				desc:	The row after the last row.
+				type:	int
+
+		returns:
+			type:	list
+		"""
+
+		if is_series(col):
+			return self.format_series(self._series(col, start, stop))
+		index = self.index
+		if index is not None:
+			rownrs = index[start:stop]
+			if isinstance(col, (IntColumn, FloatColumn)):
+				return self.format_array(col._seq[rownrs])
+			if isinstance(col, MixedColumn):
+				seq = col._seq
+				return self.format_values([seq[rownr] for rownr in rownrs])
+			return [self.format_value(col[int(rownr)]) for rownr in rownrs]
+		stop = min(len(col), stop)
+		if isinstance(col, SourceColumn):
+			# Only the blocks that contain the rows are read from disk
+			values = col.values(start, stop)
+			if isinstance(values, np.ndarray) and \
+					values.dtype.kind in u'biuf':
+				return self.format_array(values)
+			return self.format_values(values)
+		if isinstance(col, (IntColumn, FloatColumn)):
+			return self.format_array(col._seq[start:stop])
+		if isinstance(col, MixedColumn):
+			return self.format_values(col._seq[start:stop])
+		return [self.format_value(col[rownr]) for rownr in range(start, stop)]
+
+	def block(self, name, col, blocknr):
+
+		"""
+		desc:
+			Gives the display strings for a block of rows of a column.
+
+		arguments:
+			name:
+				desc:	The column name.
+				type:	str
+			col:
+				type:	BaseColumn
+			blocknr:
+				desc:	The block number, such that the block starts at row
+						`blocknr * BLOCK_SIZE`.
+				type:	int
+
+		returns:
+			type:	list
+		"""
+
+		key = name, blocknr
+		texts = self._cache.get(key, None)
+		if texts is not None:
+			self._cache.move_to_end(key)
+			return texts
+		texts, thumbnails = self.format_block(col, blocknr)
+		self._add(key, texts, thumbnails)
+		return texts
+
+	def format_block(self, col, blocknr):
+
+		"""
+		desc:
+			Formats a block of rows of a column without using the cache. This
+			is also done in the background by the format pool.
+
+		arguments:
+			col:
+				type:	BaseColumn
+			blocknr:
+				type:	int
+
+		returns:
+			desc:	A (texts, thumbnails) tuple, where thumbnails is None if
+					the column is not a SeriesColumn.
+			type:	tuple
+		"""
+
+		start = blocknr * BLOCK_SIZE
+		stop = start + BLOCK_SIZE
+		if not is_series(col):
+			return self.range_texts(col, start, stop), None
+		a = self._series(col, start, stop)
+		thumbnails = downsample(a) if a.ndim == 2 and a.shape[1] else None
+		return self.format_series(a), thumbnails
+
+	def thumbnail(self, name, col, rownr):
+
+		"""
+		returns:
+			desc:	The thumbnail of a series cell as an array with the shape
+					(2, bins), or None if the cell has no thumbnail, which is
+					the case for cells of a MultiDimensionalColumn.
+			type:	[ndarray, None]
+		"""
+
+		blocknr = rownr // BLOCK_SIZE
+		self.block(name, col, blocknr)
+		thumbnails = self._thumbnails.get((name, blocknr), None)
+		if thumbnails is None:
+			return None
+		return thumbnails[rownr % BLOCK_SIZE]
+
+	def _series(self, col, start, stop):
+
+		if self.index is not None:
+			return col._seq[self.index[start:stop]]
+		return col._seq[start:stop]
+
+	def _add(self, key, texts, thumbnails=None):
+
+		self._cache[key] = texts
+		if thumbnails is not None:
+			self._thumbnails[key] = thumbnails
+		if len(self._cache) > MAX_CACHED_BLOCKS:
+			key, texts = self._cache.popitem(last=False)
+			self._thumbnails.pop(key, None)
+
+	def text(self, name, col, rownr):
+
+		"""
+		returns:
+			desc:	The display string of a single cell.
+			type:	str
+		"""
+
+		return self.block(name, col, rownr // BLOCK_SIZE)[rownr % BLOCK_SIZE]
+
+	def texts(self, name, col, rownrs):
+
+		"""
+		desc:
+			Gives the display strings of multiple cells in a column.
+
+		arguments:
+			name:
+				desc:	The column name.
+				type:	str
+			col:
+				type:	BaseColumn
+			rownrs:
+				desc:	An iterable of row indices.
+
+		returns:
+			type:	list
+		"""
+
+		return [self.text(name, col, rownr) for rownr in rownrs]
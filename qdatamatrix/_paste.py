@@ -0,0 +1,155 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from datamatrix.py3compat import *
+import copy
+import keyword
+
+
+def parse_tsv(txt):
+
+	"""
+	desc:
+		Splits tab-separated text, with normalized newlines, into rows of
+		cells. Empty lines are kept as None, so that they leave the
+		corresponding rows untouched, except for trailing empty lines, which
+		are removed.
+
+	arguments:
+		txt:
+			type:	str
+
+	returns:
+		desc:	A list of rows, where each row is a list of cells or None.
+		type:	list
+	"""
+
+	rows = [line.split(u'\t') if line else None for line in txt.split(u'\n')]
+	while rows and rows[-1] is None:
+		rows.pop()
+	return rows
+
+
+def column_runs(rows, colnr, skip):
+
+	"""
+	desc:
+		Gives the contiguous runs of cells in a single column of parsed rows.
+		Runs are interrupted by empty lines, by rows that are too short, and
+		by cells that should be skipped.
+
+	arguments:
+		rows:
+			desc:	Rows as returned by parse_tsv().
+			type:	list
+		colnr:
+			type:	int
+		skip:
+			desc:	A cell value that indicates that a cell should be left
+					untouched.
+			type:	str
+
+	returns:
+		desc:	A list of (first row, cells) tuples.
+		type:	list
+	"""
+
+	runs = []
+	cells = None
+	for rownr, row in enumerate(rows):
+		if row is None or colnr >= len(row) or row[colnr] == skip:
+			cells = None
+			continue
+		if cells is None:
+			cells = []
+			runs.append((rownr, cells))
+		cells.append(row[colnr])
+	return runs
+
+
+def unique_name(name, names):
+
+	"""
+	returns:
+		desc:	The name with a numeric suffix, such that it doesn't occur in
+				names.
+		type:	str
+	"""
+
+	unique = name
+	suffix = 1
+	while unique in names:
+		unique = u'%s_%d' % (name, suffix)
+		suffix += 1
+	return unique
+
+
+def valid_name(name):
+
+	"""
+	desc:
+		Checks whether a name can be used as a column name, which is the case
+		for identifiers that are not keywords. DataMatrix.rename() checks
+		this by executing an assignment to the name, which raises different
+		errors depending on the name, and which also executes other
+		statements that are part of the name.
+
+	returns:
+		type:	bool
+	"""
+
+	return name.isidentifier() and not keyword.iskeyword(name) and \
+		name != u'__debug__'
+
+
+def set_slice(col, start, texts):
+
+	"""
+	desc:
+		Assigns a list of texts to a range of cells of a column. The texts
+		are assigned as a slice, so that they're converted by the column in
+		the same way as texts that are assigned cell by cell. If the column
+		rejects a text, such as a word in an IntColumn, the texts are
+		assigned cell by cell instead, and rejected texts are skipped.
+
+	arguments:
+		col:
+			type:	BaseColumn
+		start:
+			desc:	The first row of the range.
+			type:	int
+		texts:
+			type:	list
+
+	returns:
+		desc:	A copy of the old values of the range.
+		type:	[list, ndarray]
+	"""
+
+	stop = start + len(texts)
+	old = copy.copy(col._seq[start:stop])
+	try:
+		col[start:stop] = texts
+	except (TypeError, ValueError):
+		for rownr, text in enumerate(texts, start):
+			try:
+				col[rownr] = text
+			except (TypeError, ValueError):
+				pass
+	return old
@@ -0,0 +1,133 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from datamatrix.py3compat import *
+import time
+
+clock = time.perf_counter
+
+
+class Profiler(object):
+
+	"""
+	desc:
+		Collects the number of calls and the cumulative and maximum duration
+		of operations, as well as counters such as the number of items that
+		have been created. Nothing is collected while `enabled` is False, so
+		that instrumented functions only pay for checking this flag.
+
+		Durations of nested operations are included in the duration of the
+		operation that calls them.
+	"""
+
+	def __init__(self):
+
+		self.enabled = False
+		self.reset()
+
+	def reset(self):
+
+		"""
+		desc:
+			Discards everything that has been collected so far.
+		"""
+
+		self._timings = {}
+		self._counters = {}
+
+	def record(self, name, duration):
+
+		"""
+		desc:
+			Records a single call of an operation.
+
+		arguments:
+			name:
+				desc:	The name of the operation.
+				type:	str
+			duration:
+				desc:	The duration in seconds.
+				type:	float
+		"""
+
+		timing = self._timings.get(name, None)
+		if timing is None:
+			self._timings[name] = [1, duration, duration]
+			return
+		timing[0] += 1
+		timing[1] += duration
+		if duration > timing[2]:
+			timing[2] = duration
+
+	def count(self, name, n=1):
+
+		"""
+		desc:
+			Increments a counter.
+
+		arguments:
+			name:
+				desc:	The name of the counter.
+				type:	str
+
+		keywords:
+			n:
+				desc:	The amount by which the counter is incremented.
+				type:	int
+		"""
+
+		self._counters[name] = self._counters.get(name, 0) + n
+
+	def stats(self):
+
+		"""
+		returns:
+			desc:	A dict with a `timings` dict, which maps operation names
+					onto dicts with the number of `calls`, and the `total`
+					and `max` durations in seconds, and a `counters` dict,
+					which maps counter names onto values.
+			type:	dict
+		"""
+
+		return {
+			u'timings': {
+				name: {u'calls': calls, u'total': total, u'max': max_}
+				for name, (calls, total, max_) in self._timings.items()
+			},
+			u'counters': dict(self._counters)
+		}
+
+	def report(self):
+
+		"""
+		returns:
+			desc:	A human-readable overview of the statistics, with the
+					operations that took the most time first.
+			type:	str
+		"""
+
+		lines = [u'%-32s %8s %10s %10s' % (u'operation', u'calls',
+			u'total (ms)', u'max (ms)')]
+		for name, (calls, total, max_) in sorted(self._timings.items(),
+				key=lambda item: -item[1][1]):
+			lines.append(u'%-32s %8d %10.1f %10.1f' % (name, calls,
+				1000 * total, 1000 * max_))
+		for name, value in sorted(self._counters.items()):
+			lines.append(u'%-32s %8d' % (name, value))
+		return u'\n'.join(lines)
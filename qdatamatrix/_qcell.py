@@ -18,9 +18,14 @@ along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 from datamatrix.py3compat import *
+from datamatrix import IntColumn, FloatColumn, MixedColumn
+from qdatamatrix._sourcecolumn import SourceColumn
+from qdatamatrix._formatting import is_series
 from qtpy.QtWidgets import QTableWidgetItem
 from qtpy.QtCore import Qt
 from qtpy.QtGui import QFont, QColor, QBrush
+import numpy as np
+import numbers
 
 
 HEADER_BACKGROUND = u'#039BE5'
@@ -28,6 +33,101 @@ HEADER_FOREGROUND = u'#FFFFFF'
 CELL_BACKGROUND = u'#ECEFF1'
 CELL_NUMERIC_FOREGROUND = u'#BF360C'
 CELL_TEXT_FOREGROUND = u'#263238'
+# Shared brushes, fonts, and alignments for each style. These are created when
+# they are first needed, because fonts require a QApplication.
+_styles = {}
+
+
+def column_style(col):
+
+	"""
+	desc:
+		Determines the style of the cells in a column from the column type.
+
+	arguments:
+		col:
+			type:	BaseColumn
+
+	returns:
+		desc:	'numeric', 'series', or 'text', or None if the style depends on
+				the value, as is the case for a MixedColumn.
+		type:	[str, None]
+	"""
+
+	if isinstance(col, (IntColumn, FloatColumn)):
+		return u'numeric'
+	if is_series(col):
+		return u'series'
+	if isinstance(col, MixedColumn):
+		return None
+	if isinstance(col, SourceColumn):
+		return col.style
+	return u'text'
+
+
+def value_style(val):
+
+	"""
+	returns:
+		desc:	The style of a single value from a MixedColumn. Numbers,
+				including NumPy numbers, are numeric, but booleans are not.
+		type:	str
+	"""
+
+	if isinstance(val, (numbers.Number, np.number)) and \
+			not isinstance(val, (bool, np.bool_)):
+		return u'numeric'
+	return u'text'
+
+
+def cell_style(col, val):
+
+	"""
+	returns:
+		desc:	The style of a value from a column.
+		type:	str
+	"""
+
+	style = column_style(col)
+	return value_style(val) if style is None else style
+
+
+def shared_style(style):
+
+	"""
+	desc:
+		Gives the shared objects that make up a style.
+
+	arguments:
+		style:
+			desc:	'header', 'numeric', 'series', or 'text'.
+			type:	str
+
+	returns:
+		desc:	A (background, foreground, font, alignment) tuple, where font
+				is None for the default font.
+		type:	tuple
+	"""
+
+	if style in _styles:
+		return _styles[style]
+	if style == u'header':
+		font = QFont()
+		font.setWeight(QFont.Black)
+		_styles[style] = (QBrush(QColor(HEADER_BACKGROUND)),
+			QBrush(QColor(HEADER_FOREGROUND)), font, Qt.AlignCenter)
+	elif style == u'numeric':
+		_styles[style] = (QBrush(QColor(CELL_BACKGROUND)),
+			QBrush(QColor(CELL_NUMERIC_FOREGROUND)), None, Qt.AlignRight)
+	elif style == u'series':
+		_styles[style] = (QBrush(QColor(CELL_BACKGROUND)),
+			QBrush(QColor(CELL_NUMERIC_FOREGROUND)), None, Qt.AlignLeft)
+	elif style == u'text':
+		_styles[style] = (QBrush(QColor(CELL_BACKGROUND)),
+			QBrush(QColor(CELL_TEXT_FOREGROUND)), None, Qt.AlignLeft)
+	else:
+		raise ValueError(u'Unknown style: %s' % style)
+	return _styles[style]
 
 
 class QCell(QTableWidgetItem):
@@ -44,24 +144,25 @@ class QCell(QTableWidgetItem):
 
 	def set_header_style(self):
 
-		fnt = QFont()
-		fnt.setWeight(QFont.Black)
-		self.setFont(fnt)
-		self.setBackground(QBrush(QColor(HEADER_BACKGROUND)))
-		self.setForeground(QBrush(QColor(HEADER_FOREGROUND)))
+		background, foreground, font, alignment = shared_style(u'header')
+		self.setFont(font)
+		self.setBackground(background)
+		self.setForeground(foreground)
 
 	@property
 	def style(self):
 
+		if self._style is not None:
+			return self._style
+		# Cells without an explicit style, such as cells that the user types
+		# into, determine their style from their position and text.
 		if self.row() == 0:
 			return u'header'
-		if self._style is None:
-			try:
-				float(self.text())
-				return u'numeric'
-			except:
-				return u'text'
-		return self._style
+		try:
+			float(self.text())
+			return u'numeric'
+		except:
+			return u'text'
 
 	@style.setter
 	def style(self, style):
@@ -71,20 +172,18 @@ class QCell(QTableWidgetItem):
 
 	def update_style(self):
 
+		style = self.style
+		background, foreground, font, alignment = shared_style(style)
 		try:
-			self.setBackground(QBrush(QColor(CELL_BACKGROUND)))
+			self.setBackground(background)
 		except RuntimeError:
 			# Catch what seems to be a race conditon:
 			# https://github.com/open-cogsci/python-qdatamatrix/issues/7
 			return
-		if self.style == u'numeric':
-			self.setForeground(QBrush(QColor(CELL_NUMERIC_FOREGROUND)))
-			self.setTextAlignment(Qt.AlignRight)
-		elif self.style == u'text':
-			self.setForeground(QBrush(QColor(CELL_TEXT_FOREGROUND)))
-			self.setTextAlignment(Qt.AlignLeft)
-		elif self.style == u'header':
-			self.setTextAlignment(Qt.AlignCenter)
-			self.set_header_style()
+		self.setForeground(foreground)
+		self.setTextAlignment(alignment)
+		# A cell that was a header before falls back to the default font
+		if font is None:
+			self.setData(Qt.FontRole, None)
 		else:
-			raise ValueError(u'Unknown style: %s' % self.style)
+			self.setFont(font)
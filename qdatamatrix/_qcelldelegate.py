@@ -17,8 +17,71 @@ You should have received a copy of the GNU General Public License
 along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from qtpy.QtWidgets import QStyledItemDelegate
-from qtpy.QtCore import Qt, QEvent, Signal
+from qdatamatrix._qcell import CELL_NUMERIC_FOREGROUND
+from qtpy.QtWidgets import QStyledItemDelegate, QStyleOptionViewItem, \
+	QStyle, QApplication, QToolTip
+from qtpy.QtGui import QBrush, QColor, QPen, QPainter
+from qtpy.QtCore import Qt, QEvent, Signal, QPointF, QLineF
+import numpy as np
+
+HIGHLIGHT_BACKGROUND = u'#fce94f'
+# The space between thumbnails and the borders of their cells
+THUMBNAIL_MARGIN = 3
+
+
+def paint_thumbnail(painter, rect, thumbnail, pen):
+
+	"""
+	desc:
+		Draws the thumbnail of a series as a sparkline, with a vertical line
+		for the range of each bin. Bins that contain only NaN values are left
+		out.
+
+	arguments:
+		painter:
+			type:	QPainter
+		rect:
+			desc:	The cell rectangle.
+			type:	QRect
+		thumbnail:
+			desc:	The minima and maxima of the bins, as returned by
+					DisplayFormatter.thumbnail().
+			type:	ndarray
+		pen:
+			type:	QPen
+	"""
+
+	lo, hi = thumbnail
+	finite = np.isfinite(lo) & np.isfinite(hi)
+	if not finite.any():
+		return
+	vmin, vmax = lo[finite].min(), hi[finite].max()
+	rect = rect.adjusted(THUMBNAIL_MARGIN, THUMBNAIL_MARGIN,
+		-THUMBNAIL_MARGIN, -THUMBNAIL_MARGIN)
+	if rect.width() <= 0 or rect.height() <= 0:
+		return
+	scale = rect.height() / (vmax - vmin) if vmax > vmin else 0
+	middle = rect.top() + rect.height() / 2.
+	x = rect.left() + (np.arange(len(lo)) + .5) * rect.width() / len(lo)
+	y_lo = rect.bottom() - (lo - vmin) * scale if scale else \
+		np.full(len(lo), middle)
+	y_hi = rect.bottom() - (hi - vmin) * scale if scale else y_lo
+	painter.save()
+	painter.setRenderHint(QPainter.Antialiasing)
+	painter.setPen(pen)
+	line = []
+	for i in range(len(lo)):
+		if not finite[i]:
+			if len(line) > 1:
+				painter.drawPolyline(*line)
+			line = []
+			continue
+		if y_hi[i] != y_lo[i]:
+			painter.drawLine(QLineF(x[i], y_lo[i], x[i], y_hi[i]))
+		line.append(QPointF(x[i], (y_lo[i] + y_hi[i]) / 2))
+	if len(line) > 1:
+		painter.drawPolyline(*line)
+	painter.restore()
 
 
 class QCellDelegate(QStyledItemDelegate):
@@ -27,10 +90,60 @@ class QCellDelegate(QStyledItemDelegate):
 	desc:
 		A delegate that intercepts left and right keypresses to move to previous
 		and next cells in the table.
+
+		If `highlight` is a function, cells for whose text this function
+		returns True are highlighted. Only cells that are painted are checked,
+		so that highlighting doesn't depend on the size of the DataMatrix.
+
+		If `thumbnail` is a function, cells for which this function returns
+		a thumbnail are painted as a sparkline instead of as text, and show
+		their text as a tooltip.
 	"""
 
 	move = Signal(int, int)
 
+	def __init__(self, parent=None):
+
+		QStyledItemDelegate.__init__(self, parent)
+		self.highlight = None
+		self.thumbnail = None
+		self._highlight_brush = QBrush(QColor(HIGHLIGHT_BACKGROUND))
+		self._thumbnail_pen = QPen(QColor(CELL_NUMERIC_FOREGROUND))
+
+	def initStyleOption(self, option, index):
+
+		QStyledItemDelegate.initStyleOption(self, option, index)
+		# The first row contains the column names
+		if self.highlight is not None and index.row() > 0 and option.text \
+				and self.highlight(option.text):
+			option.backgroundBrush = self._highlight_brush
+
+	def paint(self, painter, option, index):
+
+		thumbnail = None if self.thumbnail is None or index.row() == 0 \
+			else self.thumbnail(index)
+		if thumbnail is None:
+			QStyledItemDelegate.paint(self, painter, option, index)
+			return
+		# The background and the selection are painted as usual, but without
+		# the text
+		option = QStyleOptionViewItem(option)
+		self.initStyleOption(option, index)
+		option.text = u''
+		widget = option.widget
+		style = QApplication.style() if widget is None else widget.style()
+		style.drawControl(QStyle.CE_ItemViewItem, option, painter, widget)
+		paint_thumbnail(painter, option.rect, thumbnail, self._thumbnail_pen)
+
+	def helpEvent(self, e, view, option, index):
+
+		if e.type() == QEvent.ToolTip and self.thumbnail is not None and \
+				index.row() > 0 and self.thumbnail(index) is not None:
+			QToolTip.showText(e.globalPos(), index.data(Qt.DisplayRole),
+				view)
+			return True
+		return QStyledItemDelegate.helpEvent(self, e, view, option, index)
+
 	def eventFilter(self, lineEdit, e):
 
 		if e.type() == QEvent.KeyPress:
@@ -19,6 +19,7 @@ along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
 
 from qtpy import QtWidgets, QtGui, QtCore
 from qdatamatrix.translate import _
+from qdatamatrix._selection import interval_length
 
 
 class QContextAction(QtWidgets.QAction):
@@ -78,9 +79,9 @@ class QPasteAction(QContextAction):
 
 class QRemoveRowAction(QContextAction):
 
-	def __init__(self, menu):
+	def __init__(self, menu, intervals):
 
-		n = len(menu._spreadsheet._selected_rows)
+		n = interval_length(intervals)
 		QContextAction.__init__(self, u'list-remove',
 			_(u'Remove %d row(s)') % n, menu)
 
@@ -91,9 +92,9 @@ class QRemoveRowAction(QContextAction):
 
 class QRemoveColumnAction(QContextAction):
 
-	def __init__(self, menu):
+	def __init__(self, menu, intervals):
 
-		n = len(menu._spreadsheet._selected_columns)
+		n = interval_length(intervals)
 		QContextAction.__init__(self, u'list-remove',
 			_(u'Remove %d column(s)') % n, menu)
 
@@ -115,7 +116,11 @@ class QContextMenu(QtWidgets.QMenu):
 			return
 		self.addAction(QPasteAction(self))
 		self.addSeparator()
-		if spreadsheet._selected_rows:
-			self.addAction(QRemoveRowAction(self))
-		if spreadsheet._selected_columns:
-			self.addAction(QRemoveColumnAction(self))
+		# The selection is evaluated once, from the selection ranges, so that
+		# opening the menu doesn't depend on the size of the selection
+		row_intervals = spreadsheet._selected_row_intervals
+		if row_intervals:
+			self.addAction(QRemoveRowAction(self, row_intervals))
+		column_intervals = spreadsheet._selected_column_intervals
+		if column_intervals:
+			self.addAction(QRemoveColumnAction(self, column_intervals))
@@ -19,7 +19,60 @@ along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
 
 from datamatrix.py3compat import *
 from qdatamatrix._qspreadsheet import QSpreadSheet
+from qdatamatrix._qspreadsheetview import QSpreadSheetView
+from qdatamatrix._changeset import ChangeSet
+from qdatamatrix._qfindbar import QFindBar
+from qdatamatrix._qsubmitqueue import QSubmitQueue
+from qdatamatrix._sources import DataSource
+from qdatamatrix._formatting import is_series
+from datamatrix import IntColumn, FloatColumn, MixedColumn
 from qtpy import QtWidgets, QtCore
+import numpy as np
+import contextlib
+import logging
+import time
+
+logger = logging.getLogger(u'qdatamatrix')
+# The number of milliseconds between checks for rows that have been added to
+# a DataSource that is still being indexed
+SOURCE_POLL_INTERVAL = 250
+# The default minimum number of milliseconds between two updates of the table
+# while rows are appended
+TAIL_INTERVAL = 100
+# The maximum share of the time that is spent on appending rows. If appending
+# takes longer, for example because the DataMatrix has become very large,
+# rows are appended less often and thus in larger chunks.
+TAIL_LOAD = .1
+
+
+def empty_column(dm, col):
+
+	"""
+	desc:
+		Creates an empty column for a DataMatrix with the same type and shape
+		as another column, in the same way as DataMatrix objects do when they
+		are stacked.
+
+	arguments:
+		dm:
+			desc:	The DataMatrix to which the column is added.
+			type:	DataMatrix
+		col:
+			desc:	The column to copy the type and shape from.
+			type:	BaseColumn
+
+	returns:
+		desc:	A column object, or a column type.
+		type:	[BaseColumn, type]
+	"""
+
+	if not is_series(col):
+		return type(col)
+	if hasattr(col, u'_orig_shape'):
+		return type(col)(dm, shape=col._orig_shape,
+			defaultnan=col.defaultnan, metadata=col.metadata)
+	# Older versions of DataMatrix only have one-dimensional series
+	return type(col)(dm, depth=col.depth)
 
 
 class QDataMatrix(QtWidgets.QWidget):
@@ -27,12 +80,26 @@ class QDataMatrix(QtWidgets.QWidget):
 	"""
 	desc:
 		QDataMatrix is the main widget for viewing DataMatrix objects.
+
+		Multiple widgets can show the same DataMatrix, for example a full
+		view and a filtered view. They share the formatted values, the column
+		widths, and the undo history, and changes that are made through one
+		widget are shown right away by the others.
 	"""
 
 	cellchanged = QtCore.Signal(int, int)
 	changed = QtCore.Signal()
+	# Coalesced notifications, which are emitted once for all changes that
+	# are made during an event-loop turn (or a notify_interval)
+	cellschanged = QtCore.Signal(int, int, int, int)
+	changeset = QtCore.Signal(object)
+	# Emitted periodically with the result of stats() while profiling
+	statsupdated = QtCore.Signal(object)
+	# Emitted with the exception if a DataSource could not be indexed
+	sourcefailed = QtCore.Signal(object)
 
-	def __init__(self, dm, parent=None, read_only=False):
+	def __init__(self, dm, parent=None, read_only=False, virtual=False,
+		undo_budget_mb=None, undo_policy=u'spill', notify_interval=0):
 
 		"""
 		desc:
@@ -40,7 +107,11 @@ class QDataMatrix(QtWidgets.QWidget):
 
 		arguments:
 			dm:
-				type:	`DataMatrix`
+				desc:	A DataMatrix, or a DataSource, such as a MemmapSource
+						or a CSVSource, to show a file without loading it
+						into memory. DataSource objects are always shown
+						read-only, and are best combined with `virtual`.
+				type:	[DataMatrix, DataSource]
 
 		keywords:
 			parent:
@@ -49,14 +120,75 @@ class QDataMatrix(QtWidgets.QWidget):
 			read_only:
 				desc:	Makes the matrix read-only.
 				type:	bool
+			virtual:
+				desc:	Shows the matrix through a table model that reads
+						directly from the DataMatrix, instead of creating an
+						item for every cell. This keeps memory use constant
+						for very large DataMatrix objects.
+				type:	bool
+			undo_budget_mb:
+				desc:	The maximum amount of memory in megabytes that the undo
+						history may occupy, or None for no limit. This is
+						ignored if another widget already shows the same
+						DataMatrix, because the widgets share the undo
+						history.
+				type:	[int, float, None]
+			undo_policy:
+				desc:	What happens to the oldest undo actions when the undo
+						budget is exceeded: 'spill' compresses them and writes
+						them to a temporary folder, and 'drop' discards them.
+						Like `undo_budget_mb`, this is ignored if another
+						widget already shows the same DataMatrix.
+				type:	str
+			notify_interval:
+				desc:	See `notify_interval`.
+				type:	int
 		"""
 
 		QtWidgets.QWidget.__init__(self, parent=parent)
 		self._dm = dm
-		self._dm.sorted = False
-		self._spreadsheet = QSpreadSheet(self, read_only=read_only)
-		self._layout = QtWidgets.QHBoxLayout(self)
+		self._changes = ChangeSet()
+		self._notify_timer = QtCore.QTimer(self)
+		self._notify_timer.setSingleShot(True)
+		self._notify_timer.timeout.connect(self._emit_changes)
+		self.notify_interval = notify_interval
+		self._stats_timer = QtCore.QTimer(self)
+		self._stats_timer.timeout.connect(self._emit_stats)
+		self._stats_interval = 0
+		self._last_stats = None
+		# Rows that are added to a DataSource while it's being indexed are
+		# picked up periodically
+		self._source_timer = QtCore.QTimer(self)
+		self._source_timer.setInterval(SOURCE_POLL_INTERVAL)
+		self._source_timer.timeout.connect(self._poll_source)
+		# Rows that are passed to append_rows() are collected until the tail
+		# timer fires
+		self._pending_rows = []
+		self._tail_timer = QtCore.QTimer(self)
+		self._tail_timer.setSingleShot(True)
+		self._tail_timer.timeout.connect(self._flush_rows)
+		self._tail_interval = TAIL_INTERVAL
+		self._tail_duration = 0
+		self.follow_tail = False
+		self._read_only = read_only
+		self._init_source(dm)
+		if isinstance(dm, DataSource):
+			read_only = True
+		if virtual:
+			self._spreadsheet = QSpreadSheetView(self, read_only=read_only)
+		else:
+			self._spreadsheet = QSpreadSheet(self, read_only=read_only)
+		# The undo history is shared with other widgets that show the same
+		# DataMatrix, and keeps the settings of the first widget
+		if len(self._spreadsheet._document.views) == 1:
+			self.undo_budget_mb = undo_budget_mb
+			self.undo_policy = undo_policy
+		self._submit_queue = QSubmitQueue(self._spreadsheet, self)
+		self._find_bar = QFindBar(self._spreadsheet, self)
+		self._layout = QtWidgets.QVBoxLayout(self)
 		self._layout.addWidget(self._spreadsheet)
+		self._layout.addWidget(self._find_bar)
+		self._layout.setSpacing(0)
 		self._layout.setContentsMargins(0,0,0,0)
 		self.refresh()
 
@@ -68,14 +200,728 @@ class QDataMatrix(QtWidgets.QWidget):
 	@dm.setter
 	def dm(self, dm):
 
+		self._spreadsheet._document.cancel(self._spreadsheet)
+		self._pending_rows = []
+		self._tail_timer.stop()
+		self._submit_queue.clear()
 		self._dm = dm
+		self._init_source(dm)
+		self._spreadsheet.read_only = self._read_only or \
+			isinstance(dm, DataSource)
+		self._spreadsheet._set_document(dm)
+
+	def closeEvent(self, e):
+
+		self._spreadsheet._document.cancel(self._spreadsheet)
+		QtWidgets.QWidget.closeEvent(self, e)
+
+	@property
+	def undo_budget_mb(self):
+
+		budget = self._spreadsheet._undo_stack.budget
+		return None if budget is None else budget / 1024. ** 2
+
+	@undo_budget_mb.setter
+	def undo_budget_mb(self, undo_budget_mb):
+
+		self._spreadsheet._undo_stack.budget = None if undo_budget_mb is None \
+			else int(undo_budget_mb * 1024 ** 2)
+		self._spreadsheet._undo_stack.enforce_budget()
+
+	@property
+	def undo_policy(self):
+
+		return self._spreadsheet._undo_stack.policy
+
+	@undo_policy.setter
+	def undo_policy(self, undo_policy):
+
+		self._spreadsheet._undo_stack.policy = undo_policy
+
+	@property
+	def row_labels(self):
+
+		"""
+		desc:
+			Determines what is shown in the vertical header: 'numbers' for row
+			numbers, 'rowids' for the row ids of the DataMatrix, or the name
+			of a column whose values are used as an index.
+		"""
+
+		return self._spreadsheet._row_labels
+
+	@row_labels.setter
+	def row_labels(self, row_labels):
+
+		self._spreadsheet._row_labels = row_labels
+		self._spreadsheet._update_row_labels()
+
+	@property
+	def series_thumbnails(self):
+
+		"""
+		desc:
+			Indicates whether cells of a SeriesColumn are shown as sparklines,
+			which is the default, or as a summary of the shape, mean,
+			minimum, and maximum of the series. The summary is also shown as
+			the tooltip of a sparkline, and is what is searched and copied.
+		"""
+
+		return self._spreadsheet.delegate.thumbnail is not None
+
+	@series_thumbnails.setter
+	def series_thumbnails(self, series_thumbnails):
+
+		self._spreadsheet.delegate.thumbnail = \
+			self._spreadsheet._thumbnail if series_thumbnails else None
+		self._spreadsheet.viewport().update()
+
+	@property
+	def prefetch_columns(self):
+
+		"""
+		desc:
+			The number of columns to the left and the right of the view that
+			are formatted, and whose widths are estimated, before they come
+			into view. This takes effect the next time that the table is
+			scrolled or refreshed.
+		"""
+
+		return self._spreadsheet.prefetch_columns
+
+	@prefetch_columns.setter
+	def prefetch_columns(self, prefetch_columns):
+
+		self._spreadsheet.prefetch_columns = prefetch_columns
+
+	@property
+	def notify_interval(self):
+
+		"""
+		desc:
+			The number of milliseconds during which changes are collected
+			before `cellschanged` and `changeset` are emitted. The interval
+			restarts with every change. With an interval of 0, changes are
+			emitted once control returns to the event loop.
+		"""
+
+		return self._notify_timer.interval()
+
+	@notify_interval.setter
+	def notify_interval(self, notify_interval):
+
+		self._notify_timer.setInterval(notify_interval)
+
+	@property
+	def tail_interval(self):
+
+		"""
+		desc:
+			The minimum number of milliseconds between two updates of the
+			table while rows are appended with append_rows(). The actual
+			interval becomes longer when appending rows takes a long time.
+		"""
+
+		return self._tail_interval
+
+	@tail_interval.setter
+	def tail_interval(self, tail_interval):
+
+		self._tail_interval = tail_interval
+
+	@property
+	def profiling(self):
+
+		"""
+		desc:
+			Determines whether the durations of operations are recorded, so
+			that they can be inspected with stats(). Profiling is disabled by
+			default.
+		"""
+
+		return self._spreadsheet._profiler.enabled
+
+	@profiling.setter
+	def profiling(self, profiling):
+
+		self._spreadsheet._profiler.enabled = profiling
+		self._update_stats_timer()
+
+	@property
+	def stats_interval(self):
+
+		"""
+		desc:
+			The number of milliseconds between emissions of `statsupdated`
+			while profiling is enabled, or 0 to not emit `statsupdated`.
+			Every emission is also logged to the `qdatamatrix` logger at the
+			DEBUG level.
+		"""
+
+		return self._stats_interval
+
+	@stats_interval.setter
+	def stats_interval(self, stats_interval):
+
+		self._stats_interval = stats_interval
+		self._stats_timer.setInterval(stats_interval)
+		self._update_stats_timer()
+
+	def stats(self):
+
+		"""
+		desc:
+			Gives the statistics that have been collected while profiling was
+			enabled.
+
+		returns:
+			desc:	A dict with a `timings` dict, which maps operation names
+					onto dicts with the number of `calls`, and the `total`
+					and `max` durations in seconds, and a `counters` dict with
+					the number of `items_created`, and the number of
+					`undo_actions` and `undo_bytes` that have been recorded.
+					Operations whose names start with `@` give the time spent
+					by decorators, excluding the decorated functions.
+			type:	dict
+		"""
+
+		return self._spreadsheet._profiler.stats()
+
+	def reset_stats(self):
+
+		"""
+		desc:
+			Discards the statistics that have been collected so far.
+		"""
+
+		self._spreadsheet._profiler.reset()
+
+	def sort(self, names=None, reverse=False):
+
+		"""
+		desc:
+			Shows the rows sorted by one or more columns, without changing
+			the DataMatrix. The sort is stable, so that rows with equal values
+			keep their order. Numbers come before text, and missing values
+			(NaN, None, and empty strings) come last. Rows whose values are
+			edited through the widget move to their new position.
+
+		keywords:
+			names:
+				desc:	A column name or a list of column names, where the
+						first column is sorted first, or None to show the rows
+						in their original order.
+				type:	[str, list, None]
+			reverse:
+				desc:	Indicates whether columns are sorted in descending
+						order, either for all columns or as a list with one
+						value per column.
+				type:	[bool, list]
+		"""
+
+		if names is None:
+			names = []
+		elif isinstance(names, basestring):
+			names = [names]
+		if isinstance(reverse, bool):
+			reverse = [reverse] * len(names)
+		if len(reverse) != len(names):
+			raise ValueError(u'reverse should have one value per column')
+		for name in names:
+			if not isinstance(self._dm[name],
+					(IntColumn, FloatColumn, MixedColumn)):
+				raise ValueError(u'Cannot sort by column %s' % name)
+		self._spreadsheet._row_index.sort_keys = list(zip(names, reverse))
+		self._spreadsheet.refresh()
+
+	def filter(self, predicate=None):
+
+		"""
+		desc:
+			Shows only the rows that pass a predicate, without changing the
+			DataMatrix. The predicate is applied to the entire DataMatrix at
+			once. Rows whose values are edited through the widget are shown
+			or hidden accordingly, by applying the predicate to a DataMatrix
+			with only the edited rows, so it should decide for every row on
+			its own. Rows that are added by editing the table are always
+			shown.
+
+			For example, `lambda dm: dm.rt.array > 500` gives an array of
+			booleans, and `lambda dm: dm.rt > 500` gives a selection of rows.
+
+		keywords:
+			predicate:
+				desc:	A function that receives the DataMatrix, and returns
+						either a sequence of booleans, one for every row, or a
+						DataMatrix with the rows that should be shown. None
+						shows all rows.
+				type:	[callable, None]
+		"""
+
+		self._spreadsheet._row_index.predicate = predicate
+		self._spreadsheet.refresh()
+
+	@property
+	def row_index(self):
+
+		"""
+		desc:
+			The row indices of the DataMatrix in the order in which they are
+			shown, or None if the rows are neither sorted nor filtered.
+		"""
+
+		index = self._spreadsheet._row_index.index
+		return None if index is None else index.copy()
+
+	def selected_rows(self):
+
+		"""
+		desc:
+			Gives the selected rows as intervals, which are determined from
+			the selection ranges rather than from the selected cells, so that
+			the cost doesn't depend on the size of the selection. Rows are
+			numbered in the order in which they are shown; if the rows are
+			sorted or filtered, they can be mapped onto rows of the
+			DataMatrix through `row_index`. The row with the column names is
+			not included.
+
+		returns:
+			desc:	A sorted list of non-overlapping (start, stop) tuples,
+					where stop is not included.
+			type:	list
+		"""
+
+		return self._spreadsheet._selected_row_intervals
+
+	def selected_columns(self):
+
+		"""
+		desc:
+			Gives the selected columns as intervals of column numbers, like
+			selected_rows(). A column counts as selected if at least one of
+			its cells is selected.
+
+		returns:
+			desc:	A sorted list of non-overlapping (start, stop) tuples,
+					where stop is not included.
+			type:	list
+		"""
+
+		return self._spreadsheet._selected_column_intervals
+
+	def find(self, pattern, regex=False, case_sensitive=False):
+
+		"""
+		desc:
+			Finds the cells whose text, as it's shown in the widget, contains
+			a pattern. Cells are found lazily, in the order in which they are
+			shown, so that only the part of the DataMatrix that is needed is
+			searched. The Ctrl+F find bar searches the same way.
+
+		arguments:
+			pattern:
+				desc:	The text or regular expression to search for.
+				type:	str
+
+		keywords:
+			regex:
+				desc:	Indicates whether the pattern is a regular expression.
+				type:	bool
+			case_sensitive:
+				desc:	Indicates whether matching is case sensitive.
+				type:	bool
+
+		returns:
+			desc:	A generator of (row, name) tuples, where row is a row index
+					in the DataMatrix, and name is a column name.
+			type:	generator
+		"""
+
+		spreadsheet = self._spreadsheet
+		compiled = spreadsheet._search_pattern(pattern, regex, case_sensitive)
+		columns = self._dm.columns
+		for rownr, colnr in spreadsheet._search.hits(columns,
+				spreadsheet._view_length, compiled,
+				case_sensitive=case_sensitive):
+			yield spreadsheet._dm_row(rownr), columns[colnr][0]
+
+	@contextlib.contextmanager
+	def batch_update(self):
+
+		"""
+		desc:
+			A context manager for making many changes through the widget at
+			once, for example by setting the text of items or the data of the
+			table model. Within the block:
+
+			- all changes are recorded in a single undo action;
+			- the widget is not repainted, and the cursor position and the
+			  column widths are not updated;
+			- no signals are emitted.
+
+			When the block ends, the widget is repainted once, and `changed`,
+			`cellschanged`, and `changeset` are emitted once for all changes.
+			Batch updates can be nested, in which case this happens when the
+			outermost block ends.
+
+		example: |
+			with qdm.batch_update():
+				for rownr in range(1, 1001):
+					model.setData(model.index(rownr, 0), u'%d' % rownr)
+		"""
+
+		spreadsheet = self._spreadsheet
+		outermost = not spreadsheet._batch_depth
+		if outermost:
+			blocked = self.blockSignals(True)
+		spreadsheet._begin_batch()
+		try:
+			yield
+		finally:
+			spreadsheet._end_batch()
+			if outermost:
+				self.blockSignals(blocked)
+				if self._changes:
+					self.changed.emit()
+				self._emit_changes()
+
+	def append_rows(self, dm):
+
+		"""
+		desc:
+			Appends the rows of a DataMatrix to the end of the associated
+			DataMatrix, for example while data is being streamed in. Rows are
+			collected and appended to the DataMatrix and the table together
+			at most once per `tail_interval`, and only the new rows are
+			repainted, without resetting the viewport. If `follow_tail` is
+			True, the table scrolls down to show the last row.
+
+			Values are matched with columns by name, as when DataMatrix
+			objects are stacked with `<<`. Columns that don't exist yet are
+			added, and cells of columns that a DataMatrix doesn't have are
+			left empty. If columns are added, or if series become deeper, the
+			table is refreshed completely.
+			The appended rows are not recorded in the undo history, and don't
+			cause `changed`, `cellschanged`, or `changeset` to be emitted.
+
+		arguments:
+			dm:
+				desc:	The rows to append.
+				type:	DataMatrix
+
+		example: |
+			qdm.follow_tail = True
+			for chunk in stream:
+				qdm.append_rows(chunk)
+		"""
+
+		if isinstance(self._dm, DataSource):
+			raise TypeError(u'Cannot append rows to a DataSource')
+		if not len(dm):
+			return
+		self._pending_rows.append(dm)
+		if not self._tail_timer.isActive():
+			self._tail_timer.start(max(self._tail_interval,
+				int(1000 * self._tail_duration / TAIL_LOAD)))
+
+	def submit(self, name, rows, values):
+
+		"""
+		desc:
+			Changes cells of the associated DataMatrix. Unlike everything else,
+			this can be called from any thread, for example from worker
+			threads that compute results. Changes are queued, and applied in
+			the GUI thread in the order in which they were submitted, in
+			batches that take at most a few milliseconds per event-loop turn.
+			Only the changed cells are repainted.
+
+			Values are passed to the DataMatrix as they are, so sequences of
+			values should not be changed after they have been submitted.
+			Changes that fail, for example because a column doesn't exist,
+			are logged as warnings to the `qdatamatrix` logger. Changes are
+			not recorded in the undo history, and don't cause `changed`,
+			`cellschanged`, or `changeset` to be emitted.
+
+		arguments:
+			name:
+				desc:	The column name.
+				type:	str
+			rows:
+				desc:	A row index, a slice, or a sequence of row indices of
+						the DataMatrix.
+				type:	[int, slice, list]
+			values:
+				desc:	A single value for all rows, or a sequence with one
+						value per row.
+
+		example: |
+			def worker(qdm, rownr):
+				qdm.submit('result', rownr, compute(rownr))
+		"""
+
+		if isinstance(self._dm, DataSource):
+			raise TypeError(u'Cannot change a DataSource')
+		self._submit_queue.submit(name, rows, values)
+
+	def submit_usage(self):
+
+		"""
+		desc:
+			Gives information about the changes that have been submitted with
+			submit().
+
+		returns:
+			desc:	A dict with the number of changes that are waiting to be
+					applied (`pending`), that have been `submitted`,
+					`applied`, or that have `failed`, and the `mean_latency`,
+					`max_latency`, and `last_latency` in seconds between
+					submitting and applying a change (None if no change has
+					been applied yet).
+			type:	dict
+		"""
+
+		return self._submit_queue.usage()
+
+	def set_number_format(self, precision=None, nan_text=u'nan',
+		inf_text=u'inf'):
+
+		"""
+		desc:
+			Changes how numbers are displayed, and refreshes the widget, as
+			well as other widgets that show the same DataMatrix. This doesn't
+			affect the DataMatrix itself.
+
+		keywords:
+			precision:
+				desc:	The number of decimals of floats, or None to show floats
+						in their shortest exact representation.
+				type:	[int, None]
+			nan_text:
+				desc:	The text for NaN values.
+				type:	str
+			inf_text:
+				desc:	The text for infinite values. Negative infinity is
+						prefixed with a minus sign.
+				type:	str
+		"""
+
+		spreadsheet = self._spreadsheet
+		formatter = spreadsheet._document.formatter
+		formatter.precision = precision
+		formatter.nan_text = nan_text
+		formatter.inf_text = inf_text
+		spreadsheet.refresh()
+		spreadsheet._document.structure_changed(spreadsheet)
+
+	def undo_usage(self):
+
+		"""
+		desc:
+			Gives information about the size of the undo history.
+
+		returns:
+			desc:	A dict with the number of undo actions (`entries`), the
+					number of actions that have been spilled to disk
+					(`spilled`), and the estimated number of bytes in memory
+					(`memory_bytes`) and on disk (`disk_bytes`).
+			type:	dict
+		"""
+
+		undo_stack = self._spreadsheet._undo_stack
+		return {
+			u'entries': len(undo_stack),
+			u'spilled': undo_stack.spilled_count,
+			u'memory_bytes': undo_stack.memory_usage,
+			u'disk_bytes': undo_stack.disk_usage
+		}
 
 	def refresh(self):
 
 		"""
 		desc:
 			Refresh the widget to reflect changes in the associated
-			`DataMatrix`.
+			`DataMatrix`. Only the parts of the DataMatrix that have changed
+			since the previous refresh are repainted, unless the structure of
+			the DataMatrix (its length or columns) has changed.
+
+			To find the changes, every block of rows of every column is
+			hashed, which takes time in proportion to the size of the
+			DataMatrix, even if nothing has changed. If you know which
+			columns or rows have changed, refresh_columns() and
+			refresh_rows() are faster.
 		"""
 
-		self._spreadsheet.refresh()
+		self._spreadsheet.refresh_changed()
+
+	def refresh_columns(self, names):
+
+		"""
+		desc:
+			Refresh the widget to reflect changes in specific columns of the
+			associated `DataMatrix`.
+
+		arguments:
+			names:
+				desc:	A list of column names.
+				type:	list
+		"""
+
+		self._spreadsheet.refresh_columns(names)
+
+	def refresh_rows(self, rows):
+
+		"""
+		desc:
+			Refresh the widget to reflect changes in specific rows of the
+			associated `DataMatrix`.
+
+		arguments:
+			rows:
+				desc:	A slice of row indices, or an iterable of row indices,
+						in which case all rows from the first to the last
+						index are refreshed.
+				type:	[slice, iterable]
+		"""
+
+		if isinstance(rows, slice):
+			start, stop, step = rows.indices(len(self._dm))
+		else:
+			rows = list(rows)
+			if not rows:
+				return
+			start, stop = min(rows), max(rows) + 1
+		self._spreadsheet.refresh_rows(start, stop)
+
+	def _update_stats_timer(self):
+
+		if self.profiling and self._stats_interval > 0:
+			self._stats_timer.start()
+		else:
+			self._stats_timer.stop()
+
+	def _emit_stats(self):
+
+		# Nothing is emitted while nothing happens
+		stats = self.stats()
+		if stats == self._last_stats:
+			return
+		self._last_stats = stats
+		logger.debug(u'qdatamatrix statistics:\n%s'
+			% self._spreadsheet._profiler.report())
+		self.statsupdated.emit(stats)
+
+	def _init_source(self, dm):
+
+		"""
+		desc:
+			Prepares for showing a DataMatrix or DataSource. Rows are added
+			periodically to DataSource objects that are still being indexed.
+		"""
+
+		dm.sorted = False
+		self._source_length = len(dm)
+		self._source_timer.stop()
+		if isinstance(dm, DataSource) and not dm.complete:
+			self._source_timer.start()
+
+	def _poll_source(self):
+
+		if not isinstance(self._dm, DataSource):
+			self._source_timer.stop()
+			return
+		if self._dm.complete:
+			self._source_timer.stop()
+			if self._dm.error is not None:
+				logger.warning(u'failed to index data source: %s'
+					% self._dm.error)
+				self.sourcefailed.emit(self._dm.error)
+		old_length = self._source_length
+		self._source_length = len(self._dm)
+		if self._source_length != old_length:
+			self._spreadsheet._rows_appended(old_length)
+
+	def _flush_rows(self):
+
+		"""
+		desc:
+			Appends the rows that have been collected by append_rows() to the
+			DataMatrix, and updates the table. The DataMatrix is extended only
+			once for all rows, because extending a DataMatrix takes time in
+			proportion to its length. The time that this takes determines how
+			long the next rows are collected, so that the cost per row remains
+			constant as the DataMatrix grows.
+		"""
+
+		chunks = self._pending_rows
+		self._pending_rows = []
+		if not chunks:
+			return
+		t0 = time.time()
+		dm = self._dm
+		old_length = len(dm)
+		structure_changed = False
+		for chunk in chunks:
+			for name, col in chunk.columns:
+				if name not in dm:
+					dm[name] = empty_column(dm, col)
+					structure_changed = True
+				# Series become as deep as the deepest chunk
+				elif is_series(col) and col.depth > dm[name].depth:
+					dm[name].depth = col.depth
+					structure_changed = True
+		dm.length = old_length + sum(len(chunk) for chunk in chunks)
+		# Series are padded with zeros when a DataMatrix becomes longer, but
+		# with NaN values when DataMatrix objects are stacked. This matters
+		# for rows of chunks that don't have the column.
+		for name, col in dm.columns:
+			if is_series(col) and getattr(col, u'defaultnan', False):
+				col[old_length:] = np.nan
+		start = old_length
+		for chunk in chunks:
+			stop = start + len(chunk)
+			for name, col in chunk.columns:
+				if is_series(col) and col.depth < dm[name].depth:
+					dm[name][start:stop, :col.depth] = col._seq
+				else:
+					dm[name][start:stop] = col._seq
+			start = stop
+		spreadsheet = self._spreadsheet
+		if structure_changed:
+			spreadsheet.refresh()
+			spreadsheet._document.structure_changed(spreadsheet)
+		else:
+			spreadsheet._rows_appended(old_length)
+			spreadsheet._document.rows_appended(spreadsheet, old_length)
+		if self.follow_tail:
+			spreadsheet._scroll_to_tail()
+		self._tail_duration = time.time() - t0
+
+	def _schedule_changes(self):
+
+		# Changes that are made during a batch update are emitted at the end
+		if not self._spreadsheet._batch_depth:
+			self._notify_timer.start()
+
+	def _emit_changes(self):
+
+		"""
+		desc:
+			Emits `cellschanged` and `changeset` for all changes that have
+			been collected. If the structure of the DataMatrix has changed,
+			`cellschanged` covers the entire DataMatrix.
+		"""
+
+		if self._spreadsheet._batch_depth:
+			return
+		self._notify_timer.stop()
+		changes = self._changes
+		self._changes = ChangeSet()
+		if not changes:
+			return
+		if changes.reset:
+			changes.top, changes.left = 0, 0
+			changes.bottom = len(self._dm)
+			changes.right = max(0, len(self._dm.columns) - 1)
+		self.cellschanged.emit(changes.top, changes.left, changes.bottom,
+			changes.right)
+		self.changeset.emit(changes)
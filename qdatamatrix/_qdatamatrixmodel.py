@@ -0,0 +1,229 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from datamatrix.py3compat import *
+from qdatamatrix._qcell import shared_style, cell_style
+from qdatamatrix._formatting import BLOCK_SIZE, is_series
+from qtpy.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+STYLE_ROLES = Qt.BackgroundRole, Qt.ForegroundRole, Qt.FontRole, \
+	Qt.TextAlignmentRole
+
+
+class QDataMatrixModel(QAbstractTableModel):
+
+	"""
+	desc:
+		A table model that answers data requests directly from the columns of
+		a DataMatrix, without creating an item for every cell. The layout
+		matches that of QSpreadSheet: the first row contains the column names,
+		and the following rows contain the cells.
+	"""
+
+	def __init__(self, spreadsheet):
+
+		QAbstractTableModel.__init__(self, spreadsheet)
+		self._spreadsheet = spreadsheet
+		self._rowcount = 0
+		self._colcount = 0
+
+	@property
+	def dm(self):
+
+		return self._spreadsheet.dm
+
+	def refresh(self):
+
+		"""
+		desc:
+			Resets the model so that it reflects the current state of the
+			DataMatrix.
+		"""
+
+		self.beginResetModel()
+		self._rowcount, self._colcount = self._spreadsheet._table_size()
+		self.endResetModel()
+
+	def sync_size(self):
+
+		"""
+		desc:
+			Updates the model after rows or columns have been added to or
+			removed from the DataMatrix, without resetting the model.
+		"""
+
+		rowcount, colcount = self._spreadsheet._table_size()
+		if rowcount > self._rowcount:
+			self.beginInsertRows(QModelIndex(), self._rowcount, rowcount - 1)
+			self._rowcount = rowcount
+			self.endInsertRows()
+		elif rowcount < self._rowcount:
+			self.beginRemoveRows(QModelIndex(), rowcount, self._rowcount - 1)
+			self._rowcount = rowcount
+			self.endRemoveRows()
+		if colcount > self._colcount:
+			self.beginInsertColumns(QModelIndex(), self._colcount,
+				colcount - 1)
+			self._colcount = colcount
+			self.endInsertColumns()
+		elif colcount < self._colcount:
+			self.beginRemoveColumns(QModelIndex(), colcount,
+				self._colcount - 1)
+			self._colcount = colcount
+			self.endRemoveColumns()
+
+	def cells_changed(self, top, left, bottom, right):
+
+		"""
+		desc:
+			Notifies attached views that a block of cells has changed.
+
+		arguments:
+			top:	The first row.
+			left:	The first column.
+			bottom:	The last row.
+			right:	The last column.
+		"""
+
+		self.dataChanged.emit(self.index(top, left),
+			self.index(bottom, right))
+
+	def text(self, rownr, colnr):
+
+		"""
+		desc:
+			Gives the display text of a cell.
+
+		returns:
+			desc:	The display text, or None for cells that fall outside of
+					the DataMatrix.
+			type:	[str, None]
+		"""
+
+		if colnr >= self._spreadsheet._column_count or \
+				rownr > self._spreadsheet._view_length:
+			return None
+		name, col = self._spreadsheet._column(colnr)
+		if rownr == 0:
+			return name
+		return self._spreadsheet._formatter.text(name, col, rownr - 1)
+
+	def display_text(self, rownr, colnr):
+
+		"""
+		desc:
+			Gives the display text of a cell, like text(), except that cells
+			that cannot be formatted within the time budget of the current
+			paint event are formatted in the background.
+
+		returns:
+			desc:	The display text, or None for cells that fall outside of
+					the DataMatrix or that are formatted in the background.
+			type:	[str, None]
+		"""
+
+		if rownr == 0 or colnr >= self._spreadsheet._column_count or \
+				rownr > self._spreadsheet._view_length:
+			return self.text(rownr, colnr)
+		name, col = self._spreadsheet._column(colnr)
+		blocknr = (rownr - 1) // BLOCK_SIZE
+		format_pool = self._spreadsheet._format_pool
+		if self._spreadsheet._formatter.is_cached(name, blocknr) or \
+				format_pool.in_budget():
+			return self.text(rownr, colnr)
+		format_pool.request(name, col, blocknr)
+		return None
+
+	# Overridden functions
+
+	def rowCount(self, parent=QModelIndex()):
+
+		if parent.isValid():
+			return 0
+		return self._rowcount
+
+	def columnCount(self, parent=QModelIndex()):
+
+		if parent.isValid():
+			return 0
+		return self._colcount
+
+	def flags(self, index):
+
+		flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+		if self._spreadsheet.read_only:
+			return flags
+		# Series cells show a summary, which cannot be edited
+		colnr = index.column()
+		if index.row() > 0 and colnr < self._spreadsheet._column_count and \
+				is_series(self._spreadsheet._column(colnr)[1]):
+			return flags
+		return flags | Qt.ItemIsEditable
+
+	def data(self, index, role=Qt.DisplayRole):
+
+		if not index.isValid():
+			return None
+		rownr = index.row()
+		colnr = index.column()
+		if role == Qt.DisplayRole:
+			return self.display_text(rownr, colnr)
+		if role == Qt.EditRole:
+			return self.text(rownr, colnr)
+		spreadsheet = self._spreadsheet
+		if role not in STYLE_ROLES or colnr >= spreadsheet._column_count or \
+				rownr > spreadsheet._view_length:
+			return None
+		background, foreground, font, alignment = shared_style(
+			self._style(rownr, colnr))
+		if role == Qt.BackgroundRole:
+			return background
+		if role == Qt.ForegroundRole:
+			return foreground
+		if role == Qt.FontRole:
+			return font
+		return int(alignment)
+
+	def setData(self, index, value, role=Qt.EditRole):
+
+		if role != Qt.EditRole or not index.isValid() or \
+				self._spreadsheet.read_only:
+			return False
+		self._spreadsheet._set_value(index.row(), index.column(),
+			safe_decode(value))
+		return True
+
+	def headerData(self, section, orientation, role=Qt.DisplayRole):
+
+		if role != Qt.DisplayRole:
+			return None
+		if orientation == Qt.Horizontal:
+			if section < self._spreadsheet._column_count:
+				return self._spreadsheet._column_names[section]
+			return None
+		return self._spreadsheet._row_label(section)
+
+	# Private functions
+
+	def _style(self, rownr, colnr):
+
+		if rownr == 0:
+			return u'header'
+		name, col = self._spreadsheet._column(colnr)
+		return cell_style(col, col[self._spreadsheet._dm_row(rownr - 1)])
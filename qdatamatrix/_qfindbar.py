@@ -0,0 +1,203 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from datamatrix.py3compat import *
+from qdatamatrix.translate import _
+from qtpy import QtWidgets, QtGui, QtCore
+import re
+
+
+class QFindBar(QtWidgets.QWidget):
+
+	"""
+	desc:
+		A bar below the spreadsheet for finding text. It's shown with Ctrl+F.
+		Enter jumps to the next match, Shift+Enter to the previous match, and
+		Escape hides the bar.
+
+		Matches are taken one at a time from a lazy iterator, which is kept as
+		long as the pattern, the options, and the DataMatrix don't change,
+		and the cursor stays on the last match.
+	"""
+
+	def __init__(self, spreadsheet, parent=None):
+
+		QtWidgets.QWidget.__init__(self, parent=parent)
+		self._spreadsheet = spreadsheet
+		self._hits = None
+		self._hits_key = None
+		self._last_hit = None
+		self._edit = QtWidgets.QLineEdit(self)
+		self._edit.setPlaceholderText(_(u'Find'))
+		self._edit.textChanged.connect(self._on_options_changed)
+		self._edit.installEventFilter(self)
+		self._regex_checkbox = QtWidgets.QCheckBox(_(u'Regular expression'),
+			self)
+		self._regex_checkbox.toggled.connect(self._on_options_changed)
+		self._case_checkbox = QtWidgets.QCheckBox(_(u'Match case'), self)
+		self._case_checkbox.toggled.connect(self._on_options_changed)
+		self._message = QtWidgets.QLabel(self)
+		previous_button = QtWidgets.QPushButton(
+			QtGui.QIcon.fromTheme(u'go-up'), _(u'Previous'), self)
+		previous_button.clicked.connect(self.find_previous)
+		next_button = QtWidgets.QPushButton(
+			QtGui.QIcon.fromTheme(u'go-down'), _(u'Next'), self)
+		next_button.clicked.connect(self.find_next)
+		close_button = QtWidgets.QPushButton(
+			QtGui.QIcon.fromTheme(u'window-close'), u'', self)
+		close_button.setFlat(True)
+		close_button.clicked.connect(self.hide)
+		layout = QtWidgets.QHBoxLayout(self)
+		layout.setContentsMargins(4, 2, 4, 2)
+		layout.addWidget(self._edit)
+		layout.addWidget(previous_button)
+		layout.addWidget(next_button)
+		layout.addWidget(self._regex_checkbox)
+		layout.addWidget(self._case_checkbox)
+		layout.addWidget(self._message)
+		layout.addStretch()
+		layout.addWidget(close_button)
+		self.hide()
+
+	@property
+	def pattern(self):
+
+		return self._edit.text()
+
+	def activate(self):
+
+		"""
+		desc:
+			Shows the bar and gives focus to the search field.
+		"""
+
+		self.show()
+		self._edit.setFocus()
+		self._edit.selectAll()
+		self._update_highlight()
+
+	def find_next(self):
+
+		self._find(backwards=False)
+
+	def find_previous(self):
+
+		self._find(backwards=True)
+
+	# Overridden functions
+
+	def hideEvent(self, e):
+
+		self._spreadsheet._set_highlight(None)
+		QtWidgets.QWidget.hideEvent(self, e)
+
+	def eventFilter(self, obj, e):
+
+		if e.type() != QtCore.QEvent.KeyPress:
+			return False
+		if e.key() in (QtCore.Qt.Key_Return, QtCore.Qt.Key_Enter):
+			if e.modifiers() & QtCore.Qt.ShiftModifier:
+				self.find_previous()
+			else:
+				self.find_next()
+			return True
+		if e.key() == QtCore.Qt.Key_Escape:
+			self.hide()
+			self._spreadsheet.setFocus()
+			return True
+		return False
+
+	# Private functions
+
+	def _regex(self):
+
+		"""
+		returns:
+			desc:	The compiled pattern, or None if there is no pattern or if
+					the pattern is not a valid regular expression.
+			type:	[RegexObject, None]
+		"""
+
+		if not self.pattern:
+			self._message.setText(u'')
+			return None
+		try:
+			regex = self._spreadsheet._search_pattern(self.pattern,
+				self._regex_checkbox.isChecked(),
+				self._case_checkbox.isChecked())
+		except re.error:
+			self._message.setText(_(u'Invalid regular expression'))
+			return None
+		self._message.setText(u'')
+		return regex
+
+	def _on_options_changed(self):
+
+		self._hits = None
+		self._update_highlight()
+
+	def _update_highlight(self):
+
+		regex = self._regex()
+		self._spreadsheet._set_highlight(regex,
+			self._case_checkbox.isChecked())
+
+	def _find(self, backwards):
+
+		regex = self._regex()
+		if regex is None:
+			return
+		hit = self._next_hit(regex, backwards)
+		if hit is None:
+			self._message.setText(_(u'No matches'))
+			return
+		self._last_hit = hit
+		self._spreadsheet._jump_to(*hit)
+
+	def _next_hit(self, regex, backwards):
+
+		"""
+		desc:
+			Gives the next match. A new iterator is started from the cursor
+			position if the pattern, the options, or the DataMatrix have
+			changed, if the cursor has been moved away from the last match,
+			or if the previous iterator is exhausted.
+
+		returns:
+			desc:	A (row, column) tuple of a table cell, or None if nothing
+					matches.
+			type:	[tuple, None]
+		"""
+
+		spreadsheet = self._spreadsheet
+		key = regex.pattern, regex.flags, backwards, \
+			spreadsheet._formatter.version
+		if self._hits is None or key != self._hits_key or \
+				spreadsheet._cursor_pos != self._last_hit:
+			self._hits = None
+		for attempt in range(2):
+			if self._hits is None:
+				self._hits = spreadsheet._search_hits(regex,
+					self._case_checkbox.isChecked(), backwards)
+				self._hits_key = key
+			try:
+				return next(self._hits)
+			except StopIteration:
+				self._hits = None
+		return None
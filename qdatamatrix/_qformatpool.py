@@ -0,0 +1,185 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from datamatrix.py3compat import *
+from qtpy.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal
+from collections import deque
+import time
+
+# The number of seconds per event-loop turn during which blocks are formatted
+# in the GUI thread. Blocks that are needed after this are formatted in the
+# background.
+SYNC_BUDGET = .008
+
+
+class FormatTask(QRunnable):
+
+	"""
+	desc:
+		Formats a single block of a column in a worker thread, including the
+		thumbnails of series cells.
+	"""
+
+	def __init__(self, pool, name, col, blocknr, token):
+
+		QRunnable.__init__(self)
+		self._pool = pool
+		self._generation = pool.generation
+		self._name = name
+		self._col = col
+		self._blocknr = blocknr
+		self._token = token
+
+	def run(self):
+
+		if self._generation != self._pool.generation:
+			return
+		try:
+			texts, thumbnails = self._pool.formatter.format_block(self._col,
+				self._blocknr)
+			self._pool._result.emit(self._generation, self._name,
+				self._blocknr, self._token, texts, thumbnails)
+		except Exception:
+			# The column may have been changed or removed, or the pool may
+			# have been destroyed, while the block was formatted. The block
+			# will then be requested again when it's needed.
+			pass
+
+
+class QFormatPool(QObject):
+
+	"""
+	desc:
+		Formats blocks of columns in a thread pool, so that loading a large
+		DataMatrix doesn't block the GUI. Formatted blocks are handed back to
+		the GUI thread through a queued signal, where they are added to the
+		cache of the DisplayFormatter.
+
+		Blocks are formatted in the GUI thread until the time budget of the
+		current event-loop turn, which is started with start_budget(), has
+		been used up. Blocks that are requested after that are announced with
+		`formatted` in later event-loop turns, as many per turn as the budget
+		allows, so that showing the blocks doesn't block the GUI either.
+	"""
+
+	formatted = Signal(object, int)
+	_result = Signal(int, object, int, int, object, object)
+
+	def __init__(self, formatter, parent=None):
+
+		QObject.__init__(self, parent)
+		self.formatter = formatter
+		self.generation = 0
+		self._deadline = 0
+		self._pool = QThreadPool(self)
+		self._result.connect(self._on_result)
+		self._ready = deque()
+		self._ready_keys = set()
+		self._flush_timer = QTimer(self)
+		self._flush_timer.setSingleShot(True)
+		self._flush_timer.setInterval(0)
+		self._flush_timer.timeout.connect(self._flush)
+
+	def start_budget(self):
+
+		"""
+		desc:
+			Starts the time budget for formatting blocks in the GUI thread.
+		"""
+
+		self._deadline = time.time() + SYNC_BUDGET
+
+	def in_budget(self):
+
+		"""
+		returns:
+			desc:	True if there's time left to format blocks in the GUI
+					thread.
+			type:	bool
+		"""
+
+		return time.time() < self._deadline
+
+	def request(self, name, col, blocknr):
+
+		"""
+		desc:
+			Starts formatting a block in the background, unless it's already
+			being formatted. Blocks that have already been formatted are
+			announced in a later event-loop turn.
+
+		arguments:
+			name:
+				desc:	The column name.
+				type:	str
+			col:
+				type:	BaseColumn
+			blocknr:
+				type:	int
+		"""
+
+		if self.formatter.is_cached(name, blocknr):
+			self._announce(name, blocknr)
+			return
+		token = self.formatter.begin(name, blocknr)
+		if token is not None:
+			self._pool.start(FormatTask(self, name, col, blocknr, token))
+
+	def cancel(self):
+
+		"""
+		desc:
+			Cancels all blocks that are being formatted. Blocks that have not
+			started yet are removed from the queue, and the results of blocks
+			that are being formatted are discarded.
+		"""
+
+		self.generation += 1
+		self._pool.clear()
+		self._flush_timer.stop()
+		self._ready.clear()
+		self._ready_keys.clear()
+		self.formatter.clear()
+
+	def _on_result(self, generation, name, blocknr, token, texts, thumbnails):
+
+		if generation != self.generation:
+			return
+		if self.formatter.store(name, blocknr, token, texts, thumbnails):
+			self._announce(name, blocknr)
+
+	def _announce(self, name, blocknr):
+
+		key = name, blocknr
+		if key in self._ready_keys:
+			return
+		self._ready_keys.add(key)
+		self._ready.append(key)
+		if not self._flush_timer.isActive():
+			self._flush_timer.start()
+
+	def _flush(self):
+
+		self.start_budget()
+		while self._ready and self.in_budget():
+			key = self._ready.popleft()
+			self._ready_keys.discard(key)
+			self.formatted.emit(*key)
+		if self._ready:
+			self._flush_timer.start()
@@ -0,0 +1,99 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from datamatrix.py3compat import *
+from qtpy.QtWidgets import QHeaderView, QStyle, QStyleOptionHeader
+from qtpy.QtCore import Qt, QSize, QModelIndex
+
+
+class QRowHeader(QHeaderView):
+
+	"""
+	desc:
+		A vertical header that asks the spreadsheet for the label of a row when
+		the row is painted, so that no labels need to be created in advance.
+		This replaces the labels of the table model, which for a QTableWidget
+		would otherwise need to be set for all rows at once.
+	"""
+
+	def __init__(self, spreadsheet):
+
+		QHeaderView.__init__(self, Qt.Vertical, spreadsheet)
+		self._spreadsheet = spreadsheet
+		self.setSectionsClickable(True)
+		self.setHighlightSections(True)
+
+	def _has_dm(self):
+
+		# When the widgets are garbage collected, or when Python shuts down,
+		# the attributes of the header and the spreadsheet may be cleared
+		# before the widgets themselves are destroyed
+		spreadsheet = getattr(self, u'_spreadsheet', None)
+		qdm = getattr(spreadsheet, u'_qdm', None)
+		return qdm is not None and getattr(qdm, u'dm', None) is not None
+
+	def _style_option(self, section):
+
+		opt = QStyleOptionHeader()
+		self.initStyleOption(opt)
+		opt.section = section
+		# The header may be resized while the QDataMatrix is being destroyed,
+		# when the DataMatrix is no longer available
+		if self._has_dm():
+			opt.text = self._spreadsheet._row_label(section)
+		else:
+			opt.text = u''
+		opt.textAlignment = Qt.AlignCenter
+		return opt
+
+	# Overridden functions
+
+	def paintSection(self, painter, rect, section):
+
+		if not rect.isValid():
+			return
+		opt = self._style_option(section)
+		opt.rect = rect
+		if self.isEnabled():
+			opt.state |= QStyle.State_Enabled
+		selection_model = self.selectionModel()
+		if self.highlightSections() and selection_model is not None and \
+				selection_model.rowIntersectsSelection(section, QModelIndex()):
+			opt.state |= QStyle.State_On
+		self.style().drawControl(QStyle.CE_Header, opt, painter, self)
+
+	def sizeHint(self):
+
+		# QHeaderView only looks at the first and last sections, which doesn't
+		# include the widest label when the table is padded with empty rows.
+		size = QHeaderView.sizeHint(self)
+		# The header is hidden while the widget is destroyed, in which case
+		# the DataMatrix may no longer be available.
+		if not self.isVisible():
+			return size
+		rownr = self._spreadsheet._view_length
+		if rownr:
+			size.setWidth(max(size.width(),
+				self.sectionSizeFromContents(rownr).width()))
+		return size
+
+	def sectionSizeFromContents(self, section):
+
+		return self.style().sizeFromContents(QStyle.CT_HeaderSection,
+			self._style_option(section), QSize(), self)
@@ -18,101 +18,85 @@ along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 from datamatrix.py3compat import *
-from qdatamatrix.decorators import undoable, disconnected, fix_cursor, silent
-from qdatamatrix._qcell import QCell
-from qdatamatrix._qcelldelegate import QCellDelegate
-from qtpy import QtWidgets, QtGui, QtCore
-import re
+from qdatamatrix.decorators import undoable, disconnected, fix_cursor, \
+	silent, profiled
+from qdatamatrix._qcell import QCell, column_style, value_style, cell_style
+from qdatamatrix._qspreadsheetbase import QSpreadSheetBase, MAX_COL_WIDTH, \
+	MARGIN
+from qdatamatrix._paste import valid_name
+from qtpy import QtWidgets, QtCore
+from collections import OrderedDict
 
-EMPTY_STR = u'__empty__'
-MAX_COL_WIDTH = 300
-MARGIN = 30
+PREFETCH_ROWS = 50
+CACHED_ROWS = 1000
+CACHED_COLUMNS = 100
 
-class QSpreadSheet(QtWidgets.QTableWidget):
+
+class QSpreadSheet(QSpreadSheetBase, QtWidgets.QTableWidget):
 
 	"""
 	desc:
 		QSpreadSheet implements the table/ spreadsheet of a QDataMatrix. It's
 		created automatically by QDataMatrix.
+
+		Only the rows that are in view, plus `prefetch_rows` rows above and
+		below, are filled with items. Filled rows are kept in a cache of
+		`cached_rows` rows, from which the least recently viewed rows are
+		evicted.
+
+		Columns are filled in the same way, with `prefetch_columns` columns
+		to the left and right, and a cache of `cached_columns` columns, so
+		that wide DataMatrix objects are filled only where they are viewed.
+		Items exist for every cell in a filled row and a filled column, and
+		for the column names of filled columns.
 	"""
 
 	def __init__(self, qdm=None, read_only=False):
 
 		QtWidgets.QTableWidget.__init__(self, parent=qdm)
-		self._qdm = qdm
-		self._undo_stack = []
-		self._in_undo_action = False
-		self._auto_update = True
-		self._silent = False
-		self.read_only = read_only
-		self._shortcut(u'Ctrl+Z', self._undo)
-		self._shortcut(u'Ctrl+C', self._copy)
-		self._shortcut(u'Ctrl+V', self._paste)
-		self._shortcut(u'Ctrl+X', self._cut)
-		# self._shortcut(u'Ctrl+P', self._print)
-		self._shortcut(u'Del', self._delete)
-		# The cell delegate captures left/ right keypresses so that these
-		# immediately move the cursor
-		self.delegate = QCellDelegate(self)
-		self.delegate.move.connect(self._move)
-		self.setItemDelegate(self.delegate)
+		self.prefetch_rows = PREFETCH_ROWS
+		self.cached_rows = CACHED_ROWS
+		self.cached_columns = CACHED_COLUMNS
+		self._filled_rows = OrderedDict()
+		self._filled_columns = OrderedDict()
+		self._init_spreadsheet(qdm, read_only)
 		# The custom cell object is necessary for styling
 		self.setItemPrototype(QCell())
-		self.horizontalHeader().hide()
-		self.cellChanged.connect(self._on_cell_changed)
-		self.setVerticalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOn)
-		self.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOn)
-		# Regular expression to catch all newline varieties of various OS's
-		self.newlines_re = re.compile(r'(\r\n|\r|\n)')
-
-	def _print(self):
-
-		print(self.dm)
-
-	def _shortcut(self, keyseq, target):
-
-		QtWidgets.QShortcut(QtGui.QKeySequence(keyseq), self, target,
-			context=QtCore.Qt.WidgetWithChildrenShortcut)
-
-	@property
-	def _column_names(self):
-
-		"""
-		desc:
-			Gives a non-sorted representation of the columns.
-		"""
-
-		return [column_name for column_name, column in self.dm.columns]
-
-	@property
-	def dm(self):
-
-		return self._qdm.dm
-
-	@dm.setter
-	def dm(self, dm):
-
-		self._qdm.dm = dm
+		self.cellChanged.connect(self._cell_changed)
 
+	@profiled
 	@silent
 	@fix_cursor
 	@disconnected
 	def refresh(self):
 
 		self.clear()
+		self._format_pool.cancel()
+		self._column_index.invalidate()
+		self._update_row_index()
 		self._adjust_size()
-		self._last_visible_row = 0
-		for colnr, (name, col) in enumerate(self.dm.columns):
-			self._setcell(0, colnr, name)
+		self._filled_rows = OrderedDict()
+		self._filled_columns = OrderedDict()
+		self._estimate_column_widths()
 		self._fill_visible_cells()
 			
+	@profiled
 	@silent
 	@fix_cursor
 	@disconnected
 	def verticalScrollbarValueChanged(self, pos):
 		
 		self._fill_visible_cells()
+
+	@profiled
+	@silent
+	@fix_cursor
+	@disconnected
+	def horizontalScrollbarValueChanged(self, pos):
+
+		self._fill_visible_cells()
 	
+	@profiled
 	@silent
 	@fix_cursor
 	@disconnected
@@ -120,6 +104,7 @@ class QSpreadSheet(QtWidgets.QTableWidget):
 		
 		self._fill_visible_cells()
 
+	@profiled
 	@silent
 	@fix_cursor
 	@disconnected
@@ -127,44 +112,155 @@ class QSpreadSheet(QtWidgets.QTableWidget):
 		
 		self._fill_visible_cells()
 			
-	def _fill_visible_cells(self, fill_all=False):
+	def _visible_rows(self):
 
-		if self._last_visible_row == len(self.dm):
-			return
-		# For performance reasons we don't initialize read-tables completely.
-		# This makes it possible to view very larges data structures.
-		last_row = len(self.dm) if fill_all else min(
-			len(self.dm),
-			self.rowAt(self.height())
-		)
+		"""
+		desc:
+			Determines which rows of the DataMatrix are currently in view.
+
+		returns:
+			desc:	A (first, last) tuple, where last is not included.
+			type:	tuple
+		"""
+
+		first = max(0, self.rowAt(0) - 1)
+		last = self.rowAt(self.height())
 		# rowAt() will return -1 when there is no row at that location. This
 		# appears to happen when the last visible row is outside of the dm, and
-		# then we just fall back to showing all rows.
-		if last_row < 0:
-			last_row = len(self.dm)
-		for colnr, (name, col) in enumerate(self.dm.columns):
-			for rownr in range(self._last_visible_row, last_row):
-				val = col[rownr]
-				self._setcell(rownr + 1, colnr, val)
+		# then we just fall back to showing all rows until the end.
+		if last < 0:
+			last = self._view_length
+		return first, min(self._view_length, last)
+
+	@profiled
+	def _fill_visible_cells(self):
+
+		# For performance reasons we don't initialize tables completely. Rather
+		# we only fill the rows and columns that are in view, plus a margin,
+		# and evict rows and columns that haven't been in view for a while.
+		# This makes it possible to view very large data structures.
+		self._estimate_visible_column_widths()
+		first, last = self._visible_rows()
+		first = max(0, first - self.prefetch_rows)
+		last = min(self._view_length, last + self.prefetch_rows)
+		left, right = self._visible_columns()
+		rows = [
+			rownr for rownr in range(first, last)
+			if rownr not in self._filled_rows
+		]
+		colnrs = [
+			colnr for colnr in range(left, right)
+			if colnr not in self._filled_columns
+		]
+		# New columns are filled for the rows that were already filled, and
+		# new rows are filled for all filled columns, including the new ones
+		old_rows = list(self._filled_rows)
+		for rownr in range(first, last):
+			self._filled_rows[rownr] = True
+			self._filled_rows.move_to_end(rownr)
+		for colnr in range(left, right):
+			self._filled_columns[colnr] = True
+			self._filled_columns.move_to_end(colnr)
+		if colnrs:
+			self._fill_cells(old_rows, colnrs, header=True)
+		if rows:
+			self._fill_cells(rows, list(self._filled_columns))
+		self._evict_rows(max(self.cached_rows, last - first))
+		self._evict_columns(max(self.cached_columns, right - left))
+
+	def _fill_cells(self, rows, colnrs, header=False):
+
+		"""
+		desc:
+			Fills the cells where rows and columns cross.
+
+		arguments:
+			rows:
+				desc:	Rows in the table, minus one.
+				type:	list
+			colnrs:
+				type:	list
+
+		keywords:
+			header:
+				desc:	Indicates whether the column names are filled as well.
+				type:	bool
+		"""
+
+		self._format_pool.start_budget()
+		for colnr in colnrs:
+			name, col = self._column(colnr)
+			if header:
+				self._setcell(0, colnr, name)
+			# The style is determined once for the entire column, except
+			# for columns that contain both numbers and text
+			style = column_style(col)
+			# Rows that are formatted in the background are filled when
+			# they are ready
+			column_rows = self._available_rows(name, col, rows)
+			texts = self._formatter.texts(name, col, column_rows)
+			for rownr, text in zip(column_rows, texts):
+				self._setcell(rownr + 1, colnr, text,
+					value_style(col[self._dm_row(rownr)]) if style is None
+				else style)
 			self._optimize_column_width(colnr)
-		self._last_visible_row = last_row
 
-	# Overridden functions
+	def _evict_rows(self, max_rows):
+
+		"""
+		desc:
+			Removes the items of the least recently viewed rows until the
+			cache contains no more than a maximum number of rows. The values
+			are safe in the DataMatrix, and rows are filled again when they
+			come back into view.
+
+		arguments:
+			max_rows:
+				desc:	The maximum number of rows to keep.
+				type:	int
+		"""
+
+		if len(self._filled_rows) <= max_rows:
+			return
+		colnrs = list(self._filled_columns)
+		while len(self._filled_rows) > max_rows:
+			rownr, _ = self._filled_rows.popitem(last=False)
+			for colnr in colnrs:
+				self.takeItem(rownr + 1, colnr)
 
-	def contextMenuEvent(self, e):
+	def _evict_columns(self, max_columns):
 
 		"""
 		desc:
-			Shows a context menu.
+			Removes the items of the least recently viewed columns, including
+			the column names, like _evict_rows().
 
 		arguments:
-			e:
-				type:	QContextMenuEvent
+			max_columns:
+				desc:	The maximum number of columns to keep.
+				type:	int
 		"""
 
-		from qdatamatrix._qcontextmenu import QContextMenu
-		QContextMenu(self).exec_(e.globalPos())
+		if len(self._filled_columns) <= max_columns:
+			return
+		rows = list(self._filled_rows)
+		while len(self._filled_columns) > max_columns:
+			colnr, _ = self._filled_columns.popitem(last=False)
+			self.takeItem(0, colnr)
+			for rownr in rows:
+				self.takeItem(rownr + 1, colnr)
+
+	@profiled
+	@silent
+	@fix_cursor
+	@disconnected
+	def _rows_appended(self, old_length):
+
+		QSpreadSheetBase._rows_appended(self, old_length)
+		# Appended rows that are in view are filled right away
+		self._fill_visible_cells()
 
+	@profiled
 	@silent
 	@fix_cursor
 	@disconnected
@@ -175,10 +271,9 @@ class QSpreadSheet(QtWidgets.QTableWidget):
 			Selects all existing cells.
 		"""
 		
-		self._fill_visible_cells(fill_all=True)
 		self.setRangeSelected(
 			QtWidgets.QTableWidgetSelectionRange(
-				0, 0, len(self.dm), len(self.dm.columns) - 1
+				0, 0, self._view_length, self._column_count - 1
 			),
 			True
 		)
@@ -187,359 +282,206 @@ class QSpreadSheet(QtWidgets.QTableWidget):
 
 	def _adjust_size(self):
 		
-		if self.read_only:
-			self.setColumnCount(len(self.dm.columns))
-			self.setRowCount(len(self.dm) + 1)
-		else:
-			self.setColumnCount((1+(len(self.dm.columns)+50) // 100) * 100)
-			self.setRowCount(1 + (1+(len(self.dm)+50) // 100) * 100)
-		self.setVerticalHeaderLabels([u'']+ \
-			[str(i) for i in range(1, len(self.dm)+1)]+ \
-			[u'']*(self.rowCount()-len(self.dm)-1))
-
-	def _move(self, drow, dcol):
-
-		"""
-		desc:
-			Move the cursor, i.e. the selected cell.
-
-		arguments:
-			dRow:
-				desc:	The number of rows to move.
-				type:	int
-			dCol:
-				desc:	The number of columns to move.
-				type:	int
-		"""
-
-		row = max(0, self.currentRow()+drow)
-		col = max(0, self.currentColumn()+dcol)
-		self.setCurrentCell(row, col)
-
-	@property
-	def _selected_columns(self):
-
-		return sorted(set([i.column() for i in self.selectedIndexes() \
-			if i.column() < len(self.dm.columns)]))
-
-	@property
-	def _selected_rows(self):
-
-		return sorted(set([i.row()-1 for i in self.selectedIndexes() \
-			if i.row() > 0 and i.row() <= len(self.dm)]))
-
-	@property
-	def _clipboard(self):
-		return QtWidgets.QApplication.clipboard()
-
-	@property
-	def _cursor_pos(self):
-
-		return self.currentRow(), self.currentColumn()
-
-	@_cursor_pos.setter
-	def _cursor_pos(self, pos):
-
-		selection_ranges = self.selectedRanges()
-		self.setCurrentCell(pos[0], pos[1])
-		for selection_range in selection_ranges:
-			self.setRangeSelected(selection_range, True)
-
-	def _column_by_index(self, colnr):
-
-		return self.dm.columns[colnr][1]
+		rowcount, colcount = self._table_size()
+		self.setColumnCount(colcount)
+		self.setRowCount(rowcount)
 
 	def _add_columns(self, colnr):
 
-		for i in range(len(self.dm.columns), colnr+1):
-			self.dm[self._unique_name] = u''
+		# New columns are filled for the filled rows only
+		for i in range(self._column_count, colnr+1):
+			self._dm_add_column()
+			self._filled_columns[i] = True
 			item = self.item(0, i)
 			if item is None:
 				self._setcell(0, i, self._column_names[i])
-			for rownr in range(1, len(self.dm)+1):
-				item = self.item(rownr, i)
+			for rownr in self._filled_rows:
+				item = self.item(rownr + 1, i)
 				if item is None:
-					self._setcell(rownr, i)
+					self._setcell(rownr + 1, i, style=u'text')
 		self._adjust_size()
 
 	def _add_rows(self, rownr):
 
-		for i in range(self.dm.length, rownr+1):
-			for colnr in range(len(self.dm.columns)):
+		for i in range(self._view_length, rownr+1):
+			for colnr in self._filled_columns:
 				item = self.item(i, colnr)
 				if item is None:
-					self._setcell(i, colnr)
-		self.dm.length = rownr
+					self._setcell(i, colnr, style=u'text')
+		for i in range(self._view_length, rownr):
+			self._filled_rows[i] = True
+		self._dm_set_length(rownr)
 		self._adjust_size()
 
-	@undoable
-	def _remove_columns(self):
-
-		for colnr in self._selected_columns[::-1]:
-			del self.dm[self._column_names[colnr]]
-		self.refresh()
-		self._qdm.changed.emit()
-
-	@undoable
-	def _remove_rows(self):
-
-		for row in self._selected_rows[::-1]:
-			del self.dm[row]
-		self.refresh()
-		self._qdm.changed.emit()
-
 	def _rename_column(self, colnr):
 
 		old_name = self._column_names[colnr]
 		new_name = self._value(0, colnr)
 		if old_name == new_name:
 			return
-		if new_name in self.dm.column_names:
+		# Names that are not valid identifiers are rejected, in which case
+		# the column keeps its old name
+		if not valid_name(new_name):
+			self._setcell(0, colnr, old_name)
+			return
+		if new_name in self.dm:
 			new_name = self._unique_name
 			self._setcell(0, colnr, new_name)
-		try:
-			self.dm.rename(old_name, new_name)
-			if not self._silent:
-				self._qdm.changed.emit()
-		except:
-			self._setcell(0, colnr, old_name)
+		self._dm_rename(old_name, new_name)
+		if not self._silent:
+			self._qdm.changed.emit()
 
 	def _change_cell(self, rownr, colnr):
 
-		self._column_by_index(colnr)[rownr-1] = self._value(rownr, colnr)
+		self._dm_setcell(rownr-1, colnr, self._value(rownr, colnr))
 
+	def _cell_changed(self, rownr, colnr):
+
+		# Changes that are made by the spreadsheet itself are ignored. See the
+		# disconnected decorator.
+		if not self._disconnected:
+			self._on_cell_changed(rownr, colnr)
+
+	@profiled
 	@disconnected
 	@undoable
 	def _on_cell_changed(self, rownr, colnr):
 
-		if colnr >= len(self.dm.columns):
+		if colnr >= self._column_count:
 			self._add_columns(colnr)
-		if rownr > len(self.dm):
+		if rownr > self._view_length:
 			self._add_rows(rownr)
 		if rownr == 0:
 			self._rename_column(colnr)
 		else:
 			self._change_cell(rownr, colnr)
-		self.item(rownr, colnr).update_style()
+		item = self.item(rownr, colnr)
+		if rownr == 0:
+			item.style = u'header'
+		else:
+			# The cell shows the value as it has been stored in the DataMatrix
+			name, col = self._column(colnr)
+			item.setText(self._formatter.text(name, col, rownr - 1))
+			item.style = cell_style(col, col[self._dm_row(rownr - 1)])
+		self._column_widths.update(colnr, self._value(rownr, colnr),
+			header=rownr == 0)
 		if not self._silent:
 			self._optimize_column_width(colnr)
 			self._qdm.cellchanged.emit(rownr, colnr)
 			self._qdm.changed.emit()
 
-	def _optimize_column_width(self, colnr):
-
-		self.resizeColumnToContents(colnr)
-		if self.columnWidth(colnr) > MAX_COL_WIDTH:
-			self.setColumnWidth(colnr, MAX_COL_WIDTH)
-		else:
-			self.setColumnWidth(colnr, self.columnWidth(colnr)+MARGIN)
-
-	def _setcell(self, rownr, colnr, val=u''):
-
-		item = self.item(rownr, colnr)
-		if item is None:
-			item = QCell(val)
-			self.setItem(rownr, colnr, item)
-		else:
-			item.setText(safe_decode(val))
-		item.update_style()
-		if self.read_only:
-			item.setFlags(item.flags() ^ QtCore.Qt.ItemIsEditable)
-
-	@property
-	def _unique_name(self):
-
-		i = 1
-		while True:
-			name = u'new_column_%d' % i
-			if name not in self._column_names:
-				return name
-			i += 1
-
-	def _value(self, rownr, colnr):
-
-		return self.item(rownr, colnr).text()
-
-	def _undo(self):
+	def _setcell(self, rownr, colnr, val=u'', style=None):
 
 		"""
 		desc:
-			Reverts to the last state of the undo stack (if any).
-		"""
-
-		self._in_undo_action = True
-		if not self._undo_stack:
-			self._in_undo_action = False
-			return
-		self._cursor_pos, self.dm = self._undo_stack.pop()
-		self._in_undo_action = False
-		self.refresh()
-		self._qdm.changed.emit()
-
-	def _start_undo_action(self):
-
-		"""
-		desc:
-			Starts an undo action.
-		"""
-
-		if self._in_undo_action:
-			return False
-		self._add_undo_history()
-		self._in_undo_action = True
-		return True
-
-	def _end_undo_action(self):
-
-		"""
-		desc:
-			Ends an undo action.
-		"""
-
-		self._in_undo_action = False
-
-	def _clear_undo(self):
-
-		"""
-		desc:
-			Clears the undo stack.
-		"""
-
-		self._undo_stack = []
+			Sets the text of a cell, and creates an item if necessary.
 
-	def _add_undo_history(self):
-
-		"""
-		desc:
-			Adds the current state to the undo stack.
-		"""
-
-		if not self._in_undo_action:
-			dm = self.dm[:]
-			dm.sorted = False
-			self._undo_stack.append((self._cursor_pos, dm))
-
-	@undoable
-	def _cut(self):
+		arguments:
+			rownr:
+				type:	int
+			colnr:
+				type:	int
 
+		keywords:
+			val:
+				desc:	The value.
+			style:
+				desc:	The style of the cell, or None to determine the style
+						from the text. Cells in the first row always have the
+						header style.
+				type:	[str, None]
 		"""
-		desc:
-			Copies the current selection to the clipboard, and then clears the
-			current selection.
-		"""
-
-		self._copy(clear=True)
 
-	@undoable
-	def _delete(self):
+		text = safe_decode(val)
+		if rownr == 0:
+			style = u'header'
+		# The column width is updated first, because setting the text of an
+		# existing item triggers _on_cell_changed()
+		self._column_widths.update(colnr, text, header=rownr == 0)
+		item = self.item(rownr, colnr)
+		if item is None:
+			item = QCell(text, style)
+			if self._profiler.enabled:
+				self._profiler.count(u'items_created')
+			# Series cells show a summary, which cannot be edited
+			if self.read_only or style == u'series':
+				item.setFlags(item.flags() & ~QtCore.Qt.ItemIsEditable)
+			self.setItem(rownr, colnr, item)
+		else:
+			item.setText(text)
+			item.style = style
 
-		"""
-		desc:
-			Clears the current selection.
-		"""
+	def _repaint_cell(self, rownr, colnr, val, style):
 
-		self._copy(clear=True, copy=False)
+		# Cells in rows and columns that aren't filled are updated when they
+		# come into view.
+		if colnr in self._filled_columns and \
+				(rownr == 0 or rownr - 1 in self._filled_rows):
+			self._setcell(rownr, colnr, val, style)
 
+	@profiled
 	@silent
-	def _copy(self, clear=False, copy=True):
+	@disconnected
+	def _repaint_range(self, top, left, bottom, right):
 
 		"""
 		desc:
-			Copies the current selection to the clipboard.
+			Updates the filled cells in a block of the table after the
+			DataMatrix has changed.
 
-		keywords:
-			clear:
-				desc:	Indicates whether copied cells should be cleared.
-				type:	bool
-			copy:
-				desc:	Indicates whether cells should be copied to the
-						clipboard.
-				type:	bool
+		arguments:
+			top:	The first row.
+			left:	The first column.
+			bottom:	The last row.
+			right:	The last column.
 		"""
 
-		# Get the start and end of the selection
-		selection = self.selectedRanges()
-		if not selection:
-			return
-		firstrow = min([r.topRow() for r in selection])
-		firstcolnr = min([r.leftColumn() for r in selection])
-		lastrow = max([r.bottomRow() for r in selection])
-		lastcolnr = max([r.rightColumn() for r in selection])
-		colspan = lastcolnr - firstcolnr + 1
-		rowspan = lastrow - firstrow + 1
-		# Create an empty list of lists, where the value __empty__ indicates
-		# that there's nothing in it (not even an empty string). This allows us
-		# to deal with non-contiguous selections.
-		matrix = []
-		for col in range(rowspan):
-			matrix.append([EMPTY_STR]*colspan)
-		# Add all selected cells.
-		columns_to_optimize = set()
-		for item in self.selectedItems():
-			rownr = self.row(item) - firstrow
-			if rownr > self._last_visible_row:
-				for colnr, (name, col) in enumerate(self.dm.columns):
-					try:
-						self._setcell(rownr + 1, colnr, col[rownr])
-					except IndexError:
-						pass  # Appears to happen in rare conditions
-					columns_to_optimize.add(colnr)
-			colnr = self.column(item) - firstcolnr
-			matrix[rownr][colnr] = item.text()
-			if clear:
-				self._setcell(self.row(item), self.column(item))
-		for colnr in columns_to_optimize:
-			self._optimize_column_width(colnr)
-		if not copy:
-			return
-		# Convert the selection to text and put it on the clipboard
-		txt = u'\n'.join([u'\t'.join(_col) for _col in matrix])
-		self._clipboard.setText(txt)
-		
-	@silent
-	@undoable
-	def _paste(self):
+		if bottom - top < len(self._filled_rows):
+			rows = [
+				rownr for rownr in range(top - 1, bottom)
+				if rownr in self._filled_rows
+			]
+		else:
+			rows = sorted(
+				rownr for rownr in self._filled_rows
+				if top <= rownr + 1 <= bottom
+			)
+		# Rows that have been filtered out are emptied
+		length = self._view_length
+		while rows and rows[-1] >= length:
+			rownr = rows.pop()
+			del self._filled_rows[rownr]
+			for colnr in self._filled_columns:
+				self.takeItem(rownr + 1, colnr)
+		right = min(right, self._column_count - 1)
+		if right - left < len(self._filled_columns):
+			colnrs = [
+				colnr for colnr in range(left, right + 1)
+				if colnr in self._filled_columns
+			]
+		else:
+			colnrs = sorted(
+				colnr for colnr in self._filled_columns
+				if left <= colnr <= right
+			)
+		for colnr in colnrs:
+			name, col = self._column(colnr)
+			if top == 0:
+				self._setcell(0, colnr, name)
+			style = column_style(col)
+			texts = self._formatter.texts(name, col, rows)
+			for rownr, text in zip(rows, texts):
+				self._setcell(rownr + 1, colnr, text,
+					value_style(col[self._dm_row(rownr)]) if style is None
+					else style)
 
-		"""
-		desc:
-			Pastes the current clipboard contents onto the DataFrame.
-		"""
+	def _value(self, rownr, colnr):
 
-		txt = self._clipboard.mimeData().text()
-		rows = self.newlines_re.sub('\n', txt).split(u'\n')
-		changed_columns = set()
-		first_col = self.currentColumn()
-		first_row = self.currentRow()
-		for i, row in enumerate(rows):
-			if not row:  # avoid pasting an empty row at the end
-				continue
-			cells = row.split(u'\t')
-			for j, cell in enumerate(cells):
-				if cell == EMPTY_STR:
-					continue
-				col = first_col + j
-				row = first_row + i
-				if row == 0:
-					# If the column name overlaps with a previous column name,
-					# then we add a suffix to distinguish it.
-					colname = cell
-					colname_suffix = 1
-					while colname in self.dm.column_names[:col]:
-						colname = u'{}_{}'.format(cell, colname_suffix)
-						colname_suffix += 1
-					cell = colname
-					# then we add a suffix to that other column name
-					# If the column name overlaps with a following column name
-					if cell in self.dm.column_names[col + 1:]:
-						conflict_index = self.dm.column_names.index(colname)
-						colname = cell
-						colname_suffix = 1
-						while colname in self.dm.column_names[col + 1:]:
-							colname = u'{}_{}'.format(cell, colname_suffix)
-							colname_suffix += 1
-						self._setcell(row, conflict_index, colname)
-				self._setcell(row, col, cell)
-				changed_columns.add(col)
-		for col in changed_columns:
-			self._optimize_column_width(col)
-		self._qdm.changed.emit()
+		item = self.item(rownr, colnr)
+		if item is not None:
+			return item.text()
+		# The cell may not have been filled yet
+		name, col = self._column(colnr)
+		if rownr == 0:
+			return name
+		return self._formatter.text(name, col, rownr - 1)
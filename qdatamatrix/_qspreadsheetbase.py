@@ -0,0 +1,1709 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from datamatrix.py3compat import *
+from qdatamatrix.decorators import undoable, silent, disconnected, profiled, \
+	editable
+from qdatamatrix._qcelldelegate import QCellDelegate
+from qdatamatrix._qrowheader import QRowHeader
+from qdatamatrix._columnwidths import MAX_COL_WIDTH, MARGIN
+from qdatamatrix._formatting import DisplayFormatter, BLOCK_SIZE, is_series
+from qdatamatrix._snapshot import Snapshot
+from qdatamatrix._qformatpool import QFormatPool
+from qdatamatrix._profiler import Profiler
+from qdatamatrix._rowindex import RowIndex
+from qdatamatrix._search import SearchIndex, compile_pattern
+from qdatamatrix._sources import DataSource
+from qdatamatrix._document import get_document
+from qdatamatrix._selection import selected_intervals, interval_indices, \
+	column_row_intervals
+from qdatamatrix._undo import UndoAction, Rename, AddColumn, \
+	RemoveColumn, SetLength, RemoveRows, SetCells, SetSlice, remove_rows
+from qdatamatrix._paste import parse_tsv, column_runs, unique_name, \
+	valid_name, set_slice
+from qdatamatrix._copy import mime_data, CHUNK_SIZE, MAX_HTML_CELLS
+from datamatrix import IntColumn, FloatColumn, MixedColumn
+from qtpy import QtWidgets, QtGui, QtCore
+import numbers
+import re
+
+EMPTY_STR = u'__empty__'
+# Row labels that don't refer to a column
+ROW_NUMBERS = u'numbers'
+ROW_IDS = u'rowids'
+# The factor by which the number of rows of an editable table grows
+ROW_GROWTH = 1.5
+# The number of columns to the left and right of the view that are treated as
+# being in view
+PREFETCH_COLUMNS = 10
+
+
+def row_range(rows, length):
+
+	"""
+	desc:
+		Determines the range of rows that is covered by a row index, a slice,
+		or a sequence of row indices.
+
+	arguments:
+		rows:
+			type:	[int, slice, iterable]
+		length:
+			desc:	The length of the DataMatrix.
+			type:	int
+
+	returns:
+		desc:	A (start, stop) tuple.
+		type:	tuple
+	"""
+
+	if isinstance(rows, numbers.Integral):
+		rownr = int(rows) % length
+		return rownr, rownr + 1
+	if isinstance(rows, slice):
+		rows = range(*rows.indices(length))
+		if not rows:
+			return 0, 0
+		return min(rows[0], rows[-1]), max(rows[0], rows[-1]) + 1
+	rows = [int(rownr) % length for rownr in rows]
+	if not rows:
+		return 0, 0
+	return min(rows), max(rows) + 1
+
+
+class QSpreadSheetBase(object):
+
+	"""
+	desc:
+		Functionality that is shared by the item-based QSpreadSheet and the
+		model-based QSpreadSheetView. Subclasses should also derive from
+		QTableView (or QTableWidget), and provide the QTableWidget-style
+		cursor and selection functions, as well as refresh(), _setcell(),
+		_value(), _add_columns(), _add_rows(), _repaint_cell() and
+		_repaint_range().
+	"""
+
+	def _init_spreadsheet(self, qdm, read_only):
+
+		self._qdm = qdm
+		self._profiler = Profiler()
+		self._undo_action = None
+		self._in_undo_action = False
+		self._auto_update = True
+		self._silent = False
+		self._disconnected = False
+		self._batch_depth = 0
+		self._batch_state = None
+		self._batch_columns = None
+		self.read_only = read_only
+		self.prefetch_columns = PREFETCH_COLUMNS
+		self._estimated_columns = set()
+		self._row_labels = ROW_NUMBERS
+		self._row_index = RowIndex()
+		self._snapshot = None
+		# The formatter, format pool, and search index of sorted and filtered
+		# tables, which are created when they're first needed
+		self._own_formatter = None
+		self._own_format_pool = None
+		self._own_search = None
+		self._document = None
+		self._set_document(qdm.dm)
+		# Tables are refreshed once control returns to the event loop when
+		# the DataMatrix has been changed through another widget
+		self._refresh_timer = QtCore.QTimer(self)
+		self._refresh_timer.setSingleShot(True)
+		self._refresh_timer.setInterval(0)
+		self._refresh_timer.timeout.connect(self.refresh)
+		self._shortcut(u'Ctrl+Z', self._undo)
+		self._shortcut(u'Ctrl+C', self._copy)
+		self._shortcut(u'Ctrl+V', self._paste)
+		self._shortcut(u'Ctrl+X', self._cut)
+		# self._shortcut(u'Ctrl+P', self._print)
+		self._shortcut(u'Del', self._delete)
+		self._shortcut(u'Ctrl+F', self._find)
+		# The cell delegate captures left/ right keypresses so that these
+		# immediately move the cursor
+		self.delegate = QCellDelegate(self)
+		self.delegate.move.connect(self._move)
+		self.delegate.thumbnail = self._thumbnail
+		self.setItemDelegate(self.delegate)
+		self.horizontalHeader().hide()
+		self.setVerticalHeader(QRowHeader(self))
+		self.setVerticalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOn)
+		self.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOn)
+		# Regular expression to catch all newline varieties of various OS's
+		self.newlines_re = re.compile(r'(\r\n|\r|\n)')
+
+	def _print(self):
+
+		print(self.dm)
+
+	def _shortcut(self, keyseq, target):
+
+		QtWidgets.QShortcut(QtGui.QKeySequence(keyseq), self, target,
+			context=QtCore.Qt.WidgetWithChildrenShortcut)
+
+	# Columns are resolved through the column index, so that looking up a
+	# column by number or by name doesn't depend on the number of columns.
+
+	@property
+	def _column_names(self):
+
+		"""
+		desc:
+			Gives a non-sorted representation of the columns. The list should
+			not be modified.
+		"""
+
+		return self._column_index.names(self.dm)
+
+	@property
+	def _column_count(self):
+
+		return self._column_index.count(self.dm)
+
+	def _column(self, colnr):
+
+		"""
+		returns:
+			desc:	A (name, column) tuple, like DataMatrix.columns[colnr].
+			type:	tuple
+		"""
+
+		return self._column_index.column(self.dm, colnr)
+
+	def _colnr(self, name):
+
+		"""
+		returns:
+			desc:	The number of a column, or None if there is no column with
+					this name.
+			type:	[int, None]
+		"""
+
+		return self._column_index.colnr(self.dm, name)
+
+	@property
+	def dm(self):
+
+		return self._qdm.dm
+
+	@dm.setter
+	def dm(self, dm):
+
+		self._qdm.dm = dm
+
+	# Overridden functions
+
+	def contextMenuEvent(self, e):
+
+		"""
+		desc:
+			Shows a context menu.
+
+		arguments:
+			e:
+				type:	QContextMenuEvent
+		"""
+
+		from qdatamatrix._qcontextmenu import QContextMenu
+		QContextMenu(self).exec_(e.globalPos())
+
+	# Private functions
+
+	def _table_size(self):
+
+		"""
+		desc:
+			Determines the number of rows and columns of the table. Editable
+			tables are padded with empty rows and columns, so that the user
+			can extend the DataMatrix by typing into them.
+
+			The number of rows grows geometrically, so that a DataMatrix to
+			which rows are appended continuously is not resized every time.
+			The table shrinks again once it has become too large by the same
+			factor.
+
+		returns:
+			desc:	A (row count, column count) tuple.
+			type:	tuple
+		"""
+
+		if self.read_only:
+			return self._view_length + 1, self._column_count
+		rowcount = 1 + (1+(self._view_length+50) // 100) * 100
+		current = self.model().rowCount()
+		if rowcount <= current <= rowcount * ROW_GROWTH:
+			rowcount = current
+		elif current < rowcount:
+			rowcount = max(rowcount, int(current * ROW_GROWTH))
+		return rowcount, (1+(self._column_count+50) // 100) * 100
+
+	@profiled
+	def refresh_changed(self):
+
+		"""
+		desc:
+			Updates the table after the DataMatrix has been changed outside of
+			the widget. The DataMatrix is compared to a snapshot that was
+			taken during the previous call, and only blocks of rows that
+			have changed are repainted. If the structure of the DataMatrix
+			has changed, or if there is no snapshot yet, the table is
+			refreshed completely.
+
+			Taking a snapshot hashes every block of every column, which takes
+			time in proportion to the size of the DataMatrix. Changes that are
+			made through the widget are applied to the snapshot as they are
+			made, so that they are not repainted again.
+		"""
+
+		# Data sources are not compared to a snapshot, because that would
+		# require reading them entirely
+		if isinstance(self.dm, DataSource):
+			self.refresh()
+			return
+		snapshot = Snapshot(self.dm)
+		changed = None if self._snapshot is None \
+			else self._snapshot.diff(snapshot)
+		self._snapshot = snapshot
+		if changed is None:
+			self.refresh()
+			return
+		if not changed:
+			return
+		# Blocks of the DataMatrix don't correspond to blocks of the table if
+		# rows are sorted or filtered
+		if self._row_index.active:
+			self.refresh()
+			return
+		# Adjacent blocks are repainted together
+		ranges = []
+		for name, blocknr in changed:
+			self._formatter.invalidate(name, blocknr * BLOCK_SIZE)
+			colnr = self._colnr(name)
+			start = blocknr * BLOCK_SIZE
+			stop = min(len(self.dm), start + BLOCK_SIZE)
+			if ranges and ranges[-1][0] == colnr and ranges[-1][2] == start:
+				ranges[-1][2] = stop
+			else:
+				ranges.append([colnr, start, stop])
+		for colnr, start, stop in ranges:
+			self._repaint_range(start + 1, colnr, stop, colnr)
+		self._update_column_widths(set(colnr for colnr, start, stop in ranges))
+		self.verticalHeader().viewport().update()
+
+	def _update_snapshot(self, name, start, stop):
+
+		"""
+		desc:
+			Applies cells that have been changed through this or another
+			widget to the snapshot, if there is one.
+
+		arguments:
+			name:
+				desc:	The column name.
+				type:	str
+			start:
+				desc:	The first row in the DataMatrix.
+				type:	int
+			stop:
+				desc:	The row after the last row in the DataMatrix.
+				type:	int
+		"""
+
+		if self._snapshot is not None:
+			self._snapshot.update(self.dm, name, start, stop)
+
+	def _renew_snapshot(self):
+
+		"""
+		desc:
+			Takes a new snapshot after the structure of the DataMatrix has
+			been changed through this or another widget, if there is a
+			snapshot.
+		"""
+
+		if self._snapshot is not None:
+			self._snapshot = Snapshot(self.dm)
+
+	@profiled
+	def refresh_columns(self, names):
+
+		"""
+		desc:
+			Updates the table after columns of the DataMatrix have been
+			changed outside of the widget, without comparing the DataMatrix
+			to a snapshot.
+
+		arguments:
+			names:
+				desc:	A list of column names.
+				type:	list
+		"""
+
+		colnrs = [self._colnr(name) for name in names]
+		if any(colnr is None or self._row_index.affects(name)
+				for name, colnr in zip(names, colnrs)):
+			self._renew_snapshot()
+			self.refresh()
+			return
+		for name, colnr in zip(names, colnrs):
+			self._update_snapshot(name, 0, len(self.dm))
+			self._formatter.invalidate(name)
+			self._repaint_range(1, colnr, self._view_length, colnr)
+		self._update_column_widths(colnrs)
+
+	@profiled
+	def refresh_rows(self, start, stop):
+
+		"""
+		desc:
+			Updates the table after rows of the DataMatrix have been changed
+			outside of the widget, without comparing the DataMatrix to a
+			snapshot.
+
+		arguments:
+			start:
+				desc:	The first row in the DataMatrix.
+				type:	int
+			stop:
+				desc:	The row after the last row in the DataMatrix.
+				type:	int
+		"""
+
+		stop = min(stop, len(self.dm))
+		if start >= stop or not self._column_count:
+			return
+		for name in self._column_names:
+			self._update_snapshot(name, start, stop)
+		if self._row_index.active:
+			self.refresh()
+			return
+		self._formatter.invalidate_rows(start, stop)
+		self._repaint_range(start + 1, 0, stop, self._column_count - 1)
+		self.verticalHeader().viewport().update()
+
+	@profiled
+	def _apply_changes(self, changes):
+
+		"""
+		desc:
+			Applies changes that have been submitted through
+			QDataMatrix.submit(), and repaints only the blocks of the columns
+			that have changed, also in other widgets that show the same
+			DataMatrix. The changes are not recorded in the undo history.
+
+		arguments:
+			changes:
+				desc:	A list of (name, rows, values) tuples.
+				type:	list
+
+		returns:
+			desc:	A list with one exception for every change that could not
+					be applied, and None for every change that was applied.
+			type:	list
+		"""
+
+		dm = self.dm
+		length = len(dm)
+		errors = []
+		ranges = {}
+		for name, rows, values in changes:
+			try:
+				dm[name][rows] = values
+				start, stop = row_range(rows, length)
+			except Exception as e:
+				errors.append(e)
+				continue
+			errors.append(None)
+			if start >= stop:
+				continue
+			if name in ranges:
+				start = min(start, ranges[name][0])
+				stop = max(stop, ranges[name][1])
+			ranges[name] = start, stop
+		if not ranges:
+			return errors
+		for name, (start, stop) in ranges.items():
+			self._document.cells_changed(self, name, start, stop)
+		if self._row_index.active:
+			self.refresh()
+			return errors
+		colnrs = {name: self._colnr(name) for name in ranges}
+		for name, (start, stop) in ranges.items():
+			self._repaint_range(start + 1, colnrs[name], stop, colnrs[name])
+		self._update_column_widths(colnrs.values())
+		return errors
+
+	def _available_rows(self, name, col, rownrs):
+
+		"""
+		desc:
+			Determines which rows of a column can be shown right away. If the
+			time budget for formatting in the GUI thread has been used up,
+			no rows are available. The blocks that contain the rows are then
+			requested from the format pool, and shown when they're ready.
+
+		arguments:
+			name:
+				desc:	The column name.
+				type:	str
+			col:
+				type:	BaseColumn
+			rownrs:
+				desc:	A list of row indices.
+				type:	list
+
+		returns:
+			desc:	A list of row indices.
+			type:	list
+		"""
+
+		if self._format_pool.in_budget():
+			return rownrs
+		for blocknr in sorted(set(rownr // BLOCK_SIZE for rownr in rownrs)):
+			self._format_pool.request(name, col, blocknr)
+		return []
+
+	@profiled
+	def _on_block_formatted(self, name, blocknr):
+
+		"""
+		desc:
+			Shows a block that has been formatted in the background.
+		"""
+
+		colnr = self._colnr(name)
+		if colnr is None:
+			return
+		start = blocknr * BLOCK_SIZE
+		stop = min(self._view_length, start + BLOCK_SIZE)
+		self._repaint_range(start + 1, colnr, stop, colnr)
+		self._optimize_column_width(colnr)
+
+	def _update_column_widths(self, colnrs):
+
+		for colnr in colnrs:
+			self._estimate_column_width(colnr)
+			self._optimize_column_width(colnr)
+
+	def _row_label(self, rownr):
+
+		"""
+		desc:
+			Gives the label of a row in the vertical header. Labels are
+			determined when they are needed, and are empty for the row with
+			the column names and for padding rows.
+
+		arguments:
+			rownr:
+				desc:	A row in the table.
+				type:	int
+
+		returns:
+			type:	str
+		"""
+
+		if rownr == 0 or rownr > self._view_length:
+			return u''
+		# Row numbers and row ids refer to the DataMatrix, so that sorted and
+		# filtered rows can be recognized
+		dm_rownr = self._dm_row(rownr - 1)
+		# Data sources don't have row ids
+		if self._row_labels == ROW_IDS and \
+				not isinstance(self.dm, DataSource):
+			return str(self.dm._rowid[dm_rownr])
+		if self._row_labels == ROW_NUMBERS or self._row_labels not in self.dm:
+			return str(dm_rownr + 1)
+		return self._formatter.text(self._row_labels,
+			self.dm[self._row_labels], rownr - 1)
+
+	def _rows_appended(self, old_length):
+
+		"""
+		desc:
+			Updates the table after rows have been appended to the DataMatrix
+			(or DataSource) outside of the widget, or through
+			QDataMatrix.append_rows().
+
+		arguments:
+			old_length:
+				desc:	The length of the DataMatrix before rows were
+						appended.
+				type:	int
+		"""
+
+		if self._snapshot is not None:
+			self._snapshot.extend(self.dm, old_length)
+		if self._row_index.active:
+			self.refresh()
+			return
+		length = len(self.dm)
+		if length <= old_length:
+			return
+		# The last block was formatted when it was still shorter
+		self._formatter.invalidate_rows(old_length, length)
+		self._adjust_size()
+		if self._column_count:
+			self._repaint_range(old_length + 1, 0, length,
+				self._column_count - 1)
+		self.verticalHeader().viewport().update()
+
+	def _scroll_to_tail(self):
+
+		"""
+		desc:
+			Scrolls down to the last row of the DataMatrix, without moving the
+			cursor.
+		"""
+
+		# The scroll bar only covers the new rows after the geometry of the
+		# table has been updated, which otherwise happens later
+		self.updateGeometries()
+		self.scrollTo(self.model().index(self._view_length, 0),
+			QtWidgets.QAbstractItemView.PositionAtBottom)
+
+	def _update_row_labels(self):
+
+		"""
+		desc:
+			Repaints the vertical header after the row labels have changed.
+		"""
+
+		self.verticalHeader().headerDataChanged(QtCore.Qt.Vertical, 0,
+			max(0, self.model().rowCount() - 1))
+
+	# Sharing. Widgets that show the same DataMatrix share a document, and
+	# pass changes on to each other through it.
+
+	def _set_document(self, dm):
+
+		"""
+		desc:
+			Attaches the spreadsheet to the document of a DataMatrix. This is
+			done when the spreadsheet is created, and when the DataMatrix is
+			replaced.
+
+		arguments:
+			dm:
+				type:	[DataMatrix, DataSource]
+		"""
+
+		document = get_document(dm, self.font())
+		old_document = self._document
+		if document is old_document:
+			return
+		if old_document is not None:
+			old_document.detach(self)
+			# A new document gets the undo settings of the old one
+			if not document.views:
+				document.undo_stack.budget = old_document.undo_stack.budget
+				document.undo_stack.policy = old_document.undo_stack.policy
+		self._document = document
+		document.attach(self)
+		self._undo_stack = document.undo_stack
+		self._column_widths = document.column_widths
+		self._column_index = document.column_index
+		self._use_formatter()
+
+	def _use_formatter(self):
+
+		"""
+		desc:
+			Selects the shared formatter of the document if the rows are
+			neither sorted nor filtered, and the formatter of the spreadsheet
+			itself otherwise.
+		"""
+
+		document = self._document
+		if not self._row_index.active:
+			if self._own_format_pool is not None:
+				self._own_format_pool.cancel()
+			self._formatter = document.formatter
+			self._format_pool = document.format_pool
+			self._search = document.search
+			return
+		if self._own_formatter is None:
+			self._own_formatter = DisplayFormatter()
+			self._own_format_pool = QFormatPool(self._own_formatter, self)
+			self._own_format_pool.formatted.connect(self._on_block_formatted)
+			self._own_search = SearchIndex(self._own_formatter)
+		for attr in u'precision', u'nan_text', u'inf_text':
+			setattr(self._own_formatter, attr,
+				getattr(document.formatter, attr))
+		self._formatter = self._own_formatter
+		self._format_pool = self._own_format_pool
+		self._search = self._own_search
+
+	def _schedule_refresh(self):
+
+		self._refresh_timer.start()
+
+	def _dm_cells_changed(self, name, start, stop):
+
+		"""
+		desc:
+			Updates the table after cells have been changed through another
+			widget that shows the same DataMatrix. The blocks of the shared
+			formatter have already been invalidated by the document.
+
+		arguments:
+			name:
+				desc:	The column name.
+				type:	str
+			start:
+				desc:	The first row in the DataMatrix.
+				type:	int
+			stop:
+				desc:	The row after the last row in the DataMatrix.
+				type:	int
+		"""
+
+		colnr = self._colnr(name)
+		if colnr is None or self._row_index.affects(name):
+			self._schedule_refresh()
+			return
+		# The changed rows can be anywhere in a sorted or filtered table
+		if self._row_index.active:
+			self._formatter.invalidate(name)
+			start, stop = 0, self._view_length
+		self._repaint_range(start + 1, colnr, stop, colnr)
+		self._optimize_column_width(colnr)
+
+	# Sorting and filtering. Rows of the table are mapped onto rows of the
+	# DataMatrix through the row index.
+
+	@property
+	def _view_length(self):
+
+		"""
+		desc:
+			The number of rows of the DataMatrix that are shown in the table.
+		"""
+
+		return self._row_index.length(self.dm)
+
+	def _dm_row(self, rownr):
+
+		"""
+		arguments:
+			rownr:
+				desc:	A row in the table, minus one.
+				type:	int
+
+		returns:
+			desc:	The corresponding row index in the DataMatrix.
+			type:	int
+		"""
+
+		return self._row_index.dm_row(rownr)
+
+	def _update_row_index(self):
+
+		"""
+		desc:
+			Sorts and filters all rows again. This is done when the table is
+			refreshed.
+		"""
+
+		self._row_index.update(self.dm)
+		self._use_formatter()
+		self._formatter.index = self._row_index.index
+		self._formatter.clear()
+
+	def _sync_row_index(self):
+
+		"""
+		desc:
+			Moves rows whose sort keys or filter values have been changed
+			through the table to their new position, and repaints the rows in
+			between. This is done after every undoable operation, so that
+			rows don't move while an operation is changing them.
+		"""
+
+		changed = self._row_index.sync(self.dm)
+		if changed is None:
+			return
+		first, last = changed
+		self._formatter.index = self._row_index.index
+		self._formatter.invalidate_rows(first, last + 1)
+		self._adjust_size()
+		self._repaint_range(first + 1, 0, last + 1, self._column_count - 1)
+		self.verticalHeader().viewport().update()
+
+	# Searching. Columns are searched through the search index, so that no
+	# cells need to be created, and only cells that are painted are
+	# highlighted.
+
+	def _find(self):
+
+		self._qdm._find_bar.activate()
+
+	def _search_pattern(self, pattern, regex=False, case_sensitive=False):
+
+		return compile_pattern(pattern, regex, case_sensitive)
+
+	def _search_hits(self, regex, case_sensitive=False, backwards=False):
+
+		"""
+		desc:
+			Lazily gives the cells that match a pattern, starting after the
+			cursor and wrapping around.
+
+		arguments:
+			regex:
+				desc:	A pattern as returned by _search_pattern().
+				type:	RegexObject
+
+		keywords:
+			case_sensitive:
+				desc:	The case sensitivity of the pattern.
+				type:	bool
+			backwards:
+				desc:	Indicates whether cells should be given from last to
+						first.
+				type:	bool
+
+		returns:
+			desc:	A generator of (row, column) tuples of table cells.
+			type:	generator
+		"""
+
+		columns = self.dm.columns
+		rownr, colnr = self._cursor_pos
+		rownr = max(-1, min(rownr, self._view_length) - 1)
+		colnr = max(-1, min(colnr, len(columns) - 1))
+		for rownr, colnr in self._search.hits(columns, self._view_length,
+				regex, rownr, colnr, case_sensitive, backwards):
+			yield rownr + 1, colnr
+
+	def _set_highlight(self, regex, case_sensitive=False):
+
+		"""
+		desc:
+			Highlights the cells in view that match a pattern.
+
+		arguments:
+			regex:
+				desc:	A pattern as returned by _search_pattern(), or None to
+						remove the highlighting.
+				type:	[RegexObject, None]
+
+		keywords:
+			case_sensitive:
+				desc:	The case sensitivity of the pattern.
+				type:	bool
+		"""
+
+		if regex is None:
+			self.delegate.highlight = None
+		elif case_sensitive:
+			self.delegate.highlight = lambda text: \
+				regex.search(text) is not None
+		else:
+			self.delegate.highlight = lambda text: \
+				regex.search(text.lower()) is not None
+		self.viewport().update()
+
+	# Series. Cells of a SeriesColumn are painted as thumbnails, which are
+	# formatted along with the summaries of the cells.
+
+	def _series_column(self, rownr, colnr):
+
+		"""
+		desc:
+			Gives the column of a cell if the cell is a series cell. This is
+			checked for every cell that is painted, and should therefore not
+			depend on the number of columns.
+
+		arguments:
+			rownr:
+				type:	int
+			colnr:
+				type:	int
+
+		returns:
+			desc:	A (name, column) tuple, or None if the cell is not a series
+					cell.
+			type:	[tuple, None]
+		"""
+
+		if rownr == 0 or colnr >= self._column_count or \
+				rownr > self._view_length:
+			return None
+		column = self._column(colnr)
+		return column if is_series(column[1]) else None
+
+	def _thumbnail(self, index):
+
+		"""
+		desc:
+			Gives the thumbnail of a series cell. Thumbnails that cannot be
+			formatted within the time budget of the current paint event are
+			formatted in the background, and the cell is painted again when
+			they are ready.
+
+		arguments:
+			index:
+				type:	QModelIndex
+
+		returns:
+			desc:	A thumbnail as returned by DisplayFormatter.thumbnail(), or
+					None if the cell is not a series cell or if the
+					thumbnail is formatted in the background.
+			type:	[ndarray, None]
+		"""
+
+		rownr = index.row()
+		column = self._series_column(rownr, index.column())
+		if column is None:
+			return None
+		name, col = column
+		blocknr = (rownr - 1) // BLOCK_SIZE
+		if not self._formatter.is_cached(name, blocknr) and \
+				not self._format_pool.in_budget():
+			self._format_pool.request(name, col, blocknr)
+			return None
+		return self._formatter.thumbnail(name, col, rownr - 1)
+
+	def _jump_to(self, rownr, colnr):
+
+		self.setCurrentCell(rownr, colnr)
+		self.scrollTo(self.model().index(rownr, colnr))
+
+	def _move(self, drow, dcol):
+
+		"""
+		desc:
+			Move the cursor, i.e. the selected cell.
+
+		arguments:
+			dRow:
+				desc:	The number of rows to move.
+				type:	int
+			dCol:
+				desc:	The number of columns to move.
+				type:	int
+		"""
+
+		row = max(0, self.currentRow()+drow)
+		col = max(0, self.currentColumn()+dcol)
+		self.setCurrentCell(row, col)
+
+	# Selection. Selected rows and columns are determined from the selection
+	# ranges, so that the cost doesn't depend on the number of selected cells.
+
+	@property
+	def _selected_column_intervals(self):
+
+		"""
+		desc:
+			The selected columns as a sorted list of non-overlapping
+			(start, stop) tuples, where stop is not included.
+		"""
+
+		return selected_intervals(self.selectedRanges(), False, 0,
+			self._column_count)
+
+	@property
+	def _selected_row_intervals(self):
+
+		"""
+		desc:
+			The selected rows as a sorted list of non-overlapping (start, stop)
+			tuples, where rows are rows in the table minus one, and stop is
+			not included. The row with the column names is not included.
+		"""
+
+		return selected_intervals(self.selectedRanges(), True, 1,
+			self._view_length)
+
+	@property
+	def _selected_columns(self):
+
+		return interval_indices(self._selected_column_intervals)
+
+	@property
+	def _selected_rows(self):
+
+		return interval_indices(self._selected_row_intervals)
+
+	@property
+	def _clipboard(self):
+		return QtWidgets.QApplication.clipboard()
+
+	@property
+	def _cursor_pos(self):
+
+		return self.currentRow(), self.currentColumn()
+
+	@_cursor_pos.setter
+	def _cursor_pos(self, pos):
+
+		selection_ranges = self.selectedRanges()
+		self.setCurrentCell(pos[0], pos[1])
+		for selection_range in selection_ranges:
+			self.setRangeSelected(selection_range, True)
+
+	def _column_by_index(self, colnr):
+
+		return self._column(colnr)[1]
+
+	@profiled
+	@undoable
+	def _remove_columns(self):
+
+		for colnr in self._selected_columns[::-1]:
+			self._dm_remove_column(colnr)
+		self.refresh()
+		self._qdm.changed.emit()
+
+	@profiled
+	@undoable
+	def _remove_rows(self):
+
+		self._dm_remove_rows(self._selected_rows)
+		self.refresh()
+		self._qdm.changed.emit()
+
+	# DataMatrix modifications. These are recorded in the current undo action.
+
+	def _record_undo(self, command):
+
+		if self._undo_action is not None:
+			self._undo_action.add(command)
+
+	def _dm_setcell(self, rownr, colnr, val):
+
+		"""
+		desc:
+			Changes a single cell of the DataMatrix.
+
+		arguments:
+			rownr:
+				desc:	A row in the table, minus one. If rows are sorted or
+						filtered, this is mapped onto a row index in the
+						DataMatrix.
+				type:	int
+			colnr:
+				type:	int
+			val:
+				desc:	The new value.
+		"""
+
+		name, col = self._column(colnr)
+		dm_rownr = self._dm_row(rownr)
+		old = col[dm_rownr]
+		col[dm_rownr] = val
+		new = col[dm_rownr]
+		rowid = self.dm._rowid[dm_rownr]
+		self._formatter.invalidate(name, rownr)
+		if self._undo_action is not None:
+			self._undo_action.add_cell(name, dm_rownr, rowid, old, new)
+		if self._row_index.affects(name):
+			self._row_index.touch(dm_rownr)
+		self._changed_cells(name, colnr, rownr + 1, rownr + 1, [rowid], [old],
+			[new])
+		self._document.cells_changed(self, name, dm_rownr, dm_rownr + 1)
+
+	def _dm_rename(self, old_name, new_name):
+
+		colnr = self._colnr(old_name)
+		self.dm.rename(old_name, new_name)
+		self._column_index.renamed(self.dm, colnr, new_name)
+		self._row_index.rename(old_name, new_name)
+		self._formatter.clear()
+		self._record_undo(Rename(old_name, new_name))
+		self._changed_structure()
+
+	def _dm_add_column(self):
+
+		name = self._unique_name
+		self.dm[name] = u''
+		self._column_index.added(self.dm, name)
+		self._record_undo(AddColumn(name))
+		self._changed_structure()
+
+	def _dm_setslice(self, rownr, colnr, texts):
+
+		"""
+		desc:
+			Changes a contiguous range of cells in a single column of the
+			DataMatrix.
+
+		arguments:
+			rownr:
+				desc:	The first row in the table, minus one.
+				type:	int
+			colnr:
+				type:	int
+			texts:
+				desc:	The new values.
+				type:	list
+		"""
+
+		name, col = self._column(colnr)
+		# Other columns, such as a SeriesColumn, are changed cell by cell, and
+		# so are sorted or filtered rows, which are not contiguous in the
+		# DataMatrix
+		if self._row_index.active or \
+				not isinstance(col, (MixedColumn, IntColumn, FloatColumn)):
+			for i, text in enumerate(texts):
+				self._dm_setcell(rownr + i, colnr, text)
+			return
+		stop = rownr + len(texts)
+		rowids = self.dm._rowid[rownr:stop]._a
+		old = set_slice(col, rownr, texts)
+		self._record_undo(SetSlice(name, rownr, rowids, old))
+		new = col._seq[rownr:stop]
+		# NumPy arrays are converted so that listeners receive regular values
+		if isinstance(col, (IntColumn, FloatColumn)):
+			old, new = old.tolist(), new.tolist()
+		self._changed_cells(name, colnr, rownr + 1, stop, rowids, old, new)
+		# This also removes the formatted blocks of the range from the cache
+		self._document.cells_changed(self, name, rownr, stop)
+
+	def _dm_extend(self, length, ncols):
+
+		"""
+		desc:
+			Adds rows and columns to the DataMatrix, if necessary.
+
+		arguments:
+			length:
+				desc:	The minimum number of rows in the table, excluding
+						the column names.
+				type:	int
+			ncols:
+				desc:	The minimum number of columns.
+				type:	int
+
+		returns:
+			desc:	True if the DataMatrix has been resized, False otherwise.
+			type:	bool
+		"""
+
+		resized = False
+		while self._column_count < ncols:
+			self._dm_add_column()
+			resized = True
+		if length > self._view_length:
+			self._dm_set_length(length)
+			resized = True
+		return resized
+
+	def _dm_set_length(self, length):
+
+		"""
+		desc:
+			Changes the length of the DataMatrix, such that the table contains
+			a number of rows. If rows are filtered, the DataMatrix is longer
+			than the table.
+
+		arguments:
+			length:
+				desc:	The number of rows in the table, excluding the column
+						names.
+				type:	int
+		"""
+
+		old_length = len(self.dm)
+		old_view_length = self._view_length
+		self._record_undo(SetLength(old_length))
+		self.dm.length = old_length + length - old_view_length
+		self._row_index.extend(old_length, len(self.dm))
+		self._formatter.index = self._row_index.index
+		# The last block was formatted when it was still shorter
+		if length > old_view_length:
+			self._formatter.invalidate_rows(old_view_length, length)
+		self._changed_structure()
+
+	def _dm_remove_column(self, colnr):
+
+		name, col = self._column(colnr)
+		del self.dm[name]
+		self._record_undo(RemoveColumn(name, col, colnr))
+		self._changed_structure()
+
+	def _dm_remove_rows(self, rownrs):
+
+		if not rownrs:
+			return
+		rownrs = sorted(self._dm_row(rownr) for rownr in rownrs)
+		removed = remove_rows(self.dm, rownrs)
+		self._record_undo(RemoveRows(rownrs, removed))
+		self._changed_structure()
+
+	# Change notifications. Changes are collected by QDataMatrix, which emits
+	# them in a single notification.
+
+	def _changed_cells(self, name, colnr, top, bottom, rowids, old, new):
+
+		self._qdm._changes.add_cells(name, colnr, top, bottom, rowids, old,
+			new)
+		self._qdm._schedule_changes()
+
+	def _changed_structure(self):
+
+		self._qdm._changes.reset = True
+		self._qdm._schedule_changes()
+		self._document.structure_changed(self)
+
+	def _changed_by_undo(self, action, ranges):
+
+		"""
+		desc:
+			Adds the changes that were made by undoing an action. Undoing
+			changes to cells swaps their old and new values, and passes the
+			changed rows on to the other spreadsheets. Other actions change the
+			structure of the DataMatrix.
+
+		arguments:
+			action:
+				type:	UndoAction
+			ranges:
+				desc:	The rows that were changed, as returned by
+						UndoAction.undo().
+				type:	[list, None]
+		"""
+
+		if ranges is None:
+			self._changed_structure()
+			return
+		for name, start, stop in ranges:
+			self._document.cells_changed(self, name, start, stop)
+		# Rows of sorted or filtered tables don't correspond to rows of the
+		# DataMatrix, and the old values of pasted ranges aren't kept
+		if self._row_index.active or not all(
+				isinstance(command, SetCells) for command in action.commands):
+			self._qdm._changes.reset = True
+			self._qdm._schedule_changes()
+			return
+		for command in action.commands[::-1]:
+			colnr = self._colnr(command.name)
+			if colnr is None:
+				continue
+			self._changed_cells(command.name, colnr,
+				min(command.rownrs) + 1, max(command.rownrs) + 1,
+				command.rowids[::-1], command.new[::-1], command.old[::-1])
+
+	def _estimate_column_widths(self):
+
+		"""
+		desc:
+			Estimates the widths of the columns in view from a sample of rows,
+			so that columns have a sensible width before all of their cells
+			have been seen. Other columns are estimated when they come into
+			view, so that refreshing doesn't depend on the number of columns.
+		"""
+
+		self._column_widths.reset()
+		self._estimated_columns = set()
+		self._estimate_visible_column_widths()
+
+	def _estimate_column_width(self, colnr):
+
+		name, col = self._column(colnr)
+		self._column_widths.estimate(colnr, name, col,
+			self._formatter.format_value)
+		self._estimated_columns.add(colnr)
+
+	def _estimate_visible_column_widths(self):
+
+		"""
+		desc:
+			Estimates the widths of the columns that have come into view.
+			Columns that have become narrower can bring further columns into
+			view, which are then estimated as well.
+		"""
+
+		while True:
+			first, last = self._visible_columns()
+			colnrs = [
+				colnr for colnr in range(first, last)
+				if colnr not in self._estimated_columns
+			]
+			if not colnrs:
+				return
+			for colnr in colnrs:
+				self._estimate_column_width(colnr)
+				self._optimize_column_width(colnr)
+
+	def _visible_columns(self):
+
+		"""
+		desc:
+			Determines which columns of the DataMatrix are currently in view,
+			plus `prefetch_columns` columns to the left and right.
+
+		returns:
+			desc:	A (first, last) tuple, where last is not included.
+			type:	tuple
+		"""
+
+		count = self._column_count
+		first = max(0, self.columnAt(0))
+		last = self.columnAt(self.viewport().width())
+		# columnAt() returns -1 when there is no column at that location,
+		# which happens when the last column ends inside of the view
+		last = count if last < 0 else last + 1
+		return max(0, first - self.prefetch_columns), \
+			min(count, last + self.prefetch_columns)
+
+	@profiled
+	def _optimize_column_width(self, colnr):
+
+		# During a batch update, columns are optimized once at the end
+		if self._batch_columns is not None:
+			self._batch_columns.add(colnr)
+			return
+		width = self._column_widths.width(colnr)
+		if width is None:
+			return
+		width = max(width, self.horizontalHeader().minimumSectionSize() + MARGIN)
+		if width != self.columnWidth(colnr):
+			self.setColumnWidth(colnr, width)
+
+	@property
+	def _unique_name(self):
+
+		return self._column_index.unique_name(self.dm)
+
+	@profiled
+	def _undo(self):
+
+		"""
+		desc:
+			Reverts the last action on the undo stack (if any). Only the cells
+			that were changed by the action are repainted, unless the action
+			changed the structure of the DataMatrix.
+		"""
+
+		# The undo action of a batch update is still being recorded
+		if not self._undo_stack or self._batch_depth:
+			return
+		self._in_undo_action = True
+		action = self._undo_stack.pop()
+		ranges = None
+		try:
+			ranges = action.undo(self.dm)
+		finally:
+			self._in_undo_action = False
+			# The formatted blocks of changed cells are removed below, but
+			# after a structural change nothing in the cache can be trusted
+			if ranges is None:
+				self._formatter.clear()
+		self._changed_by_undo(action, ranges)
+		self._cursor_pos = action.cursor_pos
+		# Undone cells refer to rows of the DataMatrix, which are sorted and
+		# filtered again by refreshing
+		if ranges is None or self._row_index.active:
+			self.refresh()
+		else:
+			self._repaint_ranges(ranges)
+		self._qdm.changed.emit()
+
+	def _repaint_ranges(self, ranges):
+
+		"""
+		desc:
+			Updates the table for rows that have changed in the DataMatrix.
+
+		arguments:
+			ranges:
+				desc:	A list of (column name, start, stop) tuples of rows of
+						the DataMatrix.
+				type:	list
+		"""
+
+		changed_columns = set()
+		for name, start, stop in ranges:
+			colnr = self._colnr(name)
+			if colnr is None:
+				continue
+			self._repaint_range(start + 1, colnr, stop, colnr)
+			changed_columns.add(colnr)
+		for colnr in changed_columns:
+			self._optimize_column_width(colnr)
+
+	# Batch updates. Operations within a batch share a single undo action, and
+	# the cursor, the column widths, and the viewport are updated once at the
+	# end.
+
+	def _begin_batch(self):
+
+		self._batch_depth += 1
+		if self._batch_depth > 1:
+			return
+		self._batch_state = self._cursor_pos, self._silent, \
+			self._auto_update and self._start_undo_action()
+		self._silent = True
+		self._batch_columns = set()
+		self.setUpdatesEnabled(False)
+
+	@profiled
+	def _end_batch(self):
+
+		self._batch_depth -= 1
+		if self._batch_depth:
+			return
+		cursor_pos, self._silent, undo = self._batch_state
+		self._batch_state = None
+		colnrs = self._batch_columns
+		self._batch_columns = None
+		if undo:
+			self._end_undo_action()
+			self._sync_row_index()
+		self._cursor_pos = cursor_pos
+		for colnr in sorted(colnrs):
+			if colnr < self.model().columnCount():
+				self._optimize_column_width(colnr)
+		# Enabling updates repaints the entire widget once
+		self.setUpdatesEnabled(True)
+
+	def _start_undo_action(self):
+
+		"""
+		desc:
+			Starts an undo action.
+		"""
+
+		if self._in_undo_action:
+			return False
+		self._add_undo_history()
+		self._in_undo_action = True
+		return True
+
+	def _end_undo_action(self):
+
+		"""
+		desc:
+			Ends an undo action, and adds it to the undo stack. Actions that
+			didn't change anything are discarded.
+		"""
+
+		self._in_undo_action = False
+		if self._undo_action is not None and self._undo_action.commands:
+			self._undo_stack.push(self._undo_action)
+			if self._profiler.enabled:
+				self._profiler.count(u'undo_actions')
+				self._profiler.count(u'undo_bytes', self._undo_action.nbytes)
+		self._undo_action = None
+
+	def _clear_undo(self):
+
+		"""
+		desc:
+			Clears the undo stack.
+		"""
+
+		self._undo_stack.clear()
+
+	def _add_undo_history(self):
+
+		"""
+		desc:
+			Starts a new undo action. Subsequent changes to the DataMatrix are
+			recorded in this action.
+		"""
+
+		if not self._in_undo_action:
+			self._undo_action = UndoAction(self._cursor_pos)
+
+	@profiled
+	@silent
+	def _copy(self, clear=False, copy=True):
+
+		"""
+		desc:
+			Copies the current selection to the clipboard.
+
+		keywords:
+			clear:
+				desc:	Indicates whether copied cells should be cleared.
+				type:	bool
+			copy:
+				desc:	Indicates whether cells should be copied to the
+						clipboard.
+				type:	bool
+		"""
+
+		selection = self.selectedRanges()
+		if not selection:
+			return
+		if len(selection) == 1:
+			self._copy_range(selection[0], clear, copy)
+		else:
+			self._copy_cells(selection, clear, copy)
+
+	def _copy_range(self, selection_range, clear, copy):
+
+		"""
+		desc:
+			Copies a rectangular selection. The values are read from the
+			DataMatrix in chunks of rows, so that no items are created, and
+			cleared cells are changed a column slice at a time. Cells that
+			fall outside of the DataMatrix are ignored.
+
+		arguments:
+			selection_range:
+				type:	QTableWidgetSelectionRange
+			clear:
+				type:	bool
+			copy:
+				type:	bool
+		"""
+
+		top = selection_range.topRow()
+		left = selection_range.leftColumn()
+		bottom = min(selection_range.bottomRow(), self._view_length)
+		right = min(selection_range.rightColumn(), self._column_count - 1)
+		if top > bottom or left > right:
+			return
+		if copy:
+			self._clipboard.setMimeData(mime_data(
+				self._range_chunks(top, left, bottom, right),
+				html=(bottom - top + 1) * (right - left + 1) <= MAX_HTML_CELLS
+			))
+		if not clear:
+			return
+		# Column names are not cleared
+		top = max(1, top)
+		if top > bottom:
+			return
+		for colnr in range(left, right + 1):
+			self._dm_setslice(top - 1, colnr, [u''] * (bottom - top + 1))
+		self._repaint_range(top, left, bottom, right)
+		self._qdm.changed.emit()
+
+	def _range_chunks(self, top, left, bottom, right):
+
+		"""
+		desc:
+			Generates the display texts of a block of the table in chunks of
+			rows.
+
+		arguments:
+			top:	The first row.
+			left:	The first column.
+			bottom:	The last row.
+			right:	The last column.
+
+		returns:
+			desc:	A generator of chunks, where each chunk is a list of
+					columns, and each column is a list of strings. Columns
+					are formatted a chunk at a time, rather than cell by
+					cell.
+			type:	generator
+		"""
+
+		columns = self._column_index.columns(self.dm, left, right + 1)
+		if top == 0:
+			yield [[name] for name, col in columns]
+			top = 1
+		for start in range(top - 1, bottom, CHUNK_SIZE):
+			stop = min(bottom, start + CHUNK_SIZE)
+			yield [
+				self._formatter.range_texts(col, start, stop)
+				for name, col in columns
+			]
+
+	def _copy_cells(self, selection, clear, copy):
+
+		"""
+		desc:
+			Copies a selection that consists of multiple ranges. The block
+			that encloses all ranges is copied in the same way as a single
+			range, with placeholders for the cells that are not selected, so
+			that pasting it leaves those cells unchanged. Cleared cells are
+			changed a column slice at a time.
+
+		arguments:
+			selection:
+				desc:	A list of QTableWidgetSelectionRange objects.
+				type:	list
+			clear:
+				type:	bool
+			copy:
+				type:	bool
+		"""
+
+		intervals = column_row_intervals(selection, self._view_length + 1,
+			self._column_count)
+		if not intervals:
+			return
+		top = min(rows[0][0] for rows in intervals.values())
+		bottom = max(rows[-1][1] for rows in intervals.values()) - 1
+		left = min(intervals)
+		right = max(intervals)
+		if copy:
+			self._clipboard.setMimeData(mime_data(
+				self._cells_chunks(intervals, top, left, bottom, right),
+				html=(bottom - top + 1) * (right - left + 1) <= MAX_HTML_CELLS,
+				placeholder=EMPTY_STR
+			))
+		if not clear:
+			return
+		# Column names are not cleared
+		for colnr, rows in intervals.items():
+			for start, stop in rows:
+				start = max(1, start)
+				if start < stop:
+					self._dm_setslice(start - 1, colnr, [u''] * (stop - start))
+		if bottom >= 1:
+			self._repaint_range(max(1, top), left, bottom, right)
+		self._qdm.changed.emit()
+
+	def _cells_chunks(self, intervals, top, left, bottom, right):
+
+		"""
+		desc:
+			Generates the display texts of the selected cells in a block of
+			the table in chunks of rows, like _range_chunks(). Cells that are
+			not selected are EMPTY_STR.
+
+		arguments:
+			intervals:
+				desc:	The selected rows of each column, as returned by
+						column_row_intervals().
+				type:	dict
+			top:	The first row.
+			left:	The first column.
+			bottom:	The last row.
+			right:	The last column.
+
+		returns:
+			type:	generator
+		"""
+
+		columns = self._column_index.columns(self.dm, left, right + 1)
+		for start in range(top, bottom + 1, CHUNK_SIZE):
+			stop = min(bottom + 1, start + CHUNK_SIZE)
+			chunk = []
+			for colnr, (name, col) in enumerate(columns, left):
+				texts = [EMPTY_STR] * (stop - start)
+				for first, last in intervals.get(colnr, []):
+					first = max(first, start)
+					last = min(last, stop)
+					if first == 0 and last > 0:
+						texts[0] = name
+						first = 1
+					if first < last:
+						texts[first - start:last - start] = \
+							self._formatter.range_texts(col, first - 1,
+							last - 1)
+				chunk.append(texts)
+			yield chunk
+
+	@profiled
+	@editable
+	@undoable
+	def _cut(self):
+
+		"""
+		desc:
+			Copies the current selection to the clipboard, and then clears the
+			current selection.
+		"""
+
+		self._copy(clear=True)
+
+	@profiled
+	@editable
+	@undoable
+	def _delete(self):
+
+		"""
+		desc:
+			Clears the current selection.
+		"""
+
+		self._copy(clear=True, copy=False)
+
+	@profiled
+	@editable
+	@silent
+	@undoable
+	def _paste(self):
+
+		"""
+		desc:
+			Pastes the current clipboard contents onto the DataFrame. The
+			clipboard is parsed once, the DataMatrix is resized once, and each
+			column is assigned in contiguous slices, rather than cell by cell.
+		"""
+
+		txt = self._clipboard.mimeData().text()
+		rows = parse_tsv(self.newlines_re.sub(u'\n', txt))
+		if not rows:
+			return
+		first_row = self.currentRow()
+		first_col = self.currentColumn()
+		ncols = max(len(row) for row in rows if row is not None)
+		last_row = first_row + len(rows) - 1
+		last_col = first_col + ncols - 1
+		resized = self._dm_extend(last_row, last_col + 1)
+		if first_row == 0:
+			if rows[0] is not None:
+				self._paste_column_names(first_col, rows[0])
+			rows = rows[1:]
+			first_row = 1
+		for j in range(ncols):
+			for i, texts in column_runs(rows, j, EMPTY_STR):
+				self._dm_setslice(first_row + i - 1, first_col + j, texts)
+				self._column_widths.update_sample(first_col + j, texts)
+		if resized:
+			self.refresh()
+		else:
+			self._repaint_range(first_row, first_col, last_row, last_col)
+			for colnr in range(first_col, last_col + 1):
+				self._optimize_column_width(colnr)
+		self._qdm.changed.emit()
+
+	def _paste_column_names(self, first_col, names):
+
+		"""
+		desc:
+			Renames columns to pasted column names. If a pasted name is
+			already used by a column to the left, a suffix is added to the
+			pasted name. If it's used by a column to the right, a suffix is
+			added to the name of that column.
+
+		arguments:
+			first_col:
+				desc:	The first column that is renamed.
+				type:	int
+			names:
+				desc:	The pasted names.
+				type:	list
+		"""
+
+		for colnr, name in enumerate(names, first_col):
+			# Invalid names are skipped before anything is renamed, so that
+			# a colliding column is not renamed for nothing
+			if name == EMPTY_STR or not valid_name(name):
+				continue
+			name = unique_name(name,
+				self._column_index.leading_names(self.dm, colnr))
+			old_name = self._column_names[colnr]
+			if name == old_name:
+				continue
+			if name in self.dm:
+				self._dm_rename(name, unique_name(name, self.dm))
+			self._dm_rename(old_name, name)
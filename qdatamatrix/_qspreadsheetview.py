@@ -0,0 +1,206 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from datamatrix.py3compat import *
+from qdatamatrix.decorators import undoable, fix_cursor, silent, profiled
+from qdatamatrix._qdatamatrixmodel import QDataMatrixModel
+from qdatamatrix._qspreadsheetbase import QSpreadSheetBase
+from qdatamatrix._paste import valid_name
+from qtpy import QtWidgets, QtCore
+
+
+class QSpreadSheetView(QSpreadSheetBase, QtWidgets.QTableView):
+
+	"""
+	desc:
+		QSpreadSheetView is a model-based alternative to QSpreadSheet. Instead
+		of creating an item for every cell, it shows the DataMatrix through a
+		QDataMatrixModel, so that memory use doesn't depend on the size of the
+		DataMatrix. It's created automatically by QDataMatrix when the
+		`virtual` keyword is set.
+	"""
+
+	def __init__(self, qdm=None, read_only=False):
+
+		QtWidgets.QTableView.__init__(self, parent=qdm)
+		self._model = QDataMatrixModel(self)
+		self.setModel(self._model)
+		self._init_spreadsheet(qdm, read_only)
+
+	@profiled
+	@silent
+	@fix_cursor
+	def refresh(self):
+
+		self._format_pool.cancel()
+		self._column_index.invalidate()
+		self._update_row_index()
+		self._model.refresh()
+		self._estimate_column_widths()
+
+	@profiled
+	@silent
+	@fix_cursor
+	def selectAll(self):
+
+		"""
+		desc:
+			Selects all existing cells.
+		"""
+
+		self.setRangeSelected(
+			QtWidgets.QTableWidgetSelectionRange(
+				0, 0, self._view_length, self._column_count - 1
+			),
+			True
+		)
+
+	# Columns that come into view get an estimated width
+
+	@silent
+	@fix_cursor
+	def horizontalScrollbarValueChanged(self, pos):
+
+		QtWidgets.QTableView.horizontalScrollbarValueChanged(self, pos)
+		self._estimate_visible_column_widths()
+
+	@silent
+	@fix_cursor
+	def resizeEvent(self, e):
+
+		QtWidgets.QTableView.resizeEvent(self, e)
+		self._estimate_visible_column_widths()
+
+	@profiled
+	def paintEvent(self, e):
+
+		# Each paint event gets its own budget for formatting cells
+		self._format_pool.start_budget()
+		QtWidgets.QTableView.paintEvent(self, e)
+
+	# QTableWidget-style cursor and selection functions
+
+	def currentRow(self):
+
+		return self.currentIndex().row()
+
+	def currentColumn(self):
+
+		return self.currentIndex().column()
+
+	def setCurrentCell(self, rownr, colnr):
+
+		self.setCurrentIndex(self._model.index(rownr, colnr))
+
+	def selectedRanges(self):
+
+		return [
+			QtWidgets.QTableWidgetSelectionRange(r.top(), r.left(),
+				r.bottom(), r.right())
+			for r in self.selectionModel().selection()
+		]
+
+	def setRangeSelected(self, selection_range, select):
+
+		selection = QtCore.QItemSelection(
+			self._model.index(selection_range.topRow(),
+				selection_range.leftColumn()),
+			self._model.index(selection_range.bottomRow(),
+				selection_range.rightColumn())
+		)
+		self.selectionModel().select(selection,
+			QtCore.QItemSelectionModel.Select if select
+			else QtCore.QItemSelectionModel.Deselect)
+
+	# Private functions
+
+	def _adjust_size(self):
+
+		self._model.sync_size()
+
+	def _add_columns(self, colnr):
+
+		for i in range(self._column_count, colnr+1):
+			self._dm_add_column()
+		self._adjust_size()
+
+	def _add_rows(self, rownr):
+
+		self._dm_set_length(rownr)
+		self._adjust_size()
+
+	def _rename_column(self, colnr, new_name):
+
+		old_name = self._column_names[colnr]
+		if old_name == new_name:
+			return
+		# Names that are not valid identifiers are rejected, in which case
+		# the column keeps its old name
+		if not valid_name(new_name):
+			return
+		if new_name in self.dm:
+			new_name = self._unique_name
+		self._dm_rename(old_name, new_name)
+		if not self._silent:
+			self._qdm.changed.emit()
+
+	@profiled
+	@undoable
+	def _set_value(self, rownr, colnr, val):
+
+		"""
+		desc:
+			Changes the value of a cell, and thus the DataMatrix. This is
+			called by the model when a cell has been edited.
+		"""
+
+		if colnr >= self._column_count:
+			self._add_columns(colnr)
+		if rownr > self._view_length:
+			self._add_rows(rownr)
+		if rownr == 0:
+			self._rename_column(colnr, val)
+		else:
+			self._dm_setcell(rownr-1, colnr, val)
+		self._model.cells_changed(rownr, colnr, rownr, colnr)
+		self._column_widths.update(colnr, self._value(rownr, colnr),
+			header=rownr == 0)
+		if not self._silent:
+			self._optimize_column_width(colnr)
+			self._qdm.cellchanged.emit(rownr, colnr)
+			self._qdm.changed.emit()
+
+	def _setcell(self, rownr, colnr, val=u''):
+
+		self._set_value(rownr, colnr, safe_decode(val))
+
+	def _repaint_cell(self, rownr, colnr, val, style):
+
+		self._model.cells_changed(rownr, colnr, rownr, colnr)
+		self._column_widths.update(colnr, self._value(rownr, colnr),
+			header=rownr == 0)
+
+	def _repaint_range(self, top, left, bottom, right):
+
+		self._model.cells_changed(top, left, bottom, right)
+
+	def _value(self, rownr, colnr):
+
+		txt = self._model.text(rownr, colnr)
+		return u'' if txt is None else txt
@@ -0,0 +1,159 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from datamatrix.py3compat import *
+from qdatamatrix._profiler import clock
+from qtpy.QtCore import QObject, QTimer, Signal, Qt
+from collections import deque
+import threading
+import logging
+
+logger = logging.getLogger(u'qdatamatrix')
+# The number of seconds per event-loop turn during which submitted changes
+# are applied
+DRAIN_BUDGET = .01
+# The maximum number of changes that are passed to the spreadsheet at once
+BATCH_SIZE = 256
+
+
+class QSubmitQueue(QObject):
+
+	"""
+	desc:
+		Collects changes to the DataMatrix that are submitted from any thread,
+		and applies them in the GUI thread. Submitting a change into an empty
+		queue wakes up the GUI thread through a queued signal. The GUI thread
+		then applies changes for at most DRAIN_BUDGET seconds per event-loop
+		turn, so that a flood of changes doesn't block the GUI, and passes
+		each batch of changes to the spreadsheet at once.
+	"""
+
+	_submitted = Signal()
+
+	def __init__(self, spreadsheet, parent=None):
+
+		QObject.__init__(self, parent)
+		self._spreadsheet = spreadsheet
+		self._lock = threading.Lock()
+		self._queue = deque()
+		self._scheduled = False
+		self._submitted.connect(self._drain, Qt.QueuedConnection)
+		self._drain_timer = QTimer(self)
+		self._drain_timer.setSingleShot(True)
+		self._drain_timer.setInterval(0)
+		self._drain_timer.timeout.connect(self._drain)
+		self.reset_usage()
+
+	def __len__(self):
+
+		return len(self._queue)
+
+	def submit(self, name, rows, values):
+
+		"""
+		desc:
+			Adds a change to the queue. This can be called from any thread.
+
+		arguments:
+			name:
+				desc:	The column name.
+				type:	str
+			rows:
+				desc:	A row index, a slice, or a sequence of row indices.
+				type:	[int, slice, list]
+			values:
+				desc:	A single value, or a sequence with one value per row.
+		"""
+
+		with self._lock:
+			self._queue.append((name, rows, values, clock()))
+			self.submitted += 1
+			if self._scheduled:
+				return
+			self._scheduled = True
+		self._submitted.emit()
+
+	def clear(self):
+
+		"""
+		desc:
+			Discards all changes that have not been applied yet.
+		"""
+
+		with self._lock:
+			self._queue.clear()
+
+	def reset_usage(self):
+
+		self.submitted = 0
+		self.applied = 0
+		self.failed = 0
+		self.total_latency = 0
+		self.max_latency = 0
+		self.last_latency = None
+
+	def usage(self):
+
+		"""
+		returns:
+			desc:	A dict with the number of changes that are waiting to be
+					applied (`pending`), that have been `submitted`,
+					`applied`, or that have `failed`, and the `mean_latency`,
+					`max_latency`, and `last_latency` in seconds between
+					submitting and applying a change.
+			type:	dict
+		"""
+
+		done = self.applied + self.failed
+		return {
+			u'pending': len(self._queue),
+			u'submitted': self.submitted,
+			u'applied': self.applied,
+			u'failed': self.failed,
+			u'mean_latency': self.total_latency / done if done else None,
+			u'max_latency': self.max_latency if done else None,
+			u'last_latency': self.last_latency
+		}
+
+	def _drain(self):
+
+		deadline = clock() + DRAIN_BUDGET
+		while self._queue and clock() < deadline:
+			changes = []
+			while self._queue and len(changes) < BATCH_SIZE:
+				changes.append(self._queue.popleft())
+			errors = self._spreadsheet._apply_changes(
+				[change[:3] for change in changes])
+			now = clock()
+			for (name, rows, values, t), e in zip(changes, errors):
+				latency = now - t
+				self.total_latency += latency
+				self.max_latency = max(self.max_latency, latency)
+				self.last_latency = latency
+				if e is None:
+					self.applied += 1
+					continue
+				self.failed += 1
+				logger.warning(u'failed to apply change to column %s: %s'
+					% (name, e))
+		with self._lock:
+			if not self._queue:
+				self._scheduled = False
+				return
+		self._drain_timer.start()
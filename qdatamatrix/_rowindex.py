@@ -0,0 +1,367 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from datamatrix.py3compat import *
+from datamatrix import DataMatrix, IntColumn, FloatColumn, MixedColumn
+from qdatamatrix._undo import select_rows
+import numbers
+import numpy as np
+
+# The maximum number of changed rows that are moved to their new position one
+# by one. If more rows have changed, the index is recomputed.
+MAX_INCREMENTAL = 16
+
+
+class Descending(object):
+
+	"""
+	desc:
+		Wraps a sort key so that it's sorted in descending order.
+	"""
+
+	__slots__ = u'key',
+
+	def __init__(self, key):
+
+		self.key = key
+
+	def __eq__(self, other):
+
+		return self.key == other.key
+
+	def __lt__(self, other):
+
+		return other.key < self.key
+
+
+def value_key(val):
+
+	"""
+	desc:
+		Gives the sort key of a single value. Numbers come before text, and
+		missing values (None, NaN, and empty strings) come last.
+
+	returns:
+		desc:	A (missing, key) tuple.
+		type:	tuple
+	"""
+
+	if isinstance(val, numbers.Real):
+		if val != val:
+			return 1, 0
+		return 0, (0, val)
+	if val is None or val == u'':
+		return 1, 0
+	return 0, (1, safe_decode(val))
+
+
+def sort_arrays(col, reverse):
+
+	"""
+	desc:
+		Gives the sort keys of a column as arrays, such that sorting rows by
+		these arrays gives the same order as sorting rows by value_key().
+
+	arguments:
+		col:
+			type:	[IntColumn, FloatColumn, MixedColumn]
+		reverse:
+			desc:	Indicates whether the column is sorted in descending
+					order. Missing values come last either way.
+			type:	bool
+
+	returns:
+		desc:	A (missing, key) tuple of arrays.
+		type:	tuple
+	"""
+
+	if isinstance(col, IntColumn):
+		return np.zeros(len(col), dtype=bool), \
+			-col._seq if reverse else col._seq
+	if isinstance(col, FloatColumn):
+		missing = np.isnan(col._seq)
+		key = np.where(missing, 0, col._seq)
+		return missing, -key if reverse else key
+	# Mixed columns are ranked by sorting the numbers and the texts
+	# separately, which is much faster than sorting all values as tuples
+	missing = np.zeros(len(col), dtype=bool)
+	numbers_ = ([], [])
+	texts = ([], [])
+	for rownr, val in enumerate(col._seq):
+		is_missing, key = value_key(val)
+		if is_missing:
+			missing[rownr] = True
+			continue
+		rownrs, values = texts if key[0] else numbers_
+		rownrs.append(rownr)
+		values.append(key[1])
+	rank = np.zeros(len(col), dtype=np.int64)
+	offset = 0
+	for rownrs, values in numbers_, texts:
+		if not rownrs:
+			continue
+		unique, inverse = np.unique(np.array(values), return_inverse=True)
+		rank[rownrs] = inverse.ravel() + offset
+		offset += len(unique)
+	return missing, -rank if reverse else rank
+
+
+class RowIndex(object):
+
+	"""
+	desc:
+		Determines which rows of the DataMatrix are shown, and in which order,
+		without changing or copying the DataMatrix. Rows are sorted by one or
+		more columns with a stable sort, such that rows with equal values
+		keep their original order, and filtered with a vectorized predicate.
+
+		Rows are referred to by their position in the view, which corresponds
+		to the table row minus one, and by their position in the DataMatrix.
+		When no sort keys or predicate are set, these are the same, and no
+		index is kept.
+
+		Rows in which a sort key or the filter may have changed are marked
+		with touch(). sync() then moves these rows to their new position,
+		without sorting all rows again.
+	"""
+
+	def __init__(self):
+
+		self.sort_keys = []
+		self.predicate = None
+		self.index = None
+		self._positions = None
+		self._touched = set()
+
+	@property
+	def active(self):
+
+		return bool(self.sort_keys) or self.predicate is not None
+
+	def length(self, dm):
+
+		"""
+		returns:
+			desc:	The number of rows in the view.
+			type:	int
+		"""
+
+		return len(dm) if self.index is None else len(self.index)
+
+	def dm_row(self, rownr):
+
+		"""
+		arguments:
+			rownr:
+				desc:	A row in the view.
+				type:	int
+
+		returns:
+			desc:	The corresponding row in the DataMatrix.
+			type:	int
+		"""
+
+		return rownr if self.index is None else int(self.index[rownr])
+
+	def position(self, rownr):
+
+		"""
+		arguments:
+			rownr:
+				desc:	A row in the DataMatrix.
+				type:	int
+
+		returns:
+			desc:	The corresponding row in the view, or -1 if the row is
+					filtered out.
+			type:	int
+		"""
+
+		return rownr if self._positions is None else \
+			int(self._positions[rownr])
+
+	def affects(self, name):
+
+		"""
+		returns:
+			desc:	True if changing a column may change the view.
+			type:	bool
+		"""
+
+		return self.predicate is not None or \
+			any(key_name == name for key_name, reverse in self.sort_keys)
+
+	def rename(self, old_name, new_name):
+
+		self.sort_keys = [
+			(new_name if name == old_name else name, reverse)
+			for name, reverse in self.sort_keys
+		]
+
+	def update(self, dm):
+
+		"""
+		desc:
+			Recomputes the index from scratch. Sort keys that refer to columns
+			that no longer exist are ignored.
+		"""
+
+		self._touched = set()
+		if not self.active:
+			self.index = None
+			self._positions = None
+			return
+		keys = []
+		for name, reverse in self.sort_keys:
+			if name in dm:
+				keys += sort_arrays(dm[name], reverse)
+		# np.lexsort() sorts by the last key first
+		rows = np.lexsort(keys[::-1]) if keys else np.arange(len(dm))
+		if self.predicate is not None:
+			rows = rows[self._mask(dm)[rows]]
+		self.index = rows.astype(np.int64)
+		self._positions = np.full(len(dm), -1, dtype=np.int64)
+		self._positions[self.index] = np.arange(len(self.index))
+
+	def touch(self, rownr):
+
+		"""
+		desc:
+			Marks a row of the DataMatrix as changed.
+		"""
+
+		self._touched.add(rownr)
+
+	def extend(self, start, stop):
+
+		"""
+		desc:
+			Adds rows that have been appended to the DataMatrix to the end of
+			the view, regardless of the sort keys and the predicate, so that
+			rows that are added by editing the table remain visible.
+		"""
+
+		if self.index is None:
+			return
+		new = np.arange(start, stop, dtype=np.int64)
+		self._positions = np.concatenate([self._positions,
+			np.arange(len(self.index), len(self.index) + len(new))])
+		self.index = np.concatenate([self.index, new])
+
+	def sync(self, dm):
+
+		"""
+		desc:
+			Moves rows that have been marked with touch() to their new
+			position in the view. If many rows have been marked, the index is
+			recomputed.
+
+		returns:
+			desc:	None if nothing changed, or a (first, last) tuple of rows
+					in the view that may have changed. If the number of rows
+					in the view changed, `last` is the last row of the longest
+					of the old and the new view.
+			type:	[tuple, None]
+		"""
+
+		touched = self._touched
+		if not touched or self.index is None:
+			return None
+		old_length = len(self.index)
+		if len(touched) > MAX_INCREMENTAL:
+			self.update(dm)
+			return 0, max(old_length, len(self.index)) - 1
+		self._touched = set()
+		rownrs = sorted(touched)
+		if self.predicate is None:
+			passes = None
+		else:
+			# Only the changed rows are filtered, so that the predicate
+			# doesn't run over the entire DataMatrix after every edit
+			passes = self._mask(select_rows(dm, np.array(rownrs,
+				dtype=np.int64))).tolist()
+		# First all changed rows are removed, so that the remaining rows are
+		# sorted, and then they are inserted at their new position
+		old_positions = [
+			self._positions[rownr] for rownr in touched
+			if self._positions[rownr] >= 0
+		]
+		index = np.delete(self.index, old_positions)
+		for i, rownr in enumerate(rownrs):
+			self._positions[rownr] = -1
+			if passes is not None and not passes[i]:
+				continue
+			index = np.insert(index, self._insert_position(dm, index, rownr),
+				rownr)
+		self.index = index
+		new_positions = np.flatnonzero(np.isin(index, list(touched)))
+		positions = list(old_positions) + new_positions.tolist()
+		if not positions:
+			return None
+		first = min(positions)
+		self._positions[index[first:]] = np.arange(first, len(index))
+		if len(index) != old_length:
+			return first, max(old_length, len(index)) - 1
+		return first, max(positions)
+
+	def _mask(self, dm):
+
+		"""
+		returns:
+			desc:	A boolean array that indicates which rows of the
+					DataMatrix pass the predicate.
+			type:	ndarray
+		"""
+
+		result = self.predicate(dm)
+		if isinstance(result, DataMatrix):
+			# The predicate selected rows, for example with dm.col > 0
+			return np.isin(np.asarray(dm._rowid._a),
+				np.asarray(result._rowid._a))
+		mask = np.asarray(result, dtype=bool)
+		if mask.shape != (len(dm),):
+			raise ValueError(
+				u'A filter should give one boolean for every row')
+		return mask
+
+	def _key(self, dm, rownr):
+
+		key = []
+		for name, reverse in self.sort_keys:
+			if name not in dm:
+				continue
+			is_missing, val = value_key(dm[name][rownr])
+			key += [is_missing, Descending(val) if reverse else val]
+		# Rows with equal values keep their original order
+		key.append(rownr)
+		return key
+
+	def _insert_position(self, dm, index, rownr):
+
+		if not self.sort_keys:
+			return int(np.searchsorted(index, rownr))
+		key = self._key(dm, rownr)
+		lo, hi = 0, len(index)
+		while lo < hi:
+			mid = (lo + hi) // 2
+			if self._key(dm, int(index[mid])) < key:
+				lo = mid + 1
+			else:
+				hi = mid
+		return lo
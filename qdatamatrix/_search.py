@@ -0,0 +1,334 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from datamatrix.py3compat import *
+import heapq
+import re
+import numpy as np
+
+# The number of rows that is converted to text at once when a column is
+# indexed
+CHUNK_SIZE = 10000
+# The number of rows that is searched at once when searching backwards
+BACKWARDS_ROWS = 4096
+
+
+def compile_pattern(pattern, regex=False, case_sensitive=False):
+
+	"""
+	desc:
+		Compiles a search pattern, such that it can be applied to the texts of
+		a column search index.
+
+	arguments:
+		pattern:
+			desc:	The text or regular expression to search for.
+			type:	str
+
+	keywords:
+		regex:
+			desc:	Indicates whether the pattern is a regular expression.
+			type:	bool
+		case_sensitive:
+			desc:	Indicates whether matching is case sensitive. If not, the
+					pattern is applied to lowercase texts.
+			type:	bool
+
+	returns:
+		desc:	A compiled regular expression.
+		type:	RegexObject
+	"""
+
+	flags = re.MULTILINE
+	if not regex:
+		if not case_sensitive:
+			pattern = pattern.lower()
+		return re.compile(re.escape(pattern), flags)
+	if not case_sensitive:
+		flags |= re.IGNORECASE
+	return re.compile(pattern, flags)
+
+
+class ColumnSearchIndex(object):
+
+	"""
+	desc:
+		The display texts of a column joined into a single string, with one
+		line per row, such that a column can be searched with a single regular
+		expression, rather than cell by cell. Newlines within cells are
+		replaced by spaces.
+
+		`starts` gives the offset of every row in the string, followed by the
+		length of the string plus one.
+	"""
+
+	def __init__(self, texts, starts, version):
+
+		self.texts = texts
+		self.starts = starts
+		self.version = version
+
+	def rownr(self, pos):
+
+		"""
+		returns:
+			desc:	The row that contains a position in the string.
+			type:	int
+		"""
+
+		return int(np.searchsorted(self.starts, pos, side=u'right')) - 1
+
+	def rows(self, regex, start, stop, backwards=False):
+
+		"""
+		desc:
+			Lazily gives the rows that match a regular expression.
+
+		arguments:
+			regex:
+				type:	RegexObject
+			start:
+				desc:	The first row.
+				type:	int
+			stop:
+				desc:	The row after the last row.
+				type:	int
+
+		keywords:
+			backwards:
+				desc:	Indicates whether rows are given from last to first.
+				type:	bool
+
+		returns:
+			desc:	A generator of row indices.
+			type:	generator
+		"""
+
+		if start >= stop:
+			return
+		if not backwards:
+			for rownr in self._rows(regex, start, stop):
+				yield rownr
+			return
+		# Regular expressions can only be searched forwards, so the rows are
+		# searched in windows, starting with the last window
+		while stop > start:
+			window_start = max(start, stop - BACKWARDS_ROWS)
+			for rownr in reversed(list(self._rows(regex, window_start, stop))):
+				yield rownr
+			stop = window_start
+
+	def _rows(self, regex, start, stop):
+
+		starts = self.starts
+		texts = self.texts
+		pos = int(starts[start])
+		# The newline after the last row is excluded
+		endpos = int(starts[stop]) - 1
+		while pos <= endpos:
+			m = regex.search(texts, pos, endpos)
+			if m is None:
+				return
+			# Matches that span multiple rows, for example because the pattern
+			# contains a newline, don't count
+			if u'\n' in m.group():
+				pos = m.start() + 1
+				continue
+			rownr = self.rownr(m.start())
+			yield rownr
+			pos = int(starts[rownr + 1])
+
+
+class SearchIndex(object):
+
+	"""
+	desc:
+		Searches the display texts of a DataMatrix without creating cells.
+		The texts of every column are joined into a ColumnSearchIndex, which
+		is searched with a regular expression, and which is cached until the
+		column is invalidated in the DisplayFormatter. For case-insensitive
+		searches, a separate lowercase index is kept.
+
+		Rows refer to positions in the view, such that sorted and filtered
+		rows are searched in the order in which they are shown.
+	"""
+
+	def __init__(self, formatter):
+
+		"""
+		desc:
+			Constructor.
+
+		arguments:
+			formatter:
+				desc:	The formatter that gives the display texts.
+				type:	DisplayFormatter
+		"""
+
+		self._formatter = formatter
+		self._indices = {}
+
+	def clear(self):
+
+		self._indices = {}
+
+	def column_index(self, name, col, length, case_sensitive=False):
+
+		"""
+		desc:
+			Gives the index of a column, and builds it if it doesn't exist or
+			if the column has changed.
+
+		arguments:
+			name:
+				desc:	The column name.
+				type:	str
+			col:
+				type:	BaseColumn
+			length:
+				desc:	The number of rows in the view.
+				type:	int
+
+		keywords:
+			case_sensitive:
+				desc:	Indicates whether the texts should be kept as is, or
+						converted to lowercase.
+				type:	bool
+
+		returns:
+			type:	ColumnSearchIndex
+		"""
+
+		key = name, case_sensitive
+		version = self._formatter.column_version(name), id(col), length
+		index = self._indices.get(key, None)
+		if index is not None and index.version == version:
+			return index
+		chunks = []
+		lengths = []
+		for start in range(0, length, CHUNK_SIZE):
+			texts = self._formatter.range_texts(col, start,
+				min(length, start + CHUNK_SIZE))
+			chunk = u'\n'.join(texts)
+			if chunk.count(u'\n') != len(texts) - 1:
+				texts = [text.replace(u'\n', u' ') for text in texts]
+				chunk = u'\n'.join(texts)
+			if not case_sensitive:
+				lower = chunk.lower()
+				# Some characters change length when they're converted to
+				# lowercase, in which case the cells are converted one by one
+				if len(lower) == len(chunk):
+					chunk = lower
+				else:
+					texts = [text.lower() for text in texts]
+					chunk = u'\n'.join(texts)
+			chunks.append(chunk)
+			lengths.append(np.fromiter((len(text) for text in texts),
+				dtype=np.int64, count=len(texts)))
+		# Every row is followed by a newline, so the start of a row is the
+		# sum of the lengths of the rows before it, plus one per row
+		lengths.append(np.zeros(1, dtype=np.int64))
+		lengths = np.concatenate(lengths) + 1
+		starts = np.zeros(len(lengths), dtype=np.int64)
+		np.cumsum(lengths[:-1], out=starts[1:])
+		index = ColumnSearchIndex(u'\n'.join(chunks), starts, version)
+		self._indices[key] = index
+		return index
+
+	def hits(self, columns, length, regex, rownr=-1, colnr=-1,
+		case_sensitive=False, backwards=False):
+
+		"""
+		desc:
+			Lazily gives the cells that match a regular expression, in the
+			order in which they are shown (row by row), starting after a cell
+			and wrapping around, such that the cell itself comes last. Columns
+			are indexed when this function is called, and rows are only
+			searched as hits are requested.
+
+		arguments:
+			columns:
+				desc:	A list of (name, column) tuples.
+				type:	list
+			length:
+				desc:	The number of rows in the view.
+				type:	int
+			regex:
+				desc:	A regular expression as returned by compile_pattern().
+				type:	RegexObject
+
+		keywords:
+			rownr:
+				desc:	The row of the cell to start from, or -1 to start
+						before the first row.
+				type:	int
+			colnr:
+				desc:	The column of the cell to start from.
+				type:	int
+			case_sensitive:
+				desc:	The case sensitivity with which the regular expression
+						was compiled.
+				type:	bool
+			backwards:
+				desc:	Indicates whether the cells should be given from last
+						to first.
+				type:	bool
+
+		returns:
+			desc:	A generator of (row, column) tuples.
+			type:	generator
+		"""
+
+		names = set(name for name, col in columns)
+		for key in list(self._indices):
+			if key[0] not in names:
+				del self._indices[key]
+		indices = [
+			self.column_index(name, col, length, case_sensitive)
+			for name, col in columns
+		]
+		# The cells after the starting cell, and then the cells before it.
+		# Rows are given as ranges for every column.
+		if backwards:
+			ranges = [
+				[(0, rownr + (i < colnr)), (rownr + (i < colnr), length)]
+				for i in range(len(indices))
+			]
+		else:
+			ranges = [
+				[(rownr + (i <= colnr), length), (0, rownr + (i <= colnr))]
+				for i in range(len(indices))
+			]
+		sign = -1 if backwards else 1
+		for part in range(2):
+			iterators = [
+				self._keyed_rows(index, colnr_, regex, sign,
+					max(0, ranges[colnr_][part][0]),
+					max(0, ranges[colnr_][part][1]))
+				for colnr_, index in enumerate(indices)
+			]
+			for key in heapq.merge(*iterators):
+				yield sign * key[0], sign * key[1]
+
+	def _keyed_rows(self, index, colnr, regex, sign, start, stop):
+
+		# Cells are merged on (row, column), which are negated when searching
+		# backwards, so that the merged cells are in descending order
+		for rownr in index.rows(regex, start, stop, backwards=sign < 0):
+			yield sign * rownr, sign * colnr
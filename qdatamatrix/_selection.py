@@ -0,0 +1,153 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from datamatrix.py3compat import *
+
+
+def merge_intervals(intervals):
+
+	"""
+	desc:
+		Merges overlapping and adjacent intervals.
+
+	arguments:
+		intervals:
+			desc:	An iterable of (start, stop) tuples, where stop is not
+					included. Empty intervals are ignored.
+
+	returns:
+		desc:	A sorted list of non-overlapping (start, stop) tuples.
+		type:	list
+	"""
+
+	merged = []
+	for start, stop in sorted(
+			interval for interval in intervals if interval[0] < interval[1]):
+		if merged and start <= merged[-1][1]:
+			if stop > merged[-1][1]:
+				merged[-1] = merged[-1][0], stop
+			continue
+		merged.append((start, stop))
+	return merged
+
+
+def interval_length(intervals):
+
+	"""
+	returns:
+		desc:	The number of indices in a list of non-overlapping intervals.
+		type:	int
+	"""
+
+	return sum(stop - start for start, stop in intervals)
+
+
+def interval_indices(intervals):
+
+	"""
+	returns:
+		desc:	The indices in a list of non-overlapping intervals, in order.
+		type:	list
+	"""
+
+	return [i for start, stop in intervals for i in range(start, stop)]
+
+
+def selected_intervals(selection_ranges, rows, offset, length):
+
+	"""
+	desc:
+		Determines the rows or columns that are covered by selection ranges,
+		without going through the selected cells one by one.
+
+	arguments:
+		selection_ranges:
+			desc:	The selection ranges, as returned by selectedRanges().
+			type:	list
+		rows:
+			desc:	True for rows, and False for columns.
+			type:	bool
+		offset:
+			desc:	The table index of the first index that is included, such
+					as 1 for rows, because the first row contains the column
+					names.
+			type:	int
+		length:
+			desc:	The number of indices that can be selected, starting at
+					offset.
+			type:	int
+
+	returns:
+		desc:	A sorted list of non-overlapping (start, stop) tuples, where
+				indices are relative to offset, and stop is not included.
+		type:	list
+	"""
+
+	intervals = []
+	for selection_range in selection_ranges:
+		if rows:
+			first = selection_range.topRow()
+			last = selection_range.bottomRow()
+		else:
+			first = selection_range.leftColumn()
+			last = selection_range.rightColumn()
+		intervals.append((max(0, first - offset),
+			min(length, last + 1 - offset)))
+	return merge_intervals(intervals)
+
+
+def column_row_intervals(selection_ranges, length, count):
+
+	"""
+	desc:
+		Determines, for every column, the rows that are covered by selection
+		ranges, which may overlap or leave gaps.
+
+	arguments:
+		selection_ranges:
+			desc:	The selection ranges, as returned by selectedRanges().
+			type:	list
+		length:
+			desc:	The number of rows that can be selected, including the
+					row with the column names.
+			type:	int
+		count:
+			desc:	The number of columns that can be selected.
+			type:	int
+
+	returns:
+		desc:	A dict that maps column numbers onto sorted lists of
+				non-overlapping (start, stop) tuples of rows, where stop is
+				not included. Columns without selected rows are left out.
+		type:	dict
+	"""
+
+	intervals = {}
+	for selection_range in selection_ranges:
+		start = selection_range.topRow()
+		stop = min(length, selection_range.bottomRow() + 1)
+		if start >= stop:
+			continue
+		for colnr in range(selection_range.leftColumn(),
+				min(count, selection_range.rightColumn() + 1)):
+			intervals.setdefault(colnr, []).append((start, stop))
+	return {
+		colnr: merge_intervals(column_intervals)
+		for colnr, column_intervals in intervals.items()
+	}
@@ -0,0 +1,181 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from datamatrix.py3compat import *
+from qdatamatrix._formatting import BLOCK_SIZE
+
+
+def block_hashes(seq):
+
+	"""
+	desc:
+		Hashes a sequence in blocks of BLOCK_SIZE elements.
+
+	arguments:
+		seq:
+			desc:	A list, array, or NumPy array.
+
+	returns:
+		desc:	A list of hashes. Blocks that cannot be hashed, because they
+				contain unhashable values, get a unique object, so that they
+				are always considered to have changed.
+		type:	list
+	"""
+
+	return [
+		block_hash(seq, start)
+		for start in range(0, len(seq), BLOCK_SIZE)
+	]
+
+
+def block_hash(seq, start):
+
+	"""
+	returns:
+		desc:	The hash of the block of a sequence that starts at `start`,
+				or a unique object if the block cannot be hashed.
+	"""
+
+	block = seq[start:start + BLOCK_SIZE]
+	# Arrays, including NumPy arrays, are hashed as raw bytes
+	if hasattr(block, u'tobytes'):
+		return hash(block.tobytes())
+	try:
+		return hash(tuple(block))
+	except TypeError:
+		return object()
+
+
+class Snapshot(object):
+
+	"""
+	desc:
+		A fingerprint of the state of a DataMatrix, which consists of the
+		structure of the DataMatrix, and hashes of blocks of rows of the row
+		ids and of every column. Comparing two snapshots shows which blocks
+		of which columns have changed.
+	"""
+
+	def __init__(self, dm):
+
+		self.length = len(dm)
+		# Column objects are included, because the table model keeps
+		# references to them
+		self.columns = [(name, id(col), type(col)) for name, col in dm.columns]
+		self.rowids = block_hashes(dm._rowid._a)
+		self.blocks = {
+			name: block_hashes(col._seq) for name, col in dm.columns
+		}
+
+	def update(self, dm, name, start, stop):
+
+		"""
+		desc:
+			Rehashes the blocks of a column that contain a range of rows,
+			after cells have been changed through the widget, so that they
+			are not considered to have changed when the snapshot is compared
+			to the next snapshot.
+
+		arguments:
+			dm:
+				type:	DataMatrix
+			name:
+				desc:	The column name.
+				type:	str
+			start:
+				desc:	The first row.
+				type:	int
+			stop:
+				desc:	The row after the last row.
+				type:	int
+		"""
+
+		# A column that has been added since the snapshot was taken is
+		# noticed as a change in the structure
+		if name not in self.blocks or len(dm) != self.length:
+			return
+		seq = dm[name]._seq
+		hashes = self.blocks[name]
+		for blocknr in range(start // BLOCK_SIZE,
+				(stop - 1) // BLOCK_SIZE + 1):
+			hashes[blocknr] = block_hash(seq, blocknr * BLOCK_SIZE)
+
+	def extend(self, dm, old_length):
+
+		"""
+		desc:
+			Hashes rows that have been appended through the widget. The
+			last block before the new rows is hashed again, because it may
+			have been incomplete.
+
+		arguments:
+			dm:
+				type:	DataMatrix
+			old_length:
+				desc:	The length of the DataMatrix before the rows were
+						appended.
+				type:	int
+		"""
+
+		if old_length != self.length or [(name, _type) for name, _id, _type
+				in self.columns] != [(name, type(col))
+				for name, col in dm.columns]:
+			return
+		first = old_length // BLOCK_SIZE
+		self.length = len(dm)
+		# Extending a DataMatrix replaces its columns
+		self.columns = [(name, id(col), type(col)) for name, col in dm.columns]
+		self.rowids[first:] = block_hashes(dm._rowid._a[
+			first * BLOCK_SIZE:])
+		for name, col in dm.columns:
+			self.blocks[name][first:] = block_hashes(col._seq[
+				first * BLOCK_SIZE:])
+
+	def diff(self, other):
+
+		"""
+		desc:
+			Compares the snapshot to a more recent snapshot of the same
+			DataMatrix.
+
+		arguments:
+			other:
+				type:	Snapshot
+
+		returns:
+			desc:	A list of (column name, block number) tuples for blocks
+					that have changed, or None if the structure of the
+					DataMatrix has changed. Blocks in which the row ids have
+					changed are included for all columns.
+			type:	[list, None]
+		"""
+
+		if self.length != other.length or self.columns != other.columns:
+			return None
+		changed_rows = set(
+			blocknr for blocknr, (old, new)
+			in enumerate(zip(self.rowids, other.rowids)) if old != new
+		)
+		changed = []
+		for name, _id, _type in other.columns:
+			for blocknr, (old, new) in enumerate(
+					zip(self.blocks[name], other.blocks[name])):
+				if old != new or blocknr in changed_rows:
+					changed.append((name, blocknr))
+		return changed
@@ -0,0 +1,98 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from datamatrix.py3compat import *
+import numbers
+
+
+class SourceColumn(object):
+
+	"""
+	desc:
+		A read-only column of a DataSource. Like a DataMatrix column, it has a
+		length and can be indexed with a row number. Values are read from the
+		DataSource, which reads them from disk a block at a time.
+	"""
+
+	def __init__(self, source, name, colnr, style=None):
+
+		"""
+		desc:
+			Constructor.
+
+		arguments:
+			source:
+				type:	DataSource
+			name:
+				desc:	The column name.
+				type:	str
+			colnr:
+				desc:	The position of the column in the DataSource.
+				type:	int
+
+		keywords:
+			style:
+				desc:	'numeric' or 'text', or None if the style depends on
+						the value.
+				type:	[str, None]
+		"""
+
+		self.source = source
+		self.name = name
+		self.colnr = colnr
+		self.style = style
+
+	def __len__(self):
+
+		return len(self.source)
+
+	def __getitem__(self, rownr):
+
+		if not isinstance(rownr, numbers.Integral):
+			raise TypeError(u'Source columns can only be indexed with ints')
+		rownr = int(rownr)
+		if rownr < 0:
+			rownr += len(self)
+		return self.source.value(self.colnr, rownr)
+
+	def __iter__(self):
+
+		for rownr in range(len(self)):
+			yield self[rownr]
+
+	def values(self, start, stop):
+
+		"""
+		desc:
+			Gives the values of a range of rows.
+
+		arguments:
+			start:
+				desc:	The first row.
+				type:	int
+			stop:
+				desc:	The row after the last row.
+				type:	int
+
+		returns:
+			desc:	A NumPy array for numeric columns, and a list otherwise.
+			type:	[ndarray, list]
+		"""
+
+		return self.source.values(self.colnr, start, stop)
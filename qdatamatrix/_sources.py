@@ -0,0 +1,488 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from datamatrix.py3compat import *
+from qdatamatrix._formatting import BLOCK_SIZE
+from qdatamatrix._sourcecolumn import SourceColumn
+from collections import OrderedDict
+import array
+import csv
+import io
+import os
+import threading
+import numpy as np
+
+# The maximum number of blocks of rows that a DataSource keeps in memory
+CACHED_BLOCKS = 256
+# The number of bytes that is scanned for newlines at once when a text file
+# is indexed
+SCAN_SIZE = 16 * 1024 ** 2
+# Kinds of NumPy arrays that are shown as numbers
+NUMERIC_KINDS = u'biuf'
+
+
+def parse_value(text):
+
+	"""
+	desc:
+		Converts a text from a file to a number if possible, like DataMatrix
+		does when reading a text file.
+
+	arguments:
+		text:
+			type:	str
+
+	returns:
+		type:	[int, float, str]
+	"""
+
+	try:
+		return int(text)
+	except ValueError:
+		pass
+	try:
+		return float(text)
+	except ValueError:
+		return text
+
+
+class DataSource(object):
+
+	"""
+	desc:
+		A read-only table on disk that QDataMatrix can show without loading
+		it into memory. Rows are read a block of BLOCK_SIZE rows at a time,
+		when they are needed, and the most recently used blocks are kept in
+		a cache.
+
+		Like a DataMatrix, a DataSource has a length, and a list of (name,
+		column) tuples in `columns`. Columns are SourceColumn objects.
+
+		Subclasses should call _init_columns(), implement __len__(), and
+		implement _read_block(), which reads a single block. If the length
+		isn't known when the source is opened, for example because a file is
+		still being indexed, `complete` should be False until it is known.
+		QDataMatrix then adds rows as the source grows. If the length cannot
+		be determined, `error` is set to the exception, and `complete` to
+		True, so that the rows that are known can still be shown.
+
+		Blocks can be read from multiple threads at once.
+	"""
+
+	def __init__(self, cached_blocks=CACHED_BLOCKS):
+
+		self.complete = True
+		self.error = None
+		self.cached_blocks = cached_blocks
+		self._cache = OrderedDict()
+		self._lock = threading.Lock()
+		self._columns = []
+		self._columns_by_name = {}
+
+	def _init_columns(self, names, styles):
+
+		self._columns = [
+			(name, SourceColumn(self, name, colnr, style))
+			for colnr, (name, style) in enumerate(zip(names, styles))
+		]
+		self._columns_by_name = dict(self._columns)
+
+	@property
+	def columns(self):
+
+		return list(self._columns)
+
+	@property
+	def column_names(self):
+
+		return [name for name, col in self._columns]
+
+	def __len__(self):
+
+		raise NotImplementedError()
+
+	def __contains__(self, name):
+
+		return name in self._columns_by_name
+
+	def __getitem__(self, name):
+
+		return self._columns_by_name[name]
+
+	def close(self):
+
+		"""
+		desc:
+			Releases the files that the source has opened.
+		"""
+
+		self.clear_cache()
+
+	def clear_cache(self):
+
+		with self._lock:
+			self._cache = OrderedDict()
+
+	def value(self, colnr, rownr):
+
+		"""
+		returns:
+			desc:	The value of a single cell.
+		"""
+
+		if not 0 <= rownr < len(self):
+			raise IndexError(u'Row %d is out of range' % rownr)
+		return self._block(rownr // BLOCK_SIZE)[colnr][rownr % BLOCK_SIZE]
+
+	def values(self, colnr, start, stop):
+
+		"""
+		desc:
+			Gives the values of a range of rows of a column.
+
+		arguments:
+			colnr:
+				type:	int
+			start:
+				desc:	The first row.
+				type:	int
+			stop:
+				desc:	The row after the last row.
+				type:	int
+
+		returns:
+			desc:	A NumPy array if the blocks are arrays, and a list
+					otherwise.
+			type:	[ndarray, list]
+		"""
+
+		stop = min(stop, len(self))
+		parts = []
+		for blocknr in range(start // BLOCK_SIZE,
+				(stop - 1) // BLOCK_SIZE + 1 if stop > start else 0):
+			offset = blocknr * BLOCK_SIZE
+			parts.append(self._block(blocknr)[colnr][
+				max(start, offset) - offset:stop - offset])
+		if parts and all(isinstance(part, np.ndarray) for part in parts):
+			return np.concatenate(parts)
+		values = []
+		for part in parts:
+			values += list(part)
+		return values
+
+	def _block(self, blocknr):
+
+		"""
+		desc:
+			Gives a block of rows, and reads it if it's not in the cache.
+			Blocks that are not complete, because the source is still
+			growing, are not cached.
+
+		returns:
+			desc:	A list with one sequence of values per column.
+			type:	list
+		"""
+
+		with self._lock:
+			block = self._cache.get(blocknr, None)
+			if block is not None:
+				self._cache.move_to_end(blocknr)
+				return block
+			# The length is checked before the block is read, because the
+			# source may grow in the meantime
+			complete = self.complete or \
+				len(self) >= (blocknr + 1) * BLOCK_SIZE
+			block = self._read_block(blocknr)
+			if not complete:
+				return block
+			self._cache[blocknr] = block
+			if len(self._cache) > self.cached_blocks:
+				self._cache.popitem(last=False)
+			return block
+
+	def _read_block(self, blocknr):
+
+		raise NotImplementedError()
+
+
+class MemmapSource(DataSource):
+
+	"""
+	desc:
+		A DataSource for NumPy arrays, typically memory-mapped arrays, such
+		that only the parts of the arrays that are shown are read from disk.
+
+	example: |
+		source = MemmapSource(u'recording.npy')
+		qdm = QDataMatrix(source)
+	"""
+
+	def __init__(self, data, names=None, cached_blocks=CACHED_BLOCKS):
+
+		"""
+		desc:
+			Constructor.
+
+		arguments:
+			data:
+				desc:	The path to a `.npy` file, which is opened as a
+						memory-mapped array, or an array. A structured array
+						gives one column per field, a two-dimensional array
+						one column per column, and a one-dimensional array a
+						single column. A dict of one-dimensional arrays of the
+						same length gives one column per array.
+				type:	[str, ndarray, dict]
+
+		keywords:
+			names:
+				desc:	Column names for arrays that don't have field names,
+						or None to name columns `col1`, `col2`, etc.
+				type:	[list, None]
+			cached_blocks:
+				desc:	The maximum number of blocks of rows that is kept in
+						memory.
+				type:	int
+		"""
+
+		DataSource.__init__(self, cached_blocks)
+		if isinstance(data, basestring):
+			data = np.load(data, mmap_mode=u'r')
+		if isinstance(data, dict):
+			names = list(data.keys()) if names is None else names
+			arrays = list(data.values())
+		elif data.dtype.names is not None:
+			names = list(data.dtype.names) if names is None else names
+			arrays = [data[name] for name in data.dtype.names]
+		elif data.ndim == 1:
+			arrays = [data]
+		elif data.ndim == 2:
+			arrays = [data[:, colnr] for colnr in range(data.shape[1])]
+		else:
+			raise ValueError(u'Arrays should have one or two dimensions')
+		if names is None:
+			names = [u'col%d' % (colnr + 1) for colnr in range(len(arrays))]
+		if len(names) != len(arrays):
+			raise ValueError(u'There should be one name per column')
+		if len(set(len(a) for a in arrays)) > 1:
+			raise ValueError(u'All columns should have the same length')
+		self._arrays = arrays
+		self._length = len(arrays[0]) if arrays else 0
+		self._init_columns([safe_decode(name) for name in names], [
+			u'numeric' if a.dtype.kind in NUMERIC_KINDS else u'text'
+			for a in arrays
+		])
+
+	def __len__(self):
+
+		return self._length
+
+	def _read_block(self, blocknr):
+
+		start = blocknr * BLOCK_SIZE
+		# Slices of memory-mapped arrays are copied, so that only the block
+		# itself is read from disk. Other values are converted to regular
+		# Python objects.
+		return [
+			np.array(a[start:start + BLOCK_SIZE])
+			if a.dtype.kind in NUMERIC_KINDS
+			else a[start:start + BLOCK_SIZE].tolist()
+			for a in self._arrays
+		]
+
+
+class CSVSource(DataSource):
+
+	"""
+	desc:
+		A DataSource for CSV and TSV files. The file is indexed by scanning
+		it for newlines in a background thread, which records the byte offset
+		of the first row of every block. Rows become available as soon as
+		they have been indexed, and a block is read by seeking to its offset
+		and parsing only the rows of the block.
+
+		Because rows are found by their newlines, quoted values cannot span
+		multiple lines.
+
+	example: |
+		source = CSVSource(u'recording.tsv')
+		qdm = QDataMatrix(source)
+	"""
+
+	def __init__(self, path, delimiter=None, encoding=u'utf-8', header=True,
+		cached_blocks=CACHED_BLOCKS):
+
+		"""
+		desc:
+			Constructor. Opening a file only reads the first part of the
+			file, regardless of its size. The rest is indexed in the
+			background.
+
+		arguments:
+			path:
+				desc:	The path to the file.
+				type:	str
+
+		keywords:
+			delimiter:
+				desc:	The delimiter, or None to use a tab if the first line
+						contains a tab, and a comma otherwise.
+				type:	[str, None]
+			encoding:
+				desc:	The encoding of the file.
+				type:	str
+			header:
+				desc:	Indicates whether the first line contains column
+						names. If not, columns are named `col1`, `col2`, etc.
+				type:	bool
+			cached_blocks:
+				desc:	The maximum number of blocks of rows that is kept in
+						memory.
+				type:	int
+		"""
+
+		DataSource.__init__(self, cached_blocks)
+		self.path = path
+		self.encoding = encoding
+		self._size = os.path.getsize(path)
+		self._fd = open(path, u'rb')
+		first_line = self._fd.readline().decode(encoding, u'replace')
+		if delimiter is None:
+			delimiter = u'\t' if u'\t' in first_line else u','
+		self.delimiter = delimiter
+		first_row = next(csv.reader([first_line.rstrip(u'\r\n')],
+			delimiter=delimiter), [])
+		if header:
+			names = first_row
+			start = self._fd.tell()
+		else:
+			names = [u'col%d' % (colnr + 1) for colnr in range(len(first_row))]
+			start = 0
+		# The offset of the first row of every block. The number of indexed
+		# rows and the offset after the last indexed row are changed
+		# together, so that they're consistent while the file is indexed.
+		self._offsets = array.array(u'q', [start])
+		self._indexed = 0, start
+		self._closed = False
+		self.complete = False
+		self._init_columns(names, [None] * len(names))
+		# The first part of the file is indexed right away, so that the first
+		# rows can be shown immediately
+		self._thread = None
+		self._scan_fd = open(path, u'rb')
+		try:
+			self._scan()
+		except ValueError:
+			self._scan_fd.close()
+			self._fd.close()
+			raise
+		if self.complete:
+			self._scan_fd.close()
+			return
+		self._thread = threading.Thread(target=self._index)
+		self._thread.daemon = True
+		self._thread.start()
+
+	def __len__(self):
+
+		return self._indexed[0]
+
+	def close(self):
+
+		"""
+		desc:
+			Releases the files that the source has opened. If the file is
+			still being indexed, indexing is stopped after the current part
+			of the file.
+		"""
+
+		self._closed = True
+		if self._thread is not None:
+			self._thread.join()
+		self._scan_fd.close()
+		with self._lock:
+			self._fd.close()
+		DataSource.close(self)
+
+	def _index(self):
+
+		"""
+		desc:
+			Indexes the file in the background. If a part of the file cannot
+			be indexed, the rows up to that part remain available, and the
+			error is kept in `error`.
+		"""
+
+		try:
+			while not self.complete and not self._closed:
+				self._scan()
+		except (ValueError, IOError) as e:
+			self.error = e
+			self.complete = True
+		finally:
+			self._scan_fd.close()
+
+	def _scan(self):
+
+		"""
+		desc:
+			Indexes the next SCAN_SIZE bytes of the file.
+		"""
+
+		length, end = self._indexed
+		self._scan_fd.seek(end)
+		data = self._scan_fd.read(SCAN_SIZE)
+		newlines = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == 10)
+		if len(data) < SCAN_SIZE:
+			# The last line may not end with a newline
+			if data and (len(newlines) == 0 or
+					newlines[-1] != len(data) - 1):
+				newlines = np.append(newlines, len(data) - 1)
+		elif len(newlines) == 0:
+			# A single line that is longer than SCAN_SIZE
+			raise ValueError(u'Lines are too long to index')
+		# The row number after every newline, and the offset of the row that
+		# starts there
+		rownrs = length + np.arange(1, len(newlines) + 1)
+		offsets = end + newlines + 1
+		self._offsets.extend(offsets[rownrs % BLOCK_SIZE == 0].tolist())
+		if len(newlines):
+			self._indexed = length + len(newlines), int(offsets[-1])
+		if len(data) < SCAN_SIZE:
+			self.complete = True
+
+	def _read_block(self, blocknr):
+
+		length, end = self._indexed
+		start = self._offsets[blocknr]
+		if blocknr + 1 < len(self._offsets):
+			stop = self._offsets[blocknr + 1]
+		else:
+			stop = end
+		nrows = min(BLOCK_SIZE, length - blocknr * BLOCK_SIZE)
+		self._fd.seek(start)
+		text = self._fd.read(stop - start).decode(self.encoding, u'replace')
+		ncols = len(self._columns)
+		block = [[u''] * nrows for colnr in range(ncols)]
+		for rownr, row in enumerate(csv.reader(io.StringIO(text),
+				delimiter=self.delimiter)):
+			if rownr >= nrows:
+				break
+			for colnr, text in enumerate(row[:ncols]):
+				block[colnr][rownr] = parse_value(text)
+		return block
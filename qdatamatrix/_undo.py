@@ -0,0 +1,717 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from datamatrix.py3compat import *
+from datamatrix import DataMatrix
+from datamatrix._datamatrix._basecolumn import BaseColumn
+from datamatrix._datamatrix._index import Index
+import numpy as np
+import array
+import copy
+import itertools
+import os
+import sys
+import zlib
+import pickle
+import shutil
+import tempfile
+import weakref
+
+SIZE_SAMPLE = 100
+POLICIES = u'spill', u'drop'
+
+
+def estimate_size(value):
+
+	"""
+	desc:
+		Estimates the number of bytes that a value occupies in memory. Long
+		lists are estimated from a sample of their elements.
+
+	arguments:
+		value:	Any value, including a DataMatrix or a column.
+
+	returns:
+		type:	int
+	"""
+
+	if isinstance(value, DataMatrix):
+		return sum(estimate_size(col) for col in value._cols.values())
+	if isinstance(value, BaseColumn):
+		return estimate_size(value._seq)
+	if hasattr(value, u'nbytes'):
+		return int(value.nbytes)
+	if isinstance(value, (list, tuple)):
+		size = sys.getsizeof(value)
+		if not value:
+			return size
+		sample = value[:SIZE_SAMPLE]
+		return size + sum(estimate_size(v) for v in sample) \
+			* len(value) // len(sample)
+	return sys.getsizeof(value)
+
+
+def replace_rows(dm, other):
+
+	"""
+	desc:
+		Replaces the rows of a DataMatrix in place by the rows of a related
+		DataMatrix, such that references to the DataMatrix remain valid.
+
+	arguments:
+		dm:
+			type:	DataMatrix
+		other:
+			type:	DataMatrix
+	"""
+
+	object.__setattr__(dm, u'_cols', other._cols)
+	object.__setattr__(dm, u'_rowid', other._rowid)
+	for col in dm._cols.values():
+		col._datamatrix = dm
+
+
+def row_ids(rowid):
+
+	"""
+	returns:
+		desc:	The row ids of a DataMatrix or a column as an array. Columns
+				keep their row ids in an array or an Index, depending on
+				their type.
+		type:	ndarray
+	"""
+
+	if isinstance(rowid, Index):
+		return np.array(rowid._a, dtype=rowid._a.typecode)
+	return rowid
+
+
+def like_row_ids(rowid, a):
+
+	"""
+	returns:
+		desc:	An array of row ids in the same form as `rowid`, that is, an
+				Index or an array.
+		type:	[Index, ndarray]
+	"""
+
+	if isinstance(rowid, Index):
+		typecode = rowid._a.typecode
+		return Index(array.array(typecode, a.astype(typecode).tobytes()))
+	return a.astype(rowid.dtype)
+
+
+def with_rows(col, dm, rowid, seq):
+
+	"""
+	desc:
+		Creates a shallow copy of a column, which belongs to another
+		DataMatrix and contains other rows. This works for all column types,
+		because the values of a column are kept in an array or a list, and
+		only these are replaced.
+
+	arguments:
+		col:
+			type:	BaseColumn
+		dm:
+			type:	DataMatrix
+		rowid:
+			type:	ndarray
+		seq:
+			type:	[ndarray, list]
+
+	returns:
+		type:	BaseColumn
+	"""
+
+	new = copy.copy(col)
+	new._datamatrix = dm
+	new._rowid = like_row_ids(col._rowid, rowid)
+	new._seq = seq
+	return new
+
+
+def merge_seq(seq, other, mask):
+
+	"""
+	desc:
+		Merges the values of two columns, where the values of `other` go where
+		`mask` is True, and the values of `seq` go elsewhere.
+
+	arguments:
+		seq:
+			type:	[ndarray, list]
+		other:
+			type:	[ndarray, list]
+		mask:
+			type:	ndarray
+
+	returns:
+		desc:	The merged values, in the same form as `seq`.
+		type:	[ndarray, list]
+	"""
+
+	if isinstance(seq, np.ndarray):
+		merged = np.empty((len(mask),) + seq.shape[1:], dtype=seq.dtype)
+	else:
+		merged = np.empty(len(mask), dtype=object)
+	merged[~mask] = seq
+	merged[mask] = other
+	return merged if isinstance(seq, np.ndarray) else merged.tolist()
+
+
+def take_seq(seq, rows):
+
+	"""
+	returns:
+		desc:	The values of a column at `rows`, which is a boolean mask or an
+				array of row indices, in the same form as `seq`.
+		type:	[ndarray, list]
+	"""
+
+	if isinstance(seq, np.ndarray):
+		return seq[rows]
+	if rows.dtype == bool:
+		return list(itertools.compress(seq, rows.tolist()))
+	return [seq[rownr] for rownr in rows.tolist()]
+
+
+def select_rows(dm, rows):
+
+	"""
+	desc:
+		Selects rows from a DataMatrix, in the specified order. The values and
+		row ids of every column are indexed as a whole, rather than looked up
+		row by row. Unlike `dm[rownrs]`, this also works for lists of length
+		two when the DataMatrix contains a SeriesColumn.
+
+	arguments:
+		dm:
+			type:	DataMatrix
+		rows:
+			desc:	A boolean mask, or an array of row indices.
+			type:	ndarray
+
+	returns:
+		type:	DataMatrix
+	"""
+
+	length = int(rows.sum()) if rows.dtype == bool else len(rows)
+	selected = DataMatrix(length=length)
+	object.__setattr__(selected, u'_rowid',
+		like_row_ids(dm._rowid, row_ids(dm._rowid)[rows]))
+	object.__setattr__(selected, u'_id', dm._id)
+	for name in list(dm._cols):
+		col = dm._instantiate_column(name)
+		selected._cols[name] = with_rows(col, selected,
+			row_ids(col._rowid)[rows], take_seq(col._seq, rows))
+	return selected
+
+
+def remove_rows(dm, rownrs):
+
+	"""
+	desc:
+		Removes rows from a DataMatrix in place. Unlike `del dm[rownr]`, this
+		preserves the order of the remaining rows. The values and row ids of
+		every column are split with a mask, rather than row by row.
+
+	arguments:
+		dm:
+			type:	DataMatrix
+		rownrs:
+			desc:	A sorted list of row indices.
+			type:	list
+
+	returns:
+		desc:	A DataMatrix with the removed rows.
+		type:	DataMatrix
+	"""
+
+	mask = np.zeros(len(dm), dtype=bool)
+	mask[rownrs] = True
+	removed = select_rows(dm, mask)
+	replace_rows(dm, select_rows(dm, ~mask))
+	return removed
+
+
+def insert_column(dm, name, col, colnr):
+
+	"""
+	desc:
+		Inserts an existing column object into a DataMatrix at a specific
+		position.
+
+	arguments:
+		dm:
+			type:	DataMatrix
+		name:
+			type:	str
+		col:
+			type:	BaseColumn
+		colnr:
+			type:	int
+	"""
+
+	col._datamatrix = dm
+	dm._cols[name] = col
+	for other_name in list(dm._cols)[colnr:-1]:
+		dm._cols.move_to_end(other_name)
+
+
+class UndoAction(object):
+
+	"""
+	desc:
+		A group of commands that is undone as a whole. Every undoable
+		operation corresponds to one action. Commands store only the changed
+		parts of the DataMatrix, so that the size of an action depends on the
+		size of the edit, and not on the size of the DataMatrix.
+	"""
+
+	def __init__(self, cursor_pos):
+
+		self.cursor_pos = cursor_pos
+		self.commands = []
+
+	def size(self):
+
+		"""
+		returns:
+			desc:	The estimated number of bytes that the action occupies in
+					memory.
+			type:	int
+		"""
+
+		return sum(
+			estimate_size(list(vars(command).values()))
+			for command in self.commands
+		)
+
+	def add(self, command):
+
+		self.commands.append(command)
+
+	def add_cell(self, name, rownr, rowid, old, new):
+
+		"""
+		desc:
+			Adds a changed cell. Consecutive cell changes in the same column
+			are merged into a single command.
+		"""
+
+		if self.commands and isinstance(self.commands[-1], SetCells) and \
+				self.commands[-1].name == name:
+			command = self.commands[-1]
+		else:
+			command = SetCells(name)
+			self.add(command)
+		command.add(rownr, rowid, old, new)
+
+	def undo(self, dm):
+
+		"""
+		desc:
+			Undoes all commands in reverse order.
+
+		returns:
+			desc:	A list of (column name, start, stop) tuples of rows of the
+					DataMatrix that have been changed, or None if the
+					structure of the DataMatrix changed.
+			type:	[list, None]
+		"""
+
+		ranges = []
+		for command in self.commands[::-1]:
+			changed = command.undo(dm)
+			if changed is None:
+				ranges = None
+			elif ranges is not None:
+				ranges += changed
+		return ranges
+
+
+class SetCells(object):
+
+	"""
+	desc:
+		Records changes to cells in a single column.
+	"""
+
+	def __init__(self, name):
+
+		self.name = name
+		self.rownrs = []
+		self.rowids = []
+		self.old = []
+		self.new = []
+
+	def add(self, rownr, rowid, old, new):
+
+		self.rownrs.append(rownr)
+		self.rowids.append(rowid)
+		self.old.append(old)
+		self.new.append(new)
+
+	def undo(self, dm):
+
+		col = dm[self.name]
+		ranges = []
+		for rownr, rowid, old in zip(self.rownrs[::-1], self.rowids[::-1],
+				self.old[::-1]):
+			# Rows are normally still where they were, but if the DataMatrix
+			# has been modified outside of the widget, we look them up by
+			# their row id.
+			if rownr >= len(dm) or dm._rowid[rownr] != rowid:
+				try:
+					rownr = dm._rowid.index(rowid)
+				except KeyError:
+					continue
+			col[rownr] = old
+			ranges.append((self.name, rownr, rownr + 1))
+		return ranges
+
+
+class SetSlice(object):
+
+	"""
+	desc:
+		Records a change to a contiguous range of cells in a single column,
+		which happens when a block of cells is pasted.
+	"""
+
+	def __init__(self, name, rownr, rowids, old):
+
+		"""
+		desc:
+			Constructor.
+
+		arguments:
+			name:
+				desc:	The column name.
+				type:	str
+			rownr:
+				desc:	The first row of the range.
+				type:	int
+			rowids:
+				desc:	The row ids of the range.
+				type:	array
+			old:
+				desc:	The old values of the range.
+				type:	[list, ndarray]
+		"""
+
+		self.name = name
+		self.rownr = rownr
+		self.rowids = rowids
+		self.old = old
+
+	def undo(self, dm):
+
+		col = dm[self.name]
+		stop = self.rownr + len(self.old)
+		if stop <= len(dm) and dm._rowid[self.rownr:stop]._a == self.rowids:
+			col[self.rownr:stop] = self.old
+			return [(self.name, self.rownr, stop)]
+		ranges = []
+		for rowid, old in zip(self.rowids, self.old):
+			try:
+				rownr = dm._rowid.index(rowid)
+			except KeyError:
+				continue
+			col[rownr] = old
+			ranges.append((self.name, rownr, rownr + 1))
+		return ranges
+
+
+class Rename(object):
+
+	"""
+	desc:
+		Records a renamed column.
+	"""
+
+	def __init__(self, old, new):
+
+		self.old = old
+		self.new = new
+
+	def undo(self, dm):
+
+		dm.rename(self.new, self.old)
+
+
+class AddColumn(object):
+
+	"""
+	desc:
+		Records an added column.
+	"""
+
+	def __init__(self, name):
+
+		self.name = name
+
+	def undo(self, dm):
+
+		del dm[self.name]
+
+
+class RemoveColumn(object):
+
+	"""
+	desc:
+		Records a removed column. The column object itself is kept, so that
+		no data is copied.
+	"""
+
+	def __init__(self, name, col, colnr):
+
+		self.name = name
+		self.col = col
+		self.colnr = colnr
+
+	def undo(self, dm):
+
+		insert_column(dm, self.name, self.col, self.colnr)
+
+
+class SetLength(object):
+
+	"""
+	desc:
+		Records a change in the length of the DataMatrix, which happens when
+		rows are added.
+	"""
+
+	def __init__(self, length):
+
+		self.length = length
+
+	def undo(self, dm):
+
+		dm.length = self.length
+
+
+class RemoveRows(object):
+
+	"""
+	desc:
+		Records removed rows. Only the removed rows are kept.
+	"""
+
+	def __init__(self, rownrs, removed):
+
+		self.rownrs = rownrs
+		self.removed = removed
+
+	def undo(self, dm):
+
+		# DataMatrix objects lose their id when they are pickled, which
+		# happens when the action is spilled to disk. The removed rows need to
+		# have the same id as the DataMatrix in order to be merged with it.
+		object.__setattr__(self.removed, u'_id', dm._id)
+		if list(dm._cols) != list(self.removed._cols):
+			# The columns have been changed outside of the widget, in which
+			# case the rows are merged through the DataMatrix
+			self._merge(dm)
+			return
+		mask = np.zeros(len(dm) + len(self.removed), dtype=bool)
+		mask[self.rownrs] = True
+		restored = DataMatrix(length=len(mask))
+		object.__setattr__(restored, u'_rowid', like_row_ids(dm._rowid,
+			merge_seq(row_ids(dm._rowid), row_ids(self.removed._rowid),
+			mask)))
+		for name in list(dm._cols):
+			col = dm._instantiate_column(name)
+			other = self.removed._cols[name]
+			restored._cols[name] = with_rows(col, restored,
+				merge_seq(row_ids(col._rowid), row_ids(other._rowid), mask),
+				merge_seq(col._seq, other._seq, mask))
+		replace_rows(dm, restored)
+
+	def _merge(self, dm):
+
+		removed = dict(zip(self.rownrs, self.removed._rowid))
+		kept = iter(dm._rowid)
+		rowids = [
+			removed[rownr] if rownr in removed else next(kept)
+			for rownr in range(len(dm) + len(removed))
+		]
+		replace_rows(dm, (dm | self.removed)._selectrowid(Index(rowids)))
+
+
+class SpilledAction(object):
+
+	"""
+	desc:
+		An UndoAction that has been compressed and written to disk.
+	"""
+
+	def __init__(self, action, folder):
+
+		fd, self.path = tempfile.mkstemp(dir=folder, suffix=u'.undo')
+		data = zlib.compress(
+			pickle.dumps(action, pickle.HIGHEST_PROTOCOL))
+		with os.fdopen(fd, u'wb') as fd:
+			fd.write(data)
+		self.nbytes = len(data)
+
+	def load(self):
+
+		"""
+		returns:
+			desc:	The original action. The file on disk is removed.
+			type:	UndoAction
+		"""
+
+		with open(self.path, u'rb') as fd:
+			action = pickle.loads(zlib.decompress(fd.read()))
+		self.remove()
+		return action
+
+	def remove(self):
+
+		if os.path.exists(self.path):
+			os.remove(self.path)
+
+
+class UndoStack(object):
+
+	"""
+	desc:
+		A stack of UndoAction objects with an optional memory budget. When the
+		actions that are kept in memory exceed the budget, the oldest actions
+		are either spilled to a temporary folder on disk, or dropped,
+		depending on the policy. The most recent action is always kept in
+		memory.
+	"""
+
+	def __init__(self, budget=None, policy=u'spill'):
+
+		"""
+		desc:
+			Constructor.
+
+		keywords:
+			budget:
+				desc:	The maximum number of bytes that the undo history may
+						occupy in memory, or None for no limit.
+				type:	[int, None]
+			policy:
+				desc:	'spill' to move old actions to disk, or 'drop' to
+						discard them.
+				type:	str
+		"""
+
+		self.budget = budget
+		self.policy = policy
+		self._entries = []
+		self._folder = None
+
+	@property
+	def policy(self):
+
+		return self._policy
+
+	@policy.setter
+	def policy(self, policy):
+
+		if policy not in POLICIES:
+			raise ValueError(u'Unknown undo policy: %s' % policy)
+		self._policy = policy
+
+	@property
+	def memory_usage(self):
+
+		return sum(entry.nbytes for entry in self._entries
+			if not isinstance(entry, SpilledAction))
+
+	@property
+	def disk_usage(self):
+
+		return sum(entry.nbytes for entry in self._entries
+			if isinstance(entry, SpilledAction))
+
+	@property
+	def spilled_count(self):
+
+		return sum(1 for entry in self._entries
+			if isinstance(entry, SpilledAction))
+
+	def __len__(self):
+
+		return len(self._entries)
+
+	def push(self, action):
+
+		"""
+		desc:
+			Adds an action to the stack, and enforces the memory budget.
+		"""
+
+		# The size is determined once, when the action is complete
+		action.nbytes = action.size()
+		self._entries.append(action)
+		self.enforce_budget()
+
+	def pop(self):
+
+		"""
+		returns:
+			desc:	The most recent action, which is read back from disk if
+					necessary.
+			type:	UndoAction
+		"""
+
+		entry = self._entries.pop()
+		if isinstance(entry, SpilledAction):
+			return entry.load()
+		return entry
+
+	def clear(self):
+
+		for entry in self._entries:
+			if isinstance(entry, SpilledAction):
+				entry.remove()
+		self._entries = []
+
+	def enforce_budget(self):
+
+		if self.budget is None:
+			return
+		memory_usage = self.memory_usage
+		entries = []
+		for i, entry in enumerate(self._entries):
+			if memory_usage <= self.budget or isinstance(entry,
+					SpilledAction) or i == len(self._entries) - 1:
+				entries.append(entry)
+				continue
+			memory_usage -= entry.nbytes
+			if self.policy == u'spill':
+				entries.append(SpilledAction(entry, self._spill_folder()))
+		self._entries = entries
+
+	def _spill_folder(self):
+
+		if self._folder is None:
+			self._folder = tempfile.mkdtemp(prefix=u'qdatamatrix-undo-')
+			# The folder is removed when the stack is garbage collected
+			weakref.finalize(self, shutil.rmtree, self._folder, True)
+		return self._folder
@@ -18,70 +18,192 @@ along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 from datamatrix.py3compat import *
+from qdatamatrix._profiler import clock
+import functools
 
 
-def disconnected(fnc):
+def profiled(fnc):
+
+	"""
+	desc:
+		A decorator that records the number of calls and the duration of a
+		function in the profiler of the spreadsheet, if profiling is enabled.
+		Calls that raise an exception are recorded as well. Leading
+		underscores are stripped from the name of the function.
+	"""
 
+	name = fnc.__name__.lstrip(u'_')
+
+	@functools.wraps(fnc)
 	def inner(self, *args, **kwdict):
 
+		profiler = self._profiler
+		if not profiler.enabled:
+			return fnc(self, *args, **kwdict)
+		t0 = clock()
 		try:
-			self.cellChanged.disconnect()
-			cellChanged = True
-		except:
-			cellChanged = False
-		retval = fnc(self, *args, **kwdict)
-		if cellChanged:
-			self.cellChanged.connect(self._on_cell_changed)
-		return retval
+			return fnc(self, *args, **kwdict)
+		finally:
+			profiler.record(name, clock() - t0)
 
 	return inner
 
-def silent(fnc):
 
+def editable(fnc):
+
+	"""
+	desc:
+		A decorator that makes a function do nothing if the spreadsheet is
+		read-only. The check comes before the other decorators, so that no
+		undo action is started for a change that cannot be made.
+	"""
+
+	@functools.wraps(fnc)
 	def inner(self, *args, **kwdict):
 
-		_silent = self._silent
-		self._silent = True
-		retval = fnc(self, *args, **kwdict)
-		self._silent = _silent
-		return retval
+		if self.read_only:
+			return None
+		return fnc(self, *args, **kwdict)
 
 	return inner
 
-def undoable(fnc):
+
+def _wrapper(fnc, name, before, after):
 
 	"""
 	desc:
-		A decorator that adds the operations done by a function to the undo
-		stack.
+		Wraps a function in code that is executed before and after it. The
+		code after the function is also executed when the function raises an
+		exception, so that the flags that are set by the decorators are
+		always restored. If profiling is enabled, the time spent in this
+		code, excluding the function itself, is recorded under the name of
+		the decorator, so that the overhead of the decorators shows up
+		separately.
+
+	arguments:
+		fnc:
+			desc:	The function to wrap.
+		name:
+			desc:	The name of the decorator.
+			type:	str
+		before:
+			desc:	A function that receives the spreadsheet, and returns a
+					state that is passed to `after`.
+		after:
+			desc:	A function that receives the spreadsheet and the state.
 	"""
 
+	@functools.wraps(fnc)
 	def inner(self, *args, **kwdict):
 
-		if self._auto_update:
-			undo = self._start_undo_action()
-		else:
-			undo = False
-		retval = fnc(self, *args, **kwdict)
-		if undo:
-			self._end_undo_action()
-		return retval
+		profiler = self._profiler
+		if not profiler.enabled:
+			state = before(self)
+			try:
+				return fnc(self, *args, **kwdict)
+			finally:
+				after(self, state)
+		t0 = clock()
+		state = before(self)
+		t1 = clock()
+		try:
+			return fnc(self, *args, **kwdict)
+		finally:
+			t2 = clock()
+			after(self, state)
+			profiler.record(name, t1 - t0 + clock() - t2)
 
 	return inner
 
 
-def fix_cursor(fnc):
+def _disconnect(self):
+
+	disconnected = self._disconnected
+	self._disconnected = True
+	return disconnected
+
+
+def _reconnect(self, disconnected):
+
+	self._disconnected = disconnected
+
+
+def disconnected(fnc):
 
 	"""
 	desc:
-		A decorator that preserves the cursor position.
+		A decorator that keeps changes to cells from being handled as edits
+		while the function runs. This sets a flag that is checked when
+		`cellChanged` is emitted, which is much cheaper than disconnecting
+		and reconnecting the signal.
 	"""
 
-	def inner(self, *args, **kwdict):
+	return _wrapper(fnc, u'@disconnected', _disconnect, _reconnect)
+
+
+def _make_silent(self):
+
+	_silent = self._silent
+	self._silent = True
+	return _silent
+
+
+def _restore_silent(self, _silent):
+
+	self._silent = _silent
+
 
-		pos = self._cursor_pos
-		retval = fnc(self, *args, **kwdict)
+def silent(fnc):
+
+	return _wrapper(fnc, u'@silent', _make_silent, _restore_silent)
+
+
+def _start_undo(self):
+
+	if self._auto_update:
+		return self._start_undo_action()
+	return False
+
+
+def _end_undo(self, undo):
+
+	if undo:
+		self._end_undo_action()
+		# Sorted and filtered rows are moved once the operation is done
+		self._sync_row_index()
+
+
+def undoable(fnc):
+
+	"""
+	desc:
+		A decorator that adds the operations done by a function to the undo
+		stack, and that moves rows whose sort keys or filter values have
+		changed once the function is done.
+	"""
+
+	return _wrapper(fnc, u'@undoable', _start_undo, _end_undo)
+
+
+def _get_cursor(self):
+
+	# During a batch update, the cursor is restored once at the end
+	if self._batch_depth:
+		return None
+	return self._cursor_pos
+
+
+def _set_cursor(self, pos):
+
+	if pos is not None:
 		self._cursor_pos = pos
-		return retval
 
-	return inner
+
+def fix_cursor(fnc):
+
+	"""
+	desc:
+		A decorator that preserves the cursor position.
+	"""
+
+	return _wrapper(fnc, u'@fix_cursor', _get_cursor, _set_cursor)
@@ -35,7 +35,7 @@ setup(
 	license='GNU GPL Version 3',
 	url='https://github.com/open-cogsci/qdatamatrix',
 	packages=find_packages('.'),
-	install_requires=['datamatrix'],
+	install_requires=['datamatrix', 'numpy'],
 	classifiers=[
 		'Development Status :: 4 - Beta',
 		'Intended Audience :: Science/Research',
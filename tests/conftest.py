@@ -0,0 +1,70 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import os
+# Tests run without a display
+os.environ.setdefault(u'QT_QPA_PLATFORM', u'offscreen')
+from datamatrix.py3compat import *
+import gc
+import sys
+import pytest
+from qtpy import QtWidgets
+
+
+@pytest.fixture(scope=u'session')
+def qapp():
+
+	app = QtWidgets.QApplication.instance()
+	if app is None:
+		app = QtWidgets.QApplication([])
+	return app
+
+
+@pytest.fixture(autouse=True)
+def collect_widgets():
+
+	"""
+	desc:
+		Closes the widgets of a test and collects them once the test is done.
+		Otherwise they are collected whenever the garbage collector happens
+		to run, which may be while another widget is being painted.
+	"""
+
+	yield
+	app = QtWidgets.QApplication.instance()
+	if app is not None:
+		for widget in app.topLevelWidgets():
+			widget.close()
+	gc.collect()
+
+
+@pytest.fixture
+def slot_errors(monkeypatch):
+
+	"""
+	desc:
+		Collects exceptions that are raised in Qt slots. PyQt aborts the
+		process on such exceptions, unless sys.excepthook has been replaced.
+	"""
+
+	errors = []
+	monkeypatch.setattr(sys, u'excepthook',
+		lambda cls, exc, tb: errors.append(exc))
+	return errors
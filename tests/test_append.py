@@ -0,0 +1,123 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from datamatrix.py3compat import *
+from datamatrix import DataMatrix, IntColumn, FloatColumn, SeriesColumn
+from datamatrix import operations as ops
+from qdatamatrix import QDataMatrix
+import numpy as np
+import pytest
+
+
+def make_chunks():
+
+	dm = DataMatrix(length=2)
+	dm.i = IntColumn
+	dm.i = 1, 2
+	dm.s = SeriesColumn(depth=2)
+	dm.s = 1
+	chunk1 = DataMatrix(length=2)
+	chunk1.i = IntColumn
+	chunk1.i = 3, 4
+	chunk1.t = SeriesColumn(depth=3)
+	chunk1.t = 2
+	chunk2 = DataMatrix(length=3)
+	chunk2.f = FloatColumn
+	chunk2.f = 1.5
+	chunk2.m = u'a'
+	chunk2.s = SeriesColumn(depth=4)
+	chunk2.s = 3
+	return dm, chunk1, chunk2
+
+
+def state(dm):
+
+	# NaN values are compared through their text representation
+	return [
+		(name, type(col).__name__, repr(np.asarray(col._seq).tolist()))
+		for name, col in sorted(dm.columns)
+	]
+
+
+@pytest.mark.parametrize(u'virtual', [False, True], ids=[u'items',
+	u'virtual'])
+def test_chunks_with_different_columns(qapp, virtual):
+
+	dm, chunk1, chunk2 = make_chunks()
+	expected = state(ops.stack(dm, chunk1, chunk2))
+	dm, chunk1, chunk2 = make_chunks()
+	qdm = QDataMatrix(dm, virtual=virtual)
+	qdm.append_rows(chunk1)
+	qdm.append_rows(chunk2)
+	qdm._flush_rows()
+	# New columns and missing cells are the same as when stacking
+	assert state(dm) == expected
+	assert qdm._spreadsheet._view_length == 7
+	assert dm.t.depth == 3
+	assert dm.s.depth == 4
+
+
+@pytest.mark.parametrize(u'virtual', [False, True], ids=[u'items',
+	u'virtual'])
+def test_collected_rows(qapp, virtual):
+
+	dm = DataMatrix(length=2)
+	dm.a = IntColumn
+	dm.a = 1, 2
+	qdm = QDataMatrix(dm, virtual=virtual)
+	qdm.emitted = []
+	qdm.changed.connect(lambda: qdm.emitted.append(u'changed'))
+	qdm.follow_tail = True
+	qdm.resize(200, 200)
+	qdm.show()
+	for i in range(100):
+		chunk = DataMatrix(length=1)
+		chunk.a = IntColumn
+		chunk.a = i
+		qdm.append_rows(chunk)
+	# Rows are collected until the tail interval has passed
+	assert len(dm) == 2
+	assert qdm._tail_timer.isActive()
+	qdm._tail_timer.stop()
+	qdm._flush_rows()
+	qapp.processEvents()
+	assert len(dm) == 102
+	assert list(dm.a[-3:]) == [97, 98, 99]
+	assert qdm._spreadsheet._view_length == 102
+	# Appended rows are neither undoable nor signalled as changes
+	assert not len(qdm._spreadsheet._undo_stack)
+	assert not qdm.emitted
+	# The last row is scrolled into view
+	spreadsheet = qdm._spreadsheet
+	assert spreadsheet.verticalScrollBar().value() > 0
+	rect = spreadsheet.visualRect(spreadsheet.model().index(102, 0))
+	assert spreadsheet.viewport().rect().contains(rect)
+
+
+def test_append_to_source(qapp, tmpdir):
+
+	path = tmpdir.join(u'data.csv')
+	path.write(u'a\n1\n')
+	from qdatamatrix import CSVSource
+	source = CSVSource(str(path))
+	qdm = QDataMatrix(source)
+	with pytest.raises(TypeError):
+		qdm.append_rows(DataMatrix(length=1))
+	source.close()
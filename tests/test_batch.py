@@ -0,0 +1,90 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from datamatrix.py3compat import *
+from datamatrix import DataMatrix, IntColumn
+from qdatamatrix import QDataMatrix
+import pytest
+
+
+@pytest.fixture(params=[False, True], ids=[u'items', u'virtual'])
+def qdm(request, qapp):
+
+	dm = DataMatrix(length=10)
+	dm.a = IntColumn
+	dm.a = range(10)
+	qdm = QDataMatrix(dm, virtual=request.param)
+	qdm.emitted = []
+	qdm.changed.connect(lambda: qdm.emitted.append(u'changed'))
+	qdm.cellschanged.connect(
+		lambda *box: qdm.emitted.append((u'cellschanged', box)))
+	qdm.changeset.connect(lambda changes: qdm.emitted.append(changes))
+	return qdm
+
+
+def test_batch_update(qapp, qdm):
+
+	spreadsheet = qdm._spreadsheet
+	undo_depth = len(spreadsheet._undo_stack)
+	with qdm.batch_update():
+		for rownr in range(1, 11):
+			spreadsheet._setcell(rownr, 0, u'%d' % (rownr * 10))
+		assert not qdm.emitted
+	qapp.processEvents()
+	# All changes are emitted at once, and undone at once
+	assert qdm.emitted[:2] == [u'changed', (u'cellschanged', (1, 0, 10, 0))]
+	assert len(qdm.emitted) == 3
+	assert qdm.emitted[2].changes(u'a')[2] == list(range(10, 110, 10))
+	assert len(spreadsheet._undo_stack) == undo_depth + 1
+	assert list(qdm.dm.a) == list(range(10, 110, 10))
+	spreadsheet._undo()
+	assert list(qdm.dm.a) == list(range(10))
+
+
+def test_nested(qapp, qdm):
+
+	spreadsheet = qdm._spreadsheet
+	undo_depth = len(spreadsheet._undo_stack)
+	with qdm.batch_update():
+		spreadsheet._setcell(1, 0, u'10')
+		with qdm.batch_update():
+			spreadsheet._setcell(2, 0, u'20')
+		# Nothing happens until the outermost block ends
+		qapp.processEvents()
+		assert not qdm.emitted
+		assert not spreadsheet.updatesEnabled()
+	assert spreadsheet.updatesEnabled()
+	assert qdm.emitted.count(u'changed') == 1
+	assert len(spreadsheet._undo_stack) == undo_depth + 1
+
+
+def test_exception(qapp, qdm):
+
+	spreadsheet = qdm._spreadsheet
+	with pytest.raises(ValueError):
+		with qdm.batch_update():
+			spreadsheet._setcell(1, 0, u'10')
+			raise ValueError()
+	# The batch is ended, and the change can be undone
+	assert not spreadsheet._batch_depth
+	assert spreadsheet.updatesEnabled()
+	assert not qdm.signalsBlocked()
+	spreadsheet._undo()
+	assert qdm.dm.a[0] == 0
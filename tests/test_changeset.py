@@ -0,0 +1,95 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from datamatrix.py3compat import *
+from datamatrix import DataMatrix, IntColumn
+from qdatamatrix import QDataMatrix
+import pytest
+
+
+@pytest.fixture(params=[False, True], ids=[u'items', u'virtual'])
+def qdm(request, qapp):
+
+	dm = DataMatrix(length=4)
+	dm.a = IntColumn
+	dm.a = range(4)
+	dm.b = u'x'
+	qdm = QDataMatrix(dm, virtual=request.param)
+	qdm.emitted = []
+	qdm.cellschanged.connect(
+		lambda *box: qdm.emitted.append((u'cellschanged', box)))
+	qdm.changeset.connect(
+		lambda changes: qdm.emitted.append((u'changeset', changes)))
+	return qdm
+
+
+def test_coalesced(qapp, qdm):
+
+	dm = qdm.dm
+	spreadsheet = qdm._spreadsheet
+	rowids = list(dm._rowid)
+	spreadsheet._setcell(1, 0, u'10')
+	spreadsheet._setcell(3, 0, u'30')
+	spreadsheet._setcell(2, 1, u'y')
+	# Changes are emitted once control returns to the event loop
+	assert not qdm.emitted
+	qapp.processEvents()
+	assert [signal for signal, arg in qdm.emitted] == \
+		[u'cellschanged', u'changeset']
+	assert qdm.emitted[0][1] == (1, 0, 3, 1)
+	changes = qdm.emitted[1][1]
+	assert not changes.reset
+	assert changes.column_names == [u'a', u'b']
+	assert changes.changes(u'a') == ([rowids[0], rowids[2]], [0, 2],
+		[10, 30])
+	assert changes.changes(u'b') == ([rowids[1]], [u'x'], [u'y'])
+	assert changes.rowids == sorted([rowids[0], rowids[1], rowids[2]])
+	# Nothing is emitted when nothing has changed
+	qapp.processEvents()
+	assert len(qdm.emitted) == 2
+
+
+def test_undo_swaps_values(qapp, qdm):
+
+	spreadsheet = qdm._spreadsheet
+	spreadsheet._setcell(2, 0, u'10')
+	qapp.processEvents()
+	del qdm.emitted[:]
+	spreadsheet._undo()
+	qapp.processEvents()
+	changes = qdm.emitted[1][1]
+	assert changes.changes(u'a')[1:] == ([10], [1])
+
+
+def test_structure_changed(qapp, qdm):
+
+	qdm._spreadsheet._dm_add_column()
+	qapp.processEvents()
+	assert qdm.emitted[0][1] == (0, 0, 4, 2)
+	assert qdm.emitted[1][1].reset
+
+
+def test_notify_interval(qapp, qdm):
+
+	qdm.notify_interval = 60000
+	qdm._spreadsheet._setcell(1, 0, u'10')
+	qapp.processEvents()
+	assert not qdm.emitted
+	assert qdm._notify_timer.isActive()
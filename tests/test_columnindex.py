@@ -0,0 +1,166 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from datamatrix.py3compat import *
+from datamatrix import DataMatrix
+from qdatamatrix._columnindex import ColumnIndex, NEW_COLUMN_PREFIX
+from qdatamatrix import QDataMatrix, MemmapSource
+import numpy as np
+
+
+def make_dm():
+
+	dm = DataMatrix(length=2)
+	dm.b = 1
+	dm.a = 2
+	dm.c = 3
+	return dm
+
+
+def fresh(dm):
+
+	return ColumnIndex().names(dm)
+
+
+def fresh_column(dm, colnr):
+
+	return ColumnIndex().column(dm, colnr)
+
+
+def test_lookup():
+
+	dm = make_dm()
+	index = ColumnIndex()
+	assert index.names(dm) == dm.column_names
+	assert index.count(dm) == 3
+	for colnr, name in enumerate(dm.column_names):
+		assert index.colnr(dm, name) == colnr
+		assert index.column(dm, colnr) == dm.columns[colnr]
+	assert index.colnr(dm, u'missing') is None
+	assert index.columns(dm, 1) == dm.columns[1:]
+	assert index.columns(dm, 0, 2) == dm.columns[:2]
+
+
+def test_leading_names():
+
+	dm = make_dm()
+	index = ColumnIndex()
+	leading = index.leading_names(dm, 2)
+	assert u'a' in leading and u'b' in leading
+	assert u'c' not in leading
+	assert u'missing' not in leading
+
+
+def test_changes_outside_of_widget():
+
+	dm = make_dm()
+	index = ColumnIndex()
+	index.names(dm)
+	dm.d = 4
+	assert index.names(dm) == fresh(dm)
+	del dm.a
+	assert index.names(dm) == fresh(dm)
+	dm.rename(u'b', u'e')
+	assert index.names(dm) == fresh(dm)
+	# Removing a column and adding another keeps the length and the
+	# identity of the container
+	del dm.c
+	dm.f = 5
+	assert index.names(dm) == fresh(dm)
+	# If the last column is added again as well, the index is rebuilt once
+	# a column that has disappeared is looked up
+	del dm.d
+	del dm.f
+	dm.g = 6
+	dm.f = 7
+	assert index.column(dm, 0) == fresh_column(dm, 0)
+	assert index.names(dm) == fresh(dm)
+	del dm.e
+	del dm.f
+	dm.h = 8
+	dm.f = 9
+	assert index.columns(dm) == dm.columns
+
+
+def test_added_and_renamed():
+
+	dm = make_dm()
+	index = ColumnIndex()
+	index.names(dm)
+	name = index.unique_name(dm)
+	assert name == NEW_COLUMN_PREFIX + u'1'
+	dm[name] = u''
+	index.added(dm, name)
+	assert index.names(dm) == fresh(dm)
+	assert index.colnr(dm, name) == 3
+	index.renamed(dm, 3, u'renamed')
+	dm.rename(name, u'renamed')
+	assert index.names(dm) == [u'a', u'b', u'c', u'renamed']
+	assert index.colnr(dm, u'renamed') == 3
+	assert index.colnr(dm, name) is None
+
+
+def test_unique_name():
+
+	dm = make_dm()
+	index = ColumnIndex()
+	for i in range(1, 4):
+		name = index.unique_name(dm)
+		assert name == u'%s%d' % (NEW_COLUMN_PREFIX, i)
+		dm[name] = u''
+		index.added(dm, name)
+	del dm[NEW_COLUMN_PREFIX + u'1']
+	index.invalidate()
+	assert index.unique_name(dm) == NEW_COLUMN_PREFIX + u'1'
+
+
+def test_source():
+
+	source = MemmapSource(np.zeros((2, 3)), names=[u'x', u'y', u'z'])
+	index = ColumnIndex()
+	assert index.names(source) == [u'x', u'y', u'z']
+	assert index.count(source) == 3
+	assert index.colnr(source, u'z') == 2
+
+
+def test_model_after_changes_outside_of_widget(qapp):
+
+	dm = make_dm()
+	qdm = QDataMatrix(dm, virtual=True)
+	model = qdm._spreadsheet._model
+	del dm.a
+	dm.d = 4
+	# The model is painted before the widget is refreshed
+	texts = [
+		model.text(row, colnr) for colnr in range(3) for row in range(2)
+	]
+	assert texts == [u'b', u'1', u'c', u'3', u'd', u'4']
+
+
+def test_prefetch_columns(qapp):
+
+	qdm = QDataMatrix(make_dm(), virtual=True)
+	qdm.prefetch_columns = 0
+	assert qdm._spreadsheet.prefetch_columns == 0
+	first, last = qdm._spreadsheet._visible_columns()
+	qdm.prefetch_columns = 1
+	assert qdm.prefetch_columns == 1
+	assert qdm._spreadsheet._visible_columns() == (max(0, first - 1),
+		min(3, last + 1))
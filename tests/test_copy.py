@@ -0,0 +1,138 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from datamatrix.py3compat import *
+from datamatrix import DataMatrix, FloatColumn
+from qdatamatrix import QDataMatrix
+from qdatamatrix._copy import tsv_chunk, csv_column, csv_chunk, html_chunk, \
+	mime_data
+from qdatamatrix._qspreadsheetbase import EMPTY_STR
+from qtpy import QtWidgets
+import numpy as np
+import csv
+import io
+import pytest
+
+ROWS = [
+	[u'a', u'b', u'c'],
+	[u'1', u'', u'x,y'],
+	[u'say "hi"', u'line\nbreak', u'plain'],
+	[u'', u'', u''],
+]
+
+
+def columns(rows):
+
+	return [list(column) for column in zip(*rows)]
+
+
+def csv_module(rows):
+
+	fd = io.StringIO()
+	csv.writer(fd, lineterminator=u'\n').writerows(rows)
+	return fd.getvalue()
+
+
+def test_tsv_chunk():
+
+	assert tsv_chunk(columns(ROWS)) == u'\n'.join(
+		u'\t'.join(row) for row in ROWS)
+
+
+@pytest.mark.parametrize(u'rows', [
+	ROWS,
+	[[u'x'], [u''], [u'y']],
+	[[u'"'], [u',']],
+])
+def test_csv_chunk_matches_csv_module(rows):
+
+	assert csv_chunk(columns(rows)) == csv_module(rows)
+
+
+def test_csv_column():
+
+	texts = [u'a', u'b']
+	# Columns without special characters are returned as is
+	assert csv_column(texts) is texts
+	# Unlike the csv module, carriage returns are quoted
+	assert csv_column([u'a\rb', u'c']) == [u'"a\rb"', u'c']
+
+
+def test_html_chunk():
+
+	assert html_chunk([[u'<a>', u'b'], [u'&', u'd']]) == \
+		u'<tr><td>&lt;a&gt;</td><td>&amp;</td></tr>\n' \
+		u'<tr><td>b</td><td>d</td></tr>\n'
+
+
+def test_mime_data():
+
+	chunks = [columns(ROWS[:2]), columns(ROWS[2:])]
+	data = mime_data(chunks)
+	assert data.text() == tsv_chunk(columns(ROWS))
+	assert bytes(data.data(u'text/csv')).decode(u'utf-8') == csv_module(ROWS)
+	assert data.html() == u'<table>\n%s</table>' % html_chunk(columns(ROWS))
+	assert not mime_data(chunks, html=False).hasHtml()
+
+
+def test_mime_data_placeholder():
+
+	rows = [[u'a', u'?'], [u'?', u'b']]
+	data = mime_data([columns(rows)], placeholder=u'?')
+	assert data.text() == u'a\t?\n?\tb'
+	assert bytes(data.data(u'text/csv')).decode(u'utf-8') == u'a,\n,b\n'
+	assert u'?' not in data.html()
+
+
+@pytest.mark.parametrize(u'virtual', [False, True], ids=[u'items',
+	u'virtual'])
+def test_copy_multiple_ranges(qapp, virtual):
+
+	dm = DataMatrix(length=4)
+	dm.a = range(4)
+	dm.b = u'x', u'y', u'z', u'w'
+	dm.c = FloatColumn
+	dm.c = .5
+	qdm = QDataMatrix(dm, virtual=virtual)
+	spreadsheet = qdm._spreadsheet
+	# The column name of a, and two overlapping ranges in b and c
+	for top, left, bottom, right in (0, 0, 0, 0), (1, 1, 2, 2), (2, 2, 3, 2):
+		spreadsheet.setRangeSelected(QtWidgets.QTableWidgetSelectionRange(
+			top, left, bottom, right), True)
+	spreadsheet._copy()
+	data = spreadsheet._clipboard.mimeData()
+	rows = [
+		[u'a', EMPTY_STR, EMPTY_STR],
+		[EMPTY_STR, u'x', u'0.5'],
+		[EMPTY_STR, u'y', u'0.5'],
+		[EMPTY_STR, EMPTY_STR, u'0.5'],
+	]
+	assert data.text() == tsv_chunk(columns(rows))
+	assert bytes(data.data(u'text/csv')).decode(u'utf-8') == csv_module(
+		[[u'' if text == EMPTY_STR else text for text in row] for row in rows])
+	assert data.hasHtml()
+	# Cutting clears the selected cells, except for the column names
+	spreadsheet._cut()
+	assert dm.column_names == [u'a', u'b', u'c']
+	assert dm.b == [u'', u'', u'z', u'w']
+	assert np.isnan(dm.c[:3]).all() and dm.c[3] == .5
+	spreadsheet._undo()
+	assert dm.b == [u'x', u'y', u'z', u'w']
+	assert dm.c == .5
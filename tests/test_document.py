@@ -0,0 +1,126 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from datamatrix.py3compat import *
+from datamatrix import DataMatrix, FloatColumn
+from qdatamatrix import QDataMatrix
+from qdatamatrix._formatting import BLOCK_SIZE
+
+
+def make_views():
+
+	dm = DataMatrix(length=4 * BLOCK_SIZE)
+	dm.a = FloatColumn
+	dm.a = range(len(dm))
+	dm.b = u'x'
+	return dm, QDataMatrix(dm, virtual=True), QDataMatrix(dm)
+
+
+def test_views_share_document(qapp):
+
+	dm, qdm1, qdm2 = make_views()
+	assert qdm1._spreadsheet._document is qdm2._spreadsheet._document
+	assert qdm1._spreadsheet._formatter is qdm2._spreadsheet._formatter
+
+
+def test_undo_cell_keeps_other_views(qapp):
+
+	dm, qdm1, qdm2 = make_views()
+	spreadsheet = qdm1._spreadsheet
+	formatter = spreadsheet._formatter
+	colnr = spreadsheet._colnr(u'a')
+	spreadsheet._set_value(BLOCK_SIZE + 1, colnr, u'-1')
+	assert dm.a[BLOCK_SIZE] == -1
+	for blocknr in range(4):
+		formatter.block(u'a', dm.a, blocknr)
+	formatter.block(u'b', dm.b, 1)
+	spreadsheet._undo()
+	assert dm.a[BLOCK_SIZE] == BLOCK_SIZE
+	# Only the block of the undone cell is formatted again, and the other
+	# view is updated without being refreshed
+	assert [formatter.is_cached(u'a', blocknr) for blocknr in range(4)] == \
+		[True, False, True, True]
+	assert formatter.is_cached(u'b', 1)
+	assert not qdm2._spreadsheet._refresh_timer.isActive()
+	assert formatter.text(u'a', dm.a, BLOCK_SIZE) == u'256.0'
+
+
+def test_undo_structure_refreshes_other_views(qapp):
+
+	dm, qdm1, qdm2 = make_views()
+	spreadsheet = qdm1._spreadsheet
+	spreadsheet._set_value(0, spreadsheet._colnr(u'a'), u'renamed')
+	assert u'renamed' in dm
+	spreadsheet._undo()
+	assert u'a' in dm
+	assert qdm2._spreadsheet._refresh_timer.isActive()
+
+
+def test_edit_repaints_other_view(qapp, monkeypatch):
+
+	dm, qdm1, qdm2 = make_views()
+	other = qdm2._spreadsheet
+	repainted = []
+	monkeypatch.setattr(other, u'_repaint_range',
+		lambda *args: repainted.append(args))
+	spreadsheet = qdm1._spreadsheet
+	colnr = spreadsheet._colnr(u'b')
+	spreadsheet._set_value(3, colnr, u'y')
+	# Only the changed cell of the other view is repainted
+	assert repainted == [(3, colnr, 3, colnr)]
+	assert not other._refresh_timer.isActive()
+	assert other._formatter.text(u'b', dm.b, 2) == u'y'
+
+
+def test_shared_undo(qapp):
+
+	dm, qdm1, qdm2 = make_views()
+	spreadsheet = qdm1._spreadsheet
+	assert spreadsheet._undo_stack is qdm2._spreadsheet._undo_stack
+	spreadsheet._set_value(1, spreadsheet._colnr(u'b'), u'y')
+	# An edit through one view can be undone through the other
+	qdm2._spreadsheet._undo()
+	assert dm.b[0] == u'x'
+
+
+def test_sorted_view(qapp):
+
+	dm, qdm1, qdm2 = make_views()
+	qdm2.sort(u'a', reverse=True)
+	other = qdm2._spreadsheet
+	# A sorted view has a formatter of its own
+	assert other._formatter is not qdm1._spreadsheet._formatter
+	assert other._formatter.text(u'a', dm.a, 0) == u'%.1f' % (len(dm) - 1)
+	spreadsheet = qdm1._spreadsheet
+	spreadsheet._set_value(1, spreadsheet._colnr(u'b'), u'y')
+	assert other._formatter.text(u'b', dm.b, len(dm) - 1) == u'y'
+	# A change to the sort key reorders the other view
+	spreadsheet._set_value(1, spreadsheet._colnr(u'a'), u'10000')
+	assert other._refresh_timer.isActive()
+
+
+def test_detach(qapp):
+
+	dm, qdm1, qdm2 = make_views()
+	document = qdm1._spreadsheet._document
+	assert len(document.views) == 2
+	qdm2.dm = DataMatrix(length=1)
+	assert qdm2._spreadsheet._document is not document
+	assert list(document.views) == [qdm1._spreadsheet]
@@ -0,0 +1,94 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from datamatrix.py3compat import *
+from datamatrix import DataMatrix, FloatColumn
+from qdatamatrix._formatting import DisplayFormatter, BLOCK_SIZE
+from qdatamatrix._qformatpool import QFormatPool
+import pytest
+
+
+@pytest.fixture
+def pool(qapp):
+
+	pool = QFormatPool(DisplayFormatter())
+	pool.announced = []
+	pool.formatted.connect(
+		lambda name, blocknr: pool.announced.append((name, blocknr)))
+	return pool
+
+
+def make_dm():
+
+	dm = DataMatrix(length=2 * BLOCK_SIZE)
+	dm.a = FloatColumn
+	dm.a = range(len(dm))
+	return dm
+
+
+def wait(qapp, pool):
+
+	pool._pool.waitForDone()
+	for i in range(3):
+		qapp.processEvents()
+
+
+def test_request(qapp, pool):
+
+	dm = make_dm()
+	pool.request(u'a', dm.a, 1)
+	# Requesting a block that's being formatted doesn't start it again
+	pool.request(u'a', dm.a, 1)
+	wait(qapp, pool)
+	assert pool.announced == [(u'a', 1)]
+	assert pool.formatter.is_cached(u'a', 1)
+	assert not pool.formatter.is_cached(u'a', 0)
+	assert pool.formatter.text(u'a', dm.a, BLOCK_SIZE) == u'256.0'
+	# Blocks that have already been formatted are announced again
+	pool.request(u'a', dm.a, 1)
+	wait(qapp, pool)
+	assert pool.announced == [(u'a', 1), (u'a', 1)]
+
+
+def test_invalidated_while_formatting(qapp, pool):
+
+	dm = make_dm()
+	token = pool.formatter.begin(u'a', 0)
+	pool.formatter.invalidate(u'a')
+	# The block was changed after it was formatted, and is discarded
+	assert not pool.formatter.store(u'a', 0, token, [u''] * BLOCK_SIZE)
+	assert not pool.formatter.is_cached(u'a', 0)
+
+
+def test_cancel(qapp, pool):
+
+	dm = make_dm()
+	pool.request(u'a', dm.a, 0)
+	pool.cancel()
+	wait(qapp, pool)
+	assert not pool.announced
+	assert not pool.formatter.is_cached(u'a', 0)
+
+
+def test_budget(pool):
+
+	assert not pool.in_budget()
+	pool.start_budget()
+	assert pool.in_budget()
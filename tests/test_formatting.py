@@ -0,0 +1,43 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from datamatrix.py3compat import *
+from datamatrix import DataMatrix, FloatColumn
+from qdatamatrix import QDataMatrix
+from qdatamatrix._formatting import BLOCK_SIZE
+
+
+def test_paste_keeps_other_blocks(qapp):
+
+	dm = DataMatrix(length=4 * BLOCK_SIZE)
+	dm.a = FloatColumn
+	dm.a = range(len(dm))
+	qdm = QDataMatrix(dm, virtual=True)
+	spreadsheet = qdm._spreadsheet
+	formatter = spreadsheet._formatter
+	for blocknr in range(4):
+		formatter.block(u'a', dm.a, blocknr)
+	# Ten rows that start in the second block and end in the third
+	rownr = 2 * BLOCK_SIZE - 5
+	spreadsheet._dm_setslice(rownr, 0, [u'1.5'] * 10)
+	assert [formatter.is_cached(u'a', blocknr) for blocknr in range(4)] == \
+		[True, False, False, True]
+	assert formatter.text(u'a', dm.a, rownr) == u'1.5'
+	assert formatter.text(u'a', dm.a, rownr - 1) == u'506.0'
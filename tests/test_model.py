@@ -0,0 +1,101 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from datamatrix.py3compat import *
+from datamatrix import DataMatrix, IntColumn, SeriesColumn
+from qdatamatrix import QDataMatrix
+from qtpy.QtCore import Qt
+import pytest
+
+
+@pytest.fixture
+def qdm(qapp):
+
+	dm = DataMatrix(length=3)
+	dm.a = IntColumn
+	dm.a = 1, 2, 3
+	dm.b = u'x', u'y', u'z'
+	dm.s = SeriesColumn(depth=2)
+	return QDataMatrix(dm, virtual=True)
+
+
+def edit_text(model, rownr, colnr):
+
+	return model.data(model.index(rownr, colnr), Qt.EditRole)
+
+
+def test_data(qdm):
+
+	model = qdm._spreadsheet._model
+	# The first row contains the column names, and the table is padded with
+	# empty cells
+	assert [edit_text(model, rownr, 0) for rownr in range(5)] == \
+		[u'a', u'1', u'2', u'3', None]
+	assert [edit_text(model, rownr, 1) for rownr in range(4)] == \
+		[u'b', u'x', u'y', u'z']
+	assert model.data(model.index(1, 0), Qt.TextAlignmentRole) == \
+		int(Qt.AlignRight)
+	assert model.data(model.index(1, 1), Qt.TextAlignmentRole) == \
+		int(Qt.AlignLeft)
+
+
+def test_header_data(qdm):
+
+	model = qdm._spreadsheet._model
+	assert [model.headerData(colnr, Qt.Horizontal) for colnr in range(4)] \
+		== [u'a', u'b', u's', None]
+	assert [model.headerData(rownr, Qt.Vertical) for rownr in range(5)] == \
+		[u'', u'1', u'2', u'3', u'']
+
+
+def test_set_data(qdm):
+
+	dm = qdm.dm
+	model = qdm._spreadsheet._model
+	assert model.setData(model.index(2, 0), u'10')
+	assert dm.a[1] == 10
+	assert edit_text(model, 2, 0) == u'10'
+	# Editing a column name renames the column
+	assert model.setData(model.index(0, 1), u'c')
+	assert dm.column_names == [u'a', u'c', u's']
+	assert model.headerData(1, Qt.Horizontal) == u'c'
+	# Editing a cell below the last row adds rows
+	assert model.setData(model.index(4, 0), u'7')
+	assert list(dm.a) == [1, 10, 3, 7]
+	assert model.headerData(4, Qt.Vertical) == u'4'
+	# Every edit can be undone
+	for i in range(3):
+		qdm._spreadsheet._undo()
+	assert list(dm.a) == [1, 2, 3]
+	assert dm.column_names == [u'a', u'b', u's']
+	assert edit_text(model, 2, 0) == u'2'
+
+
+def test_flags(qdm):
+
+	model = qdm._spreadsheet._model
+	assert model.flags(model.index(1, 0)) & Qt.ItemIsEditable
+	# Series cells show a summary, which cannot be edited
+	assert not model.flags(model.index(1, 2)) & Qt.ItemIsEditable
+	assert model.flags(model.index(0, 2)) & Qt.ItemIsEditable
+	qdm._spreadsheet.read_only = True
+	assert not model.flags(model.index(1, 0)) & Qt.ItemIsEditable
+	assert not model.setData(model.index(1, 0), u'5')
+	assert qdm.dm.a[0] == 1
@@ -0,0 +1,107 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from datamatrix.py3compat import *
+from datamatrix import DataMatrix, IntColumn, FloatColumn, MixedColumn
+from qdatamatrix._paste import parse_tsv, column_runs, unique_name, \
+	valid_name, set_slice
+import pytest
+
+
+def test_parse_tsv():
+
+	assert parse_tsv(u'') == []
+	assert parse_tsv(u'a\tb\n\nc\n\n') == [[u'a', u'b'], None, [u'c']]
+	assert parse_tsv(u'\ta\t') == [[u'', u'a', u'']]
+
+
+def test_column_runs():
+
+	rows = parse_tsv(u'a\tb\nc\n\nd\te\n\tf\ng\th')
+	assert column_runs(rows, 0, None) == [(0, [u'a', u'c']),
+		(3, [u'd', u'', u'g'])]
+	# Runs are interrupted by rows that are too short, and by skipped cells
+	assert column_runs(rows, 0, u'') == [(0, [u'a', u'c']), (3, [u'd']),
+		(5, [u'g'])]
+	assert column_runs(rows, 1, u'') == [(0, [u'b']),
+		(3, [u'e', u'f', u'h'])]
+	assert column_runs(rows, 2, u'') == []
+
+
+def test_unique_name():
+
+	assert unique_name(u'a', {u'b'}) == u'a'
+	assert unique_name(u'a', {u'a', u'a_1'}) == u'a_2'
+
+
+@pytest.mark.parametrize(u'name, valid', [
+	(u'rt', True),
+	(u'_x1', True),
+	(u'a.b', False),
+	(u'1a', False),
+	(u'a b', False),
+	(u'', False),
+	(u'class', False),
+	(u'None', False),
+	(u'__debug__', False),
+])
+def test_valid_name(name, valid):
+
+	assert valid_name(name) == valid
+
+
+def test_set_slice():
+
+	dm = DataMatrix(length=4)
+	dm.i = IntColumn
+	dm.f = FloatColumn
+	dm.m = MixedColumn
+	assert set_slice(dm.i, 1, [u'1', u'2']).tolist() == [0, 0]
+	assert dm.i.array.tolist() == [0, 1, 2, 0]
+	set_slice(dm.f, 2, [u'1.5', u'2'])
+	assert dm.f.array[2:].tolist() == [1.5, 2]
+	assert set_slice(dm.m, 0, [u'1', u'x']) == [u'', u'']
+	assert list(dm.m) == [1, u'x', u'', u'']
+	# Invalid values are skipped
+	set_slice(dm.i, 0, [u'x', u'5'])
+	assert dm.i.array.tolist() == [0, 5, 2, 0]
+
+
+@pytest.mark.parametrize(u'column_type', [IntColumn, FloatColumn,
+	MixedColumn])
+@pytest.mark.parametrize(u'texts', [
+	[u'1', u'1.0', u'2.5', u'-3'],
+	[u'1_000', u' 3 ', u'inf', u'nan'],
+	[u'1', u'x', u'', u'2'],
+])
+def test_set_slice_matches_cells(column_type, texts):
+
+	sliced = DataMatrix(length=len(texts))
+	sliced.col = column_type
+	set_slice(sliced.col, 0, texts)
+	cells = DataMatrix(length=len(texts))
+	cells.col = column_type
+	for rownr, text in enumerate(texts):
+		try:
+			cells.col[rownr] = text
+		except (TypeError, ValueError):
+			pass
+	assert [repr(val) for val in sliced.col] == \
+		[repr(val) for val in cells.col]
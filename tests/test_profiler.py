@@ -0,0 +1,92 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from datamatrix.py3compat import *
+from qdatamatrix.decorators import profiled, silent
+from qdatamatrix._profiler import Profiler
+import pytest
+
+
+class Spreadsheet(object):
+
+	def __init__(self):
+
+		self._profiler = Profiler()
+		self._profiler.enabled = True
+		self._silent = False
+
+	@profiled
+	def _succeed(self):
+
+		return 1
+
+	@profiled
+	def _fail(self):
+
+		raise ValueError()
+
+	@profiled
+	@silent
+	def _fail_silently(self):
+
+		assert self._silent
+		raise ValueError()
+
+
+def test_record():
+
+	profiler = Profiler()
+	profiler.record(u'op', .2)
+	profiler.record(u'op', .1)
+	profiler.count(u'items', 3)
+	assert profiler.stats() == {
+		u'timings': {u'op': {u'calls': 2, u'total': pytest.approx(.3),
+			u'max': .2}},
+		u'counters': {u'items': 3}
+	}
+	profiler.reset()
+	assert profiler.stats() == {u'timings': {}, u'counters': {}}
+
+
+def test_profiled():
+
+	spreadsheet = Spreadsheet()
+	assert spreadsheet._succeed() == 1
+	# Calls that raise an exception are recorded as well
+	with pytest.raises(ValueError):
+		spreadsheet._fail()
+	with pytest.raises(ValueError):
+		spreadsheet._fail_silently()
+	assert not spreadsheet._silent
+	timings = spreadsheet._profiler.stats()[u'timings']
+	assert timings[u'succeed'][u'calls'] == 1
+	assert timings[u'fail'][u'calls'] == 1
+	assert timings[u'fail_silently'][u'calls'] == 1
+	assert timings[u'@silent'][u'calls'] == 1
+
+
+def test_disabled():
+
+	spreadsheet = Spreadsheet()
+	spreadsheet._profiler.enabled = False
+	spreadsheet._succeed()
+	with pytest.raises(ValueError):
+		spreadsheet._fail()
+	assert spreadsheet._profiler.stats()[u'timings'] == {}
@@ -0,0 +1,51 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from datamatrix.py3compat import *
+from qdatamatrix._qcell import QCell, value_style
+from qtpy.QtCore import Qt
+from qtpy.QtGui import QFont
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize(u'val, style', [
+	(1, u'numeric'),
+	(1.5, u'numeric'),
+	(np.int64(1), u'numeric'),
+	(np.float32(1.5), u'numeric'),
+	(np.nan, u'numeric'),
+	(True, u'text'),
+	(np.bool_(True), u'text'),
+	(u'1', u'text'),
+	(None, u'text'),
+])
+def test_value_style(val, style):
+
+	assert value_style(val) == style
+
+
+def test_update_style_resets_font(qapp):
+
+	cell = QCell(u'x', style=u'header')
+	assert cell.font().weight() == QFont.Black
+	cell.style = u'text'
+	assert cell.data(Qt.FontRole) is None
+	assert cell.font().weight() == QFont().weight()
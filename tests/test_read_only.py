@@ -0,0 +1,86 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from datamatrix.py3compat import *
+from datamatrix import DataMatrix
+from qtpy import QtCore
+from qtpy.QtTest import QTest
+from qdatamatrix import QDataMatrix, CSVSource, MemmapSource
+import numpy as np
+import pytest
+
+# The shortcuts that change the DataMatrix
+EDIT_KEYS = [
+	(QtCore.Qt.Key_X, QtCore.Qt.ControlModifier),
+	(QtCore.Qt.Key_Delete, QtCore.Qt.NoModifier),
+	(QtCore.Qt.Key_V, QtCore.Qt.ControlModifier),
+]
+
+
+def csv_source(tmp_path):
+
+	path = tmp_path / u'data.csv'
+	path.write_text(u'a,b\n1,2\n3,4\n')
+	return CSVSource(str(path))
+
+
+def memmap_source(tmp_path):
+
+	return MemmapSource(np.arange(6.).reshape(3, 2))
+
+
+def show(qapp, dm, virtual):
+
+	qdm = QDataMatrix(dm, virtual=virtual)
+	qdm.show()
+	spreadsheet = qdm._spreadsheet
+	spreadsheet.setFocus()
+	spreadsheet.setCurrentIndex(spreadsheet.model().index(1, 0))
+	qapp.processEvents()
+	return qdm
+
+
+@pytest.mark.parametrize(u'virtual', [False, True])
+@pytest.mark.parametrize(u'make_source', [csv_source, memmap_source])
+def test_edit_shortcuts_on_source(qapp, slot_errors, tmp_path, virtual,
+	make_source):
+
+	qdm = show(qapp, make_source(tmp_path), virtual)
+	spreadsheet = qdm._spreadsheet
+	qapp.clipboard().setText(u'x\ty')
+	for key, modifier in EDIT_KEYS:
+		QTest.keyClick(spreadsheet, key, modifier)
+		qapp.processEvents()
+		assert not slot_errors
+		assert not spreadsheet._in_undo_action
+		assert spreadsheet._undo_action is None
+	assert not len(spreadsheet._undo_stack)
+
+
+@pytest.mark.parametrize(u'virtual', [False, True])
+def test_delete_shortcut(qapp, slot_errors, virtual):
+
+	dm = DataMatrix(length=2)
+	dm.a = 1, 2
+	qdm = show(qapp, dm, virtual)
+	QTest.keyClick(qdm._spreadsheet, QtCore.Qt.Key_Delete)
+	qapp.processEvents()
+	assert not slot_errors
+	assert dm.a[0] == u''
@@ -0,0 +1,116 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from datamatrix.py3compat import *
+from datamatrix import DataMatrix
+from qdatamatrix import QDataMatrix
+from qdatamatrix._formatting import BLOCK_SIZE
+import pytest
+
+
+@pytest.fixture(params=[False, True], ids=[u'items', u'virtual'])
+def qdm(request, qapp, monkeypatch):
+
+	dm = DataMatrix(length=3 * BLOCK_SIZE)
+	dm.a = range(len(dm))
+	dm.b = u'x'
+	qdm = QDataMatrix(dm, virtual=request.param)
+	spreadsheet = qdm._spreadsheet
+	# Full refreshes and repainted ranges are recorded
+	qdm.repainted = []
+	qdm.refreshed = []
+	repaint_range = spreadsheet._repaint_range
+	refresh = spreadsheet.refresh
+
+	def record_repaint(*args):
+		qdm.repainted.append(args)
+		repaint_range(*args)
+
+	def record_refresh():
+		qdm.refreshed.append(True)
+		refresh()
+
+	monkeypatch.setattr(spreadsheet, u'_repaint_range', record_repaint)
+	monkeypatch.setattr(spreadsheet, u'refresh', record_refresh)
+	return qdm
+
+
+def test_outside_change(qdm):
+
+	qdm.dm.a[BLOCK_SIZE + 1] = -1
+	qdm.refresh()
+	assert not qdm.refreshed
+	colnr = qdm._spreadsheet._colnr(u'a')
+	# Only the changed block is repainted
+	assert qdm.repainted == [(BLOCK_SIZE + 1, colnr, 2 * BLOCK_SIZE, colnr)]
+	del qdm.repainted[:]
+	qdm.refresh()
+	assert not qdm.repainted and not qdm.refreshed
+
+
+def test_widget_changes_are_not_repainted_again(qdm):
+
+	spreadsheet = qdm._spreadsheet
+	spreadsheet._dm_setcell(5, 0, u'y')
+	spreadsheet._dm_setslice(BLOCK_SIZE, 1, [u'1', u'2'])
+	qdm.submit(u'a', 2 * BLOCK_SIZE, 7)
+	qdm._submit_queue._drain()
+	del qdm.repainted[:]
+	qdm.refresh()
+	assert not qdm.repainted and not qdm.refreshed
+
+
+def test_refresh_rows_and_columns(qdm):
+
+	qdm.dm.a[0] = -1
+	qdm.dm.b[BLOCK_SIZE] = u'y'
+	qdm.refresh_rows([0])
+	qdm.refresh_columns([u'b'])
+	del qdm.repainted[:]
+	qdm.refresh()
+	assert not qdm.repainted and not qdm.refreshed
+
+
+def test_appended_rows(qdm):
+
+	chunk = DataMatrix(length=10)
+	chunk.a = 1
+	chunk.b = u'z'
+	qdm.append_rows(chunk)
+	qdm._flush_rows()
+	del qdm.repainted[:]
+	qdm.refresh()
+	assert not qdm.repainted and not qdm.refreshed
+	qdm.dm.a[-1] = 2
+	qdm.refresh()
+	assert not qdm.refreshed
+	assert len(qdm.repainted) == 1
+
+
+def test_structure_changed_through_widget(qdm):
+
+	qdm._spreadsheet._dm_add_column()
+	del qdm.refreshed[:]
+	qdm.refresh()
+	assert not qdm.repainted and not qdm.refreshed
+	# Changes to the structure outside of the widget are a full refresh
+	qdm.dm.c = 1
+	qdm.refresh()
+	assert qdm.refreshed
@@ -0,0 +1,163 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from datamatrix.py3compat import *
+from datamatrix import DataMatrix, MixedColumn, FloatColumn
+from qdatamatrix._rowindex import RowIndex, MAX_INCREMENTAL
+import numpy as np
+import random
+import pytest
+
+VALUES = [0, 1, 2, 2.5, u'a', u'b', u'', None]
+
+
+def make_dm(length, rng):
+
+	dm = DataMatrix(length=length)
+	dm.mixed = MixedColumn
+	dm.mixed = [rng.choice(VALUES) for _ in range(length)]
+	dm.float = FloatColumn
+	dm.float = [rng.choice([0, 1, 2, np.nan]) for _ in range(length)]
+	return dm
+
+
+def numbers(dm):
+
+	return np.array([
+		isinstance(val, (int, float)) and val > 0 for val in dm.mixed])
+
+
+PREDICATES = [
+	None,
+	numbers,
+	# A predicate that selects rows, rather than giving a mask
+	lambda dm: dm.float > 0,
+]
+SORT_KEYS = [
+	[],
+	[(u'mixed', False)],
+	[(u'float', True)],
+	[(u'float', False), (u'mixed', True)],
+]
+
+
+@pytest.mark.parametrize(u'predicate', PREDICATES)
+@pytest.mark.parametrize(u'sort_keys', SORT_KEYS)
+def test_sync_matches_update(sort_keys, predicate):
+
+	rng = random.Random(0)
+	for trial in range(50):
+		dm = make_dm(rng.randint(1, 30), rng)
+		row_index = RowIndex()
+		row_index.sort_keys = sort_keys
+		row_index.predicate = predicate
+		if not row_index.active:
+			continue
+		row_index.update(dm)
+		old_index = row_index.index.copy()
+		for _ in range(rng.randint(1, 6)):
+			rownr = rng.randrange(len(dm))
+			dm.mixed[rownr] = rng.choice(VALUES)
+			dm.float[rownr] = rng.choice([0, 1, 2, np.nan])
+			row_index.touch(rownr)
+		changed = row_index.sync(dm)
+		index = row_index.index.copy()
+		positions = row_index._positions.copy()
+		row_index.update(dm)
+		assert index.tolist() == row_index.index.tolist()
+		assert positions.tolist() == row_index._positions.tolist()
+		# Rows outside of the changed range are where they were
+		length = max(len(old_index), len(index))
+		old = np.full(length, -1)
+		old[:len(old_index)] = old_index
+		new = np.full(length, -1)
+		new[:len(index)] = index
+		differs = np.flatnonzero(old != new)
+		if changed is None:
+			assert not len(differs)
+		elif len(differs):
+			first, last = changed
+			assert first <= differs[0] and differs[-1] <= last
+
+
+def test_sync_filters_touched_rows():
+
+	dm = DataMatrix(length=100)
+	dm.a = range(100)
+	sizes = []
+
+	def predicate(dm):
+		sizes.append(len(dm))
+		return dm.a > 50
+
+	row_index = RowIndex()
+	row_index.predicate = predicate
+	row_index.update(dm)
+	dm.a[10] = 60
+	dm.a[90] = 0
+	row_index.touch(10)
+	row_index.touch(90)
+	assert row_index.sync(dm) == (0, 39)
+	assert sizes == [100, 2]
+	assert row_index.position(10) == 0
+	assert row_index.position(90) == -1
+	assert row_index.dm_row(0) == 10
+
+
+def test_sync_many_rows():
+
+	rng = random.Random(1)
+	dm = make_dm(100, rng)
+	row_index = RowIndex()
+	row_index.sort_keys = [(u'float', False)]
+	row_index.update(dm)
+	for rownr in range(MAX_INCREMENTAL + 1):
+		dm.float[rownr] = -rownr
+		row_index.touch(rownr)
+	assert row_index.sync(dm) == (0, 99)
+	assert row_index.dm_row(0) == MAX_INCREMENTAL
+
+
+def test_extend_and_rename():
+
+	dm = DataMatrix(length=4)
+	dm.a = 3, 1, 2, 0
+	row_index = RowIndex()
+	row_index.sort_keys = [(u'a', False)]
+	row_index.update(dm)
+	assert row_index.index.tolist() == [3, 1, 2, 0]
+	dm.length = 6
+	row_index.extend(4, 6)
+	# Added rows are shown at the end, regardless of the sort keys
+	assert row_index.index.tolist() == [3, 1, 2, 0, 4, 5]
+	assert row_index.position(5) == 5
+	dm.rename(u'a', u'b')
+	row_index.rename(u'a', u'b')
+	assert row_index.affects(u'b')
+	assert not row_index.affects(u'a')
+
+
+def test_invalid_mask():
+
+	dm = DataMatrix(length=3)
+	row_index = RowIndex()
+	row_index.predicate = lambda dm: [True]
+	with pytest.raises(ValueError):
+		row_index.update(dm)
@@ -0,0 +1,105 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from datamatrix.py3compat import *
+from datamatrix import DataMatrix
+from qdatamatrix import QDataMatrix
+from qdatamatrix._formatting import DisplayFormatter
+from qdatamatrix._search import SearchIndex, compile_pattern
+import itertools
+import pytest
+
+
+def make_dm():
+
+	dm = DataMatrix(length=4)
+	dm.a = u'apple', u'Banana', u'cherry', u'a\nb'
+	dm.b = u'pear', u'apple pie', u'', u'APPLE'
+	return dm
+
+
+def hits(dm, pattern, rownr=-1, colnr=-1, regex=False, case_sensitive=False,
+	backwards=False, search=None):
+
+	if search is None:
+		search = SearchIndex(DisplayFormatter())
+	return list(search.hits(dm.columns, len(dm),
+		compile_pattern(pattern, regex, case_sensitive), rownr, colnr,
+		case_sensitive, backwards))
+
+
+def test_search_texts():
+
+	# Patterns are searched as plain text unless regex is True
+	assert hits(make_dm(), u'apple') == [(0, 0), (1, 1), (3, 1)]
+	assert hits(make_dm(), u'apple', case_sensitive=True) == [(0, 0), (1, 1)]
+	assert hits(make_dm(), u'^.pple$', regex=True) == [(0, 0), (3, 1)]
+	assert hits(make_dm(), u'a.p') == []
+
+
+def test_newlines_in_cells():
+
+	# Newlines in cells are searched as spaces, and matches don't span rows
+	assert hits(make_dm(), u'a b') == [(3, 0)]
+	assert hits(make_dm(), u'y\na', regex=True) == []
+
+
+def test_wrap_around():
+
+	dm = make_dm()
+	# The starting cell itself comes last
+	assert hits(dm, u'apple', 1, 1) == [(3, 1), (0, 0), (1, 1)]
+	assert hits(dm, u'apple', 1, 1, backwards=True) == [(0, 0), (3, 1),
+		(1, 1)]
+
+
+def test_lazy():
+
+	dm = DataMatrix(length=100000)
+	dm.a = u'x'
+	search = SearchIndex(DisplayFormatter())
+	generator = search.hits(dm.columns, len(dm), compile_pattern(u'x'))
+	assert list(itertools.islice(generator, 2)) == [(0, 0), (1, 0)]
+
+
+def test_changed_column():
+
+	dm = make_dm()
+	formatter = DisplayFormatter()
+	search = SearchIndex(formatter)
+	assert hits(dm, u'cherry', search=search) == [(2, 0)]
+	dm.a[2] = u'plum'
+	# The index is kept until the column is invalidated
+	formatter.invalidate(u'a', 2)
+	assert hits(dm, u'cherry', search=search) == []
+	assert hits(dm, u'plum', search=search) == [(2, 0)]
+
+
+@pytest.mark.parametrize(u'virtual', [False, True], ids=[u'items',
+	u'virtual'])
+def test_spreadsheet_hits(qapp, virtual):
+
+	qdm = QDataMatrix(make_dm(), virtual=virtual)
+	spreadsheet = qdm._spreadsheet
+	# Table rows start after the row with the column names, and searching
+	# starts after the cursor
+	spreadsheet._cursor_pos = 1, 0
+	regex = spreadsheet._search_pattern(u'apple')
+	assert list(spreadsheet._search_hits(regex)) == [(2, 1), (4, 1), (1, 0)]
@@ -0,0 +1,87 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from datamatrix.py3compat import *
+from datamatrix import DataMatrix, SeriesColumn
+from qdatamatrix import QDataMatrix
+from qdatamatrix._formatting import DisplayFormatter, downsample, \
+	THUMBNAIL_WIDTH
+import numpy as np
+import pytest
+
+NAN = float(u'nan')
+INF = float(u'inf')
+
+
+def test_format_series():
+
+	formatter = DisplayFormatter()
+	a = np.array([[1, 2, 3], [NAN, 4, NAN], [NAN, NAN, NAN], [INF, 0, 1]])
+	# Missing values are ignored, unless all values are missing
+	assert formatter.format_series(a) == [
+		u'[3] mean=2 min=1 max=3',
+		u'[3] mean=4 min=4 max=4',
+		u'[3] mean=nan min=nan max=nan',
+		u'[3] mean=inf min=0 max=inf',
+	]
+	assert formatter.format_series(np.arange(4).reshape(2, 2)) == [
+		u'[2] mean=0.5 min=0 max=1', u'[2] mean=2.5 min=2 max=3']
+	# Multidimensional cells are summarized as a whole
+	assert formatter.format_series(np.zeros((1, 2, 3))) == \
+		[u'[2x3] mean=0 min=0 max=0']
+	formatter.precision = 1
+	assert formatter.format_series(a[:1]) == \
+		[u'[3] mean=2.0 min=1.0 max=3.0']
+
+
+def test_downsample():
+
+	a = np.array([[1, 5, NAN, 2], [NAN, NAN, NAN, NAN]])
+	thumbnails = downsample(a, width=2)
+	assert thumbnails.shape == (2, 2, 2)
+	assert thumbnails.dtype == np.float32
+	assert thumbnails[0].tolist() == [[1, 2], [5, 2]]
+	assert np.isnan(thumbnails[1]).all()
+	# There are never more bins than samples
+	assert downsample(np.zeros((1, 1000))).shape == (1, 2, THUMBNAIL_WIDTH)
+	assert downsample(np.zeros((1, 3))).shape == (1, 2, 3)
+
+
+@pytest.mark.parametrize(u'virtual', [False, True], ids=[u'items',
+	u'virtual'])
+def test_series_column(qapp, virtual):
+
+	dm = DataMatrix(length=2)
+	dm.s = SeriesColumn(depth=100)
+	dm.s = np.arange(100)
+	dm.s[1] = NAN
+	qdm = QDataMatrix(dm, virtual=virtual)
+	spreadsheet = qdm._spreadsheet
+	formatter = spreadsheet._formatter
+	assert formatter.text(u's', dm.s, 0) == \
+		u'[100] mean=49.5 min=0 max=99'
+	thumbnail = formatter.thumbnail(u's', dm.s, 0)
+	assert thumbnail.shape == (2, THUMBNAIL_WIDTH)
+	assert thumbnail[0, 0] == 0 and thumbnail[1, -1] == 99
+	# Sparklines can be switched off, and the summary is shown instead
+	assert qdm.series_thumbnails
+	qdm.series_thumbnails = False
+	assert not qdm.series_thumbnails
+	assert spreadsheet.delegate.thumbnail is None
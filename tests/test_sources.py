@@ -0,0 +1,130 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from datamatrix.py3compat import *
+from datamatrix import DataMatrix
+from qdatamatrix import QDataMatrix, CSVSource
+from qdatamatrix import _sources
+import threading
+import time
+import pytest
+
+
+class SlowSource(CSVSource):
+
+	"""
+	desc:
+		A CSVSource that waits for `go` before indexing in the background.
+	"""
+
+	def __init__(self, *args, **kwdict):
+
+		self.go = threading.Event()
+		CSVSource.__init__(self, *args, **kwdict)
+
+	def _scan(self):
+
+		if threading.current_thread() is not threading.main_thread():
+			self.go.wait(5)
+		CSVSource._scan(self)
+
+
+def wait(qapp, condition, timeout=5):
+
+	t0 = time.time()
+	while not condition():
+		assert time.time() - t0 < timeout
+		qapp.processEvents()
+		time.sleep(.01)
+
+
+@pytest.fixture
+def csv_path(tmp_path, monkeypatch):
+
+	# The file is indexed in many parts
+	monkeypatch.setattr(_sources, u'SCAN_SIZE', 64)
+	path = tmp_path / u'data.csv'
+	path.write_text(u'a,b\n' + u''.join(
+		u'%d,%d\n' % (i, i * 2) for i in range(200)))
+	return str(path)
+
+
+def test_index(csv_path):
+
+	source = SlowSource(csv_path)
+	assert 0 < len(source) < 200
+	assert not source.complete
+	source.go.set()
+	source._thread.join()
+	assert source.complete and source.error is None
+	assert len(source) == 200
+	assert source.value(1, 199) == 398
+	assert source._scan_fd.closed
+	source.close()
+
+
+def test_close_while_indexing(csv_path):
+
+	source = SlowSource(csv_path)
+	source.go.set()
+	source.close()
+	assert not source._thread.is_alive()
+	assert source._scan_fd.closed
+	assert source._fd.closed
+
+
+def test_line_too_long(qapp, tmp_path, monkeypatch):
+
+	monkeypatch.setattr(_sources, u'SCAN_SIZE', 64)
+	path = tmp_path / u'data.csv'
+	path.write_text(u'a\n1\n2\n' + u'x' * 200 + u'\n3\n')
+	source = SlowSource(str(path))
+	qdm = QDataMatrix(source, virtual=True)
+	errors = []
+	qdm.sourcefailed.connect(errors.append)
+	source.go.set()
+	wait(qapp, lambda: not qdm._source_timer.isActive())
+	assert source.complete
+	assert isinstance(source.error, ValueError)
+	assert errors == [source.error]
+	assert source._scan_fd.closed
+	# The rows before the long line are still shown
+	assert len(source) == 2
+	source.close()
+
+
+@pytest.mark.parametrize(u'virtual', [False, True])
+def test_assign_source(qapp, csv_path, virtual):
+
+	dm = DataMatrix(length=3)
+	dm.a = 1
+	qdm = QDataMatrix(dm, virtual=virtual)
+	source = SlowSource(csv_path)
+	qdm.dm = source
+	qdm.refresh()
+	assert qdm._spreadsheet.read_only
+	source.go.set()
+	wait(qapp, lambda: not qdm._source_timer.isActive())
+	assert len(source) == 200
+	assert qdm._spreadsheet.model().rowCount() == 201
+	# A DataMatrix is editable again
+	qdm.dm = dm
+	assert not qdm._spreadsheet.read_only
+	source.close()
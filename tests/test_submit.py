@@ -0,0 +1,96 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from datamatrix.py3compat import *
+from datamatrix import DataMatrix, IntColumn
+from qdatamatrix import QDataMatrix, MemmapSource
+import numpy as np
+import threading
+import time
+import pytest
+
+
+@pytest.fixture(params=[False, True], ids=[u'items', u'virtual'])
+def qdm(request, qapp):
+
+	dm = DataMatrix(length=100)
+	dm.result = IntColumn
+	return QDataMatrix(dm, virtual=request.param)
+
+
+def process_until(qapp, condition, timeout=5):
+
+	t0 = time.time()
+	while not condition():
+		assert time.time() - t0 < timeout
+		qapp.processEvents()
+
+
+def test_submit_from_threads(qapp, qdm):
+
+	def worker(first):
+		for rownr in range(first, 100, 4):
+			qdm.submit(u'result', rownr, rownr * 2)
+
+	threads = [
+		threading.Thread(target=worker, args=(first,)) for first in range(4)
+	]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	# Changes are applied in the GUI thread
+	assert qdm.dm.result[0] == 0 and qdm.dm.result[99] == 0
+	process_until(qapp, lambda: qdm.submit_usage()[u'applied'] == 100)
+	usage = qdm.submit_usage()
+	assert usage[u'pending'] == 0
+	assert usage[u'submitted'] == 100
+	assert usage[u'failed'] == 0
+	assert usage[u'max_latency'] >= usage[u'mean_latency'] > 0
+	assert list(qdm.dm.result) == list(range(0, 200, 2))
+	# Submitted changes are not recorded in the undo history
+	assert not len(qdm._spreadsheet._undo_stack)
+
+
+def test_slices_and_sequences(qapp, qdm):
+
+	qdm.submit(u'result', slice(0, 3), [1, 2, 3])
+	qdm.submit(u'result', [5, 7], 9)
+	process_until(qapp, lambda: not qdm.submit_usage()[u'pending'])
+	assert list(qdm.dm.result[:8]) == [1, 2, 3, 0, 0, 9, 0, 9]
+
+
+def test_failed(qapp, qdm, caplog):
+
+	qdm.submit(u'missing', 0, 1)
+	qdm.submit(u'result', 0, 1)
+	process_until(qapp, lambda: not qdm.submit_usage()[u'pending'])
+	usage = qdm.submit_usage()
+	assert usage[u'failed'] == 1
+	assert usage[u'applied'] == 1
+	assert u'missing' in caplog.text
+	assert qdm.dm.result[0] == 1
+
+
+def test_source(qapp):
+
+	qdm = QDataMatrix(MemmapSource(np.zeros((2, 1)), names=[u'a']))
+	with pytest.raises(TypeError):
+		qdm.submit(u'a', 0, 1)
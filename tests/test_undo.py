@@ -0,0 +1,241 @@
+#-*- coding:utf-8 -*-
+
+"""
+This file is part of qdatamatatrix.
+
+qdatamatatrix is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+qdatamatatrix is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with qdatamatatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from datamatrix.py3compat import *
+from datamatrix import DataMatrix, MixedColumn, IntColumn, FloatColumn, \
+	SeriesColumn
+from qdatamatrix._undo import UndoAction, UndoStack, SpilledAction, \
+	SetCells, SetSlice, Rename, AddColumn, RemoveColumn, SetLength, \
+	RemoveRows, remove_rows, select_rows, insert_column
+import numpy as np
+
+
+def make_dm():
+
+	dm = DataMatrix(length=6)
+	dm.mixed = MixedColumn
+	dm.mixed = [1, u'a', None, 2.5, u'b', 3]
+	dm.int = IntColumn
+	dm.int = range(6)
+	dm.float = FloatColumn
+	dm.float = [.5, np.nan, 1.5, 2.5, np.inf, 3.5]
+	dm.series = SeriesColumn(depth=2)
+	dm.series[:, 0] = range(6)
+	dm.series[:, 1] = range(6, 12)
+	return dm
+
+
+def state(dm):
+
+	return (
+		list(dm.column_names),
+		list(dm._rowid),
+		[
+			[repr(val) for val in col] if name != u'series'
+			else col._seq.tolist()
+			for name, col in dm.columns
+		]
+	)
+
+
+def undo(dm, *commands):
+
+	action = UndoAction(cursor_pos=(0, 0))
+	for command in commands:
+		action.add(command)
+	return action.undo(dm)
+
+
+def test_set_cells():
+
+	dm = make_dm()
+	before = state(dm)
+	action = UndoAction(cursor_pos=(0, 0))
+	for rownr, val in ((1, u'x'), (1, u'y'), (4, 7)):
+		action.add_cell(u'mixed', rownr, dm._rowid[rownr], dm.mixed[rownr],
+			val)
+		dm.mixed[rownr] = val
+	# Consecutive changes to the same column are merged
+	assert len(action.commands) == 1
+	assert sorted(action.undo(dm)) == [(u'mixed', 1, 2), (u'mixed', 1, 2),
+		(u'mixed', 4, 5)]
+	assert state(dm) == before
+
+
+def test_set_cells_moved_rows():
+
+	dm = make_dm()
+	before = state(dm)
+	command = SetCells(u'int')
+	command.add(4, dm._rowid[4], dm.int[4], 10)
+	dm.int[4] = 10
+	# Rows that have moved are found by their row id
+	dm = dm[::-1]
+	assert command.undo(dm) == [(u'int', 1, 2)]
+	assert state(dm[::-1]) == before
+
+
+def test_set_slice():
+
+	dm = make_dm()
+	before = state(dm)
+	command = SetSlice(u'float', 1, dm._rowid[1:4]._a,
+		dm.float._seq[1:4].copy())
+	dm.float[1:4] = 9
+	assert undo(dm, command) == [(u'float', 1, 4)]
+	assert state(dm) == before
+
+
+def test_set_slice_moved_rows():
+
+	dm = make_dm()
+	before = state(dm)
+	command = SetSlice(u'float', 1, dm._rowid[1:3]._a,
+		dm.float._seq[1:3].copy())
+	dm.float[1:3] = 9
+	# Rows that have moved are undone one by one
+	dm = dm[::-1]
+	assert sorted(undo(dm, command)) == [(u'float', 3, 4), (u'float', 4, 5)]
+	assert state(dm[::-1]) == before
+
+
+def test_rename():
+
+	dm = make_dm()
+	before = state(dm)
+	dm.rename(u'int', u'renamed')
+	assert undo(dm, Rename(u'int', u'renamed')) is None
+	assert state(dm) == before
+
+
+def test_add_and_remove_column():
+
+	dm = make_dm()
+	before = state(dm)
+	dm.new = 1
+	assert undo(dm, AddColumn(u'new')) is None
+	assert state(dm) == before
+	command = RemoveColumn(u'int', dm.int, dm.column_names.index(u'int'))
+	del dm.int
+	undo(dm, command)
+	assert state(dm) == before
+
+
+def test_insert_column_order():
+
+	dm = make_dm()
+	names = list(dm._cols)
+	col = dm.float
+	del dm.float
+	insert_column(dm, u'float', col, names.index(u'float'))
+	assert list(dm._cols) == names
+
+
+def test_set_length():
+
+	dm = make_dm()
+	before = state(dm)
+	dm.length = 10
+	undo(dm, SetLength(6))
+	assert state(dm) == before
+
+
+def test_select_rows():
+
+	dm = make_dm()
+	rownrs = np.array([4, 0, 2])
+	selected = select_rows(dm, rownrs)
+	assert state(selected) == state(dm[4, 0, 2])
+	mask = np.array([True, False, True, False, False, True])
+	assert state(select_rows(dm, mask)) == state(dm[0, 2, 5])
+
+
+def test_remove_rows():
+
+	dm = make_dm()
+	before = state(dm)
+	removed = remove_rows(dm, [1, 4, 5])
+	assert len(dm) == 3
+	assert list(dm.int) == [0, 2, 3]
+	assert list(removed.int) == [1, 4, 5]
+	undo(dm, RemoveRows([1, 4, 5], removed))
+	assert state(dm) == before
+
+
+def test_remove_rows_changed_columns():
+
+	dm = make_dm()
+	before = state(dm)
+	removed = remove_rows(dm, [0, 3])
+	# A column that is removed outside of the widget is merged back through
+	# the DataMatrix
+	del dm.float
+	undo(dm, RemoveRows([0, 3], removed))
+	assert list(dm._rowid) == before[1]
+	assert list(dm.int) == list(range(6))
+
+
+def test_spilled_action(tmp_path):
+
+	dm = make_dm()
+	before = state(dm)
+	rownrs = [0, 2]
+	action = UndoAction(cursor_pos=(1, 2))
+	action.add(RemoveRows(rownrs, remove_rows(dm, rownrs)))
+	spilled = SpilledAction(action, str(tmp_path))
+	assert spilled.nbytes > 0
+	action = spilled.load()
+	assert not list(tmp_path.iterdir())
+	assert action.cursor_pos == (1, 2)
+	action.undo(dm)
+	assert state(dm) == before
+
+
+def test_undo_stack_spills():
+
+	dm = make_dm()
+	stack = UndoStack(budget=0)
+	states = []
+	for val in range(3):
+		states.append(state(dm))
+		action = UndoAction(cursor_pos=(0, 0))
+		action.add_cell(u'int', 0, dm._rowid[0], dm.int[0], val + 10)
+		dm.int[0] = val + 10
+		stack.push(action)
+	# Only the most recent action is kept in memory
+	assert len(stack) == 3
+	assert stack.spilled_count == 2
+	assert stack.disk_usage > 0
+	while len(stack):
+		stack.pop().undo(dm)
+		assert state(dm) == states.pop()
+	assert stack.disk_usage == 0
+
+
+def test_undo_stack_drops():
+
+	stack = UndoStack(budget=0, policy=u'drop')
+	for i in range(3):
+		action = UndoAction(cursor_pos=(0, 0))
+		action.add(SetLength(i))
+		stack.push(action)
+	assert len(stack) == 1
+	assert stack.spilled_count == 0
+	assert stack.pop().commands[0].length == 2